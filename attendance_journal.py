@@ -0,0 +1,145 @@
+import sqlite3
+import threading
+import time
+from bson import json_util
+from pymongo.errors import PyMongoError
+from attendance_writer import insert_batch
+
+JOURNAL_PATH = "attendance_journal.db"
+
+STATUS_PENDING = 0
+STATUS_SYNCED = 1
+STATUS_REJECTED = 2
+
+# Local append-only journal of attendance events (SQLite)
+# Every event is committed here before it is sent to MongoDB. The record's _id doubles as the
+# idempotency key, so replaying an event that already reached the server is harmless.
+class AttendanceJournal:
+    def __init__(self, path=JOURNAL_PATH, retention_days=30):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id TEXT NOT NULL UNIQUE,
+                record TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                status INTEGER NOT NULL DEFAULT 0,
+                roll_no INTEGER
+            )
+        """)
+        self._add_roll_no_column()
+        self._conn.execute("CREATE INDEX IF NOT EXISTS events_status ON events (status, seq)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS events_roll_no ON events (roll_no, seq)")
+        self._conn.commit()
+        # Kept in memory so the on-screen status never has to count rows in SQLite
+        self._pending = self._conn.execute("SELECT COUNT(*) FROM events WHERE status = ?", (STATUS_PENDING,)).fetchone()[0]
+        self.purge_synced(retention_days)
+
+    # Journals written before the roll_no column existed: add it and fill it in once
+    def _add_roll_no_column(self):
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(events)")]
+        if "roll_no" in columns:
+            return
+        self._conn.execute("ALTER TABLE events ADD COLUMN roll_no INTEGER")
+        rows = self._conn.execute("SELECT seq, record FROM events").fetchall()
+        self._conn.executemany("UPDATE events SET roll_no = ? WHERE seq = ?",
+                               [(json_util.loads(record).get("Roll No"), seq) for seq, record in rows])
+
+    # Durably store one event (the record must already have its _id)
+    def append(self, record):
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO events (event_id, record, created_at, roll_no) VALUES (?, ?, ?, ?)",
+                (str(record["_id"]), json_util.dumps(record), time.time(), record.get("Roll No"))
+            )
+            self._conn.commit()
+            self._pending += cursor.rowcount
+
+    # Oldest events not yet in MongoDB, as (seq, record) pairs
+    def unsynced(self, limit):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, record FROM events WHERE status = ? ORDER BY seq LIMIT ?",
+                (STATUS_PENDING, limit)
+            ).fetchall()
+        return [(seq, json_util.loads(record)) for seq, record in rows]
+
+    # Move pending events to a final status
+    def _set_status(self, seqs, status):
+        if not seqs:
+            return
+        with self._lock:
+            cursor = self._conn.executemany("UPDATE events SET status = ? WHERE seq = ? AND status = ?",
+                                            [(status, seq, STATUS_PENDING) for seq in seqs])
+            self._conn.commit()
+            self._pending -= cursor.rowcount
+
+    def mark_synced(self, seqs):
+        self._set_status(seqs, STATUS_SYNCED)
+
+    # Events MongoDB refused (e.g. validation errors); kept for inspection but never retried
+    def mark_rejected(self, seqs):
+        self._set_status(seqs, STATUS_REJECTED)
+
+    # Each student's newest event that MongoDB has not rejected, oldest first
+    # Only the (roll_no, seq) index is scanned; one record per student is read and parsed
+    def latest_records(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT record FROM events WHERE seq IN "
+                "(SELECT MAX(seq) FROM events WHERE status != ? GROUP BY roll_no) ORDER BY seq",
+                (STATUS_REJECTED,)
+            ).fetchall()
+        return [json_util.loads(record) for (record,) in rows]
+
+    # Events not yet in MongoDB (counted in memory; a replay from another process is not seen until reopening)
+    def pending_count(self):
+        return self._pending
+
+    # Drop synced events older than the retention window
+    def purge_synced(self, retention_days):
+        cutoff = time.time() - retention_days * 86400
+        with self._lock:
+            self._conn.execute("DELETE FROM events WHERE status = ? AND created_at < ?", (STATUS_SYNCED, cutoff))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Function to stream every un-synced journal event to MongoDB in bulk
+def replay_journal(journal, attendance_collection, occupancy_collection=None, batch_size=500):
+    replayed = 0
+    rejected = 0
+    while True:
+        batch = journal.unsynced(batch_size)
+        if not batch:
+            break
+        seqs = [seq for seq, _ in batch]
+        try:
+            rejected_indexes = insert_batch(attendance_collection, [record for _, record in batch], occupancy_collection)
+        except PyMongoError as e:
+            print(f"❌ Replay stopped, MongoDB unavailable: {str(e)}")
+            break
+        journal.mark_rejected([seqs[i] for i in rejected_indexes])
+        journal.mark_synced([seq for i, seq in enumerate(seqs) if i not in rejected_indexes])
+        replayed += len(batch) - len(rejected_indexes)
+        rejected += len(rejected_indexes)
+        print(f"Replayed {replayed} events...")
+
+    print(f"Replay finished: {replayed} synced, {rejected} rejected, {journal.pending_count()} still pending")
+    return replayed
+
+if __name__ == "__main__":
+    from database_record import get_db
+    from occupancy import get_occupancy_collection
+
+    db, attendance_collection, students_collection, db_connected = get_db()
+    if not db_connected:
+        print("Cannot replay: MongoDB is not reachable.")
+    else:
+        replay_journal(AttendanceJournal(), attendance_collection, get_occupancy_collection(db))
@@ -0,0 +1,110 @@
+import argparse
+from datetime import datetime, timezone
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import PyMongoError
+
+# Time formats found in older string-dated attendance records
+LEGACY_TIME_FORMATS = ["%H:%M:%S", "%H:%M", "%I:%M%p", "%I:%M %p"]
+
+# Function to build an attendance record
+# "Timestamp" is a real BSON datetime (UTC, second resolution) for range queries;
+# "Date" and "Time of Attendance" keep the local-time strings existing reports read
+def build_attendance_record(name, roll_no, method, entry_type, camera=None, now=None):
+    now = now or datetime.now().astimezone()
+    attendance_record = {
+        "Name": name,
+        "Roll No": roll_no,
+        "Attendance": True,
+        "Timestamp": now.astimezone(timezone.utc).replace(microsecond=0),
+        "Date": now.strftime("%Y-%m-%d"),
+        "Time of Attendance": now.strftime("%H:%M"),
+        "Method": method,
+        "Entry Type": entry_type
+    }
+
+    # Attribute the event to a door when running several cameras
+    if camera:
+        attendance_record["Camera"] = camera["name"]
+
+    return attendance_record
+
+# Function to create the compound indexes used by attendance queries
+def ensure_attendance_indexes(attendance_collection):
+    try:
+        attendance_collection.create_index([("Roll No", ASCENDING), ("Timestamp", ASCENDING)], name="roll_no_timestamp")
+        attendance_collection.create_index([("Date", ASCENDING), ("Entry Type", ASCENDING)], name="date_entry_type")
+        attendance_collection.create_index([("Entry Type", ASCENDING), ("Timestamp", ASCENDING)], name="entry_type_timestamp")
+        attendance_collection.create_index("Timestamp", name="timestamp")
+    except PyMongoError as e:
+        print(f"⚠ Warning: Could not create attendance indexes: {str(e)}")
+
+# Function to find attendance events in a time range (start inclusive, end exclusive)
+# Naive datetimes are taken as local time
+def find_attendance(attendance_collection, start, end, entry_type=None, roll_no=None):
+    query = {"Timestamp": {"$gte": _to_utc(start), "$lt": _to_utc(end)}}
+    if entry_type:
+        query["Entry Type"] = entry_type
+    if roll_no is not None:
+        query["Roll No"] = roll_no
+    return attendance_collection.find(query).sort("Timestamp", ASCENDING)
+
+def _to_utc(value):
+    return value.astimezone(timezone.utc)
+
+# Function to parse a legacy "Date" + "Time of Attendance" pair (local time) into a UTC datetime
+def parse_legacy_timestamp(date_text, time_text):
+    for time_format in LEGACY_TIME_FORMATS:
+        try:
+            local_time = datetime.strptime(f"{date_text} {time_text.strip()}", f"%Y-%m-%d {time_format}")
+            return local_time.astimezone(timezone.utc)
+        except (ValueError, AttributeError):
+            continue
+    return None
+
+# Function to add a "Timestamp" to every string-dated record, in batches
+# Pages through the collection by _id, so it can be stopped and re-run safely
+def migrate_string_dates(attendance_collection, batch_size=1000):
+    migrated = 0
+    unparsed = 0
+    last_id = None
+    while True:
+        query = {"Timestamp": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = list(attendance_collection.find(query, {"_id": 1, "Date": 1, "Time of Attendance": 1})
+                     .sort("_id", ASCENDING).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        updates = []
+        for record in batch:
+            timestamp = parse_legacy_timestamp(record.get("Date"), record.get("Time of Attendance"))
+            if timestamp is None:
+                unparsed += 1
+                continue
+            updates.append(UpdateOne({"_id": record["_id"]}, {"$set": {"Timestamp": timestamp}}))
+
+        if updates:
+            result = attendance_collection.bulk_write(updates, ordered=False)
+            migrated += result.modified_count
+        print(f"Migrated {migrated} records ({unparsed} could not be parsed)...")
+
+    print(f"Migration finished: {migrated} records updated, {unparsed} left without a Timestamp")
+    return migrated, unparsed
+
+if __name__ == "__main__":
+    from database_record import get_db
+
+    parser = argparse.ArgumentParser(description="Attendance storage maintenance")
+    parser.add_argument("--migrate", action="store_true", help="add native timestamps to string-dated records")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    db, attendance_collection, students_collection, db_connected = get_db()
+    if not db_connected:
+        print("Cannot run maintenance: MongoDB is not reachable.")
+    else:
+        ensure_attendance_indexes(attendance_collection)
+        if args.migrate:
+            migrate_string_dates(attendance_collection, args.batch_size)
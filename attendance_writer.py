@@ -0,0 +1,208 @@
+import threading
+import queue
+import time
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, PyMongoError
+from occupancy import apply_occupancy
+from metrics import metrics
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Function to insert a batch of records, treating duplicate _ids as already stored
+# Stored records are then applied to the occupancy view, if one is given.
+# Returns the indexes of records MongoDB rejected; raises PyMongoError if the server is unreachable
+def insert_batch(attendance_collection, records, occupancy_collection=None):
+    rejected = set()
+    with metrics.timer("db_write"):
+        try:
+            attendance_collection.insert_many(records, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") != DUPLICATE_KEY_ERROR:
+                    print(f"❌ Attendance record rejected by MongoDB: {error.get('errmsg')}")
+                    rejected.add(error["index"])
+
+        if occupancy_collection is not None:
+            apply_occupancy(occupancy_collection, [record for i, record in enumerate(records) if i not in rejected])
+    return rejected
+
+# Background writer that batches attendance records into insert_many calls
+# insert_one() has the same call shape as a pymongo collection, so record_attendance() can use either.
+# Records get their _id before queueing, so a retried batch that already reached the server shows up
+# as duplicate-key errors and is counted as acknowledged instead of being inserted twice.
+#
+# With a journal, every record is committed locally first and the journal itself is the queue:
+# nothing is dropped while MongoDB is down (or attendance_collection is None), and the backlog is
+# replayed in bulk once writes succeed again. If MongoDB was unreachable at startup, connect() is
+# retried from the writer thread with the same backoff; it returns (attendance_collection,
+# occupancy_collection) or None.
+class AttendanceWriter:
+    def __init__(self, attendance_collection, journal=None, occupancy_collection=None, batch_size=50,
+                 flush_interval=0.5, max_retries=5, retry_backoff=0.5, max_backoff=30.0, max_queue=10000,
+                 connect=None):
+        self.attendance_collection = attendance_collection
+        self.journal = journal
+        self.occupancy_collection = occupancy_collection
+        self.connect = connect
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval  # seconds a record may wait for its batch to fill
+        self.max_retries = max_retries  # only used without a journal; journaled records retry until stored
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._acknowledged = 0
+        self._failed = 0
+        self._in_flight = 0
+        self._delay = retry_backoff
+        self._next_connect = 0.0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    # Queue a record for writing; never waits on MongoDB
+    def insert_one(self, record):
+        record.setdefault("_id", ObjectId())
+        if self.journal:
+            self.journal.append(record)
+            self._wakeup.set()
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._failed += 1
+            raise RuntimeError("Attendance write queue is full")
+
+    # Counts for the UI: acknowledged by MongoDB, given up on, and still waiting
+    def stats(self):
+        with self._lock:
+            pending = self._queue.qsize() + self._in_flight
+            if self.journal:
+                pending = self.journal.pending_count()
+            return {
+                "acknowledged": self._acknowledged,
+                "failed": self._failed,
+                "pending": pending
+            }
+
+    def _run(self):
+        while True:
+            self._reconnect()
+            if self.journal:
+                if not self._flush_journal() and not self._running:
+                    break
+                continue
+
+            batch = self._next_batch()
+            if batch:
+                with self._lock:
+                    self._in_flight = len(batch)
+                self._write_with_retry(batch)
+                with self._lock:
+                    self._in_flight = 0
+            elif not self._running:
+                break
+
+    # Collect up to batch_size records, waiting at most flush_interval after the first one
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_with_retry(self, batch):
+        attempt = 0
+        delay = self.retry_backoff
+        while True:
+            try:
+                rejected = insert_batch(self.attendance_collection, batch, self.occupancy_collection)
+                self._count(acknowledged=len(batch) - len(rejected), failed=len(rejected))
+                return
+            except PyMongoError as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    self._count(failed=len(batch))
+                    print(f"❌ Giving up on {len(batch)} attendance records after {self.max_retries} retries: {str(e)}")
+                    return
+                print(f"⚠ Attendance write failed ({str(e)}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+
+    # Send the oldest un-synced journal events; returns True if it made progress
+    def _flush_journal(self):
+        batch = self.journal.unsynced(self.batch_size) if self.attendance_collection is not None else []
+
+        # Give a partial batch a moment to fill, unless we are draining a backlog or shutting down
+        if len(batch) < self.batch_size and self._running:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self.attendance_collection is not None:
+                batch = self.journal.unsynced(self.batch_size)
+        if not batch:
+            return False
+
+        seqs = [seq for seq, _ in batch]
+        try:
+            rejected = insert_batch(self.attendance_collection, [record for _, record in batch],
+                                    self.occupancy_collection)
+        except PyMongoError as e:
+            if self._running:
+                print(f"⚠ Attendance write failed ({str(e)}), {len(batch)} events kept in journal, retrying in {self._delay:.1f}s...")
+                time.sleep(self._delay)
+                self._delay = min(self._delay * 2, self.max_backoff)
+            return False
+
+        self._delay = self.retry_backoff
+        self.journal.mark_rejected([seqs[i] for i in rejected])
+        self.journal.mark_synced([seq for i, seq in enumerate(seqs) if i not in rejected])
+        self._count(acknowledged=len(batch) - len(rejected), failed=len(rejected))
+        return True
+
+    # Connect to MongoDB from the writer thread when it was unreachable at startup
+    def _reconnect(self):
+        if self.attendance_collection is not None or self.connect is None or not self._running:
+            return
+        if time.time() < self._next_connect:
+            return
+        try:
+            collections = self.connect()
+        except PyMongoError as e:
+            print(f"⚠ MongoDB still unreachable ({str(e)}), retrying in {self._delay:.1f}s...")
+            collections = None
+        if collections is None:
+            self._next_connect = time.time() + self._delay
+            self._delay = min(self._delay * 2, self.max_backoff)
+            return
+        self.attendance_collection, self.occupancy_collection = collections
+        self._delay = self.retry_backoff
+        print("✅ Attendance writer connected to MongoDB")
+
+    def _count(self, acknowledged=0, failed=0):
+        with self._lock:
+            self._acknowledged += acknowledged
+            self._failed += failed
+
+    # Stop accepting work and flush what is queued
+    def stop(self, timeout=10.0):
+        self._running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
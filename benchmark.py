@@ -0,0 +1,297 @@
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import cv2
+from gallery_store import GALLERY_STORE_PATH, ENCODING_SIZE, load_gallery_store, gallery_to_lists, encode_face_image
+from face_matcher import create_matcher, MATCHER_MODES
+from gallery_mmap import MappedGallery, save_mapped_gallery, GALLERY_DTYPES
+from face_detectors import create_detector, HaarDetector, RoiDetector, DETECTOR_BACKENDS
+from face_encoder import FaceEncoder
+from face_quality import FaceQualityScorer
+from database_record import process_frame
+from metrics import metrics
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+# Benchmark stage -> stage timer recorded by the recognition path (see metrics.py)
+STAGE_TIMERS = {"resize": "resize", "detect": "detect", "quality": "quality", "convert": "convert_rgb",
+                "encode": "encode", "match": "match"}
+STAGES = list(STAGE_TIMERS) + ["total"]
+UNKNOWN_LABELS = {"unknown", "Unknown"}
+
+# Headless benchmark of the recognition path: every frame goes through the gate's own
+# process_frame() (resize -> detect -> quality -> encode -> match), and the stage times are the
+# ones its metrics timers record. Frames are decoded into memory up front, so disk I/O is not
+# part of the timings.
+#
+# Ground truth for an image directory comes from the layout:
+#   images/<Name>/*.jpg   -> every image in the folder shows <Name>
+#   images/<Name>.jpg     -> the file name is the student's name (the FACE_IMAGES_DIR layout)
+#   images/unknown/*.jpg  -> people who are not in the gallery and should come out as "Unknown"
+# A video gets a single label for all frames with --label. Photos used to enroll the gallery
+# (--enroll) are left out of the evaluated frames, so accuracy is measured on unseen photos.
+
+# Function to list the images under a directory with their ground-truth names
+def load_image_frames(image_dir):
+    frames = []
+    for root, _, files in os.walk(image_dir):
+        for file_name in sorted(files):
+            if not file_name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(root, file_name)
+            if os.path.normpath(root) == os.path.normpath(image_dir):
+                label = os.path.splitext(file_name)[0]
+            else:
+                label = os.path.basename(root)
+            frame = cv2.imread(path)
+            if frame is None:
+                print(f"⚠ Warning: Could not read {path}, skipping")
+                continue
+            frames.append({"frame": frame, "label": label, "path": path})
+    return frames
+
+# Function to decode a video file into memory
+def load_video_frames(video_path, label=None, max_frames=None):
+    frames = []
+    video_capture = cv2.VideoCapture(video_path)
+    while max_frames is None or len(frames) < max_frames:
+        ret, frame = video_capture.read()
+        if not ret:
+            break
+        frames.append({"frame": frame, "label": label, "path": f"{video_path}#{len(frames)}"})
+    video_capture.release()
+    return frames
+
+# Function to build the gallery: the stored gallery, or one enrolled photo per labelled folder
+# Returns the names, the encodings and the paths of the photos that were enrolled
+def load_benchmark_gallery(gallery_path=None, enroll_dir=None):
+    known_face_names, known_face_encodings = [], []
+    enrolled_paths = set()
+    if enroll_dir:
+        for name in sorted(os.listdir(enroll_dir)):
+            person_dir = os.path.join(enroll_dir, name)
+            if not os.path.isdir(person_dir) or name in UNKNOWN_LABELS:
+                continue
+            for file_name in sorted(os.listdir(person_dir)):
+                if not file_name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                path = os.path.join(person_dir, file_name)
+                encoding = encode_face_image(path, name)
+                if encoding is not None:
+                    known_face_names.append(name)
+                    known_face_encodings.append(encoding)
+                    enrolled_paths.add(os.path.abspath(path))
+                    break
+    elif gallery_path and os.path.exists(gallery_path):
+        known_face_names, known_face_encodings = gallery_to_lists(load_gallery_store(gallery_path))
+    return known_face_names, known_face_encodings, enrolled_paths
+
+# Function to drop the enrolled photos from the frames to evaluate
+def exclude_enrolled(frames, enrolled_paths):
+    return [item for item in frames if os.path.abspath(item["path"]) not in enrolled_paths]
+
+# Function to pad the gallery with random distractor encodings to measure matching at scale
+# They are spread like real encodings but sit far from any real face, so they cost time without
+# changing who is recognized
+def add_synthetic_identities(known_face_names, known_face_encodings, count, seed=0):
+    if count <= 0:
+        return known_face_names, known_face_encodings
+    rng = np.random.default_rng(seed)
+    scale = np.std(known_face_encodings) if known_face_encodings else 0.09
+    synthetic = rng.normal(0.0, scale, size=(count, ENCODING_SIZE))
+    names = list(known_face_names) + [f"synthetic_{i}" for i in range(count)]
+    return names, list(known_face_encodings) + list(synthetic)
+
+# Function to run one frame through the gate's process_frame(), timing each stage in milliseconds
+# Stage times are read back from the metrics timers the recognition path records
+def run_frame(frame, face_matcher, face_detector, scale, face_encoder=None, face_scorer=None):
+    before = metrics.stage_totals()
+    start = time.perf_counter()
+    result = process_frame(frame, face_matcher, scale, face_detector=face_detector, face_encoder=face_encoder,
+                           face_scorer=face_scorer)
+    end = time.perf_counter()
+    after = metrics.stage_totals()
+
+    timings = {stage: (after.get(timer, 0.0) - before.get(timer, 0.0)) * 1000
+               for stage, timer in STAGE_TIMERS.items()}
+    timings["total"] = (end - start) * 1000
+    return result, timings
+
+# Function to pick the prediction for a frame: the name on the largest detected face
+def frame_prediction(result):
+    face_locations = result["face_locations"]
+    if not face_locations:
+        return None
+    areas = [(bottom - top) * (right - left) for top, right, bottom, left in face_locations]
+    return result["face_names"][int(np.argmax(areas))]
+
+# Function to benchmark one combination of settings over all frames
+# scale_factor and min_neighbors apply to the Haar backend; other backends use their defaults.
+# model and num_jitters apply to the crop encoder; the "full" path uses the library defaults
+def run_benchmark(frames, known_face_names, known_face_encodings, scale=0.3, scale_factor=1.3,
+                  min_neighbors=5, tolerance=0.6, matcher_mode="exact", warmup=3, repeat=1, detector="haar", roi=False,
+                  encoder="crop", model="small", num_jitters=1, quality=False):
+    if matcher_mode.startswith("mapped-"):
+        # Memory-mapped gallery in the given dtype (gallery_mmap.py), written to a temporary file
+        mapped_path = os.path.join(tempfile.gettempdir(), "benchmark_gallery.map")
+        save_mapped_gallery(list(range(len(known_face_names))), known_face_names, known_face_encodings,
+                            mapped_path, matcher_mode[len("mapped-"):])
+        face_matcher = MappedGallery(mapped_path).matcher(tolerance=tolerance)
+    else:
+        face_matcher = create_matcher(known_face_encodings, known_face_names, mode=matcher_mode, tolerance=tolerance)
+    if detector == "haar":
+        face_detector = HaarDetector(scale_factor=scale_factor, min_neighbors=min_neighbors)
+    else:
+        face_detector = create_detector(detector)
+    if roi:
+        face_detector = RoiDetector(face_detector)
+    face_encoder = FaceEncoder(model=model, num_jitters=num_jitters) if encoder == "crop" else None
+    face_scorer = FaceQualityScorer() if quality else None
+    known_names = set(known_face_names)
+
+    # Warm-up frames load the dlib models and fill caches; they are not counted
+    for item in frames[:warmup]:
+        run_frame(item["frame"], face_matcher, face_detector, scale, face_encoder, face_scorer)
+
+    stage_times = {stage: [] for stage in STAGES}
+    counts = {"frames": 0, "detected": 0, "encoded": 0, "correct": 0, "wrong": 0, "missed": 0, "rejected": 0, "false_accepts": 0}
+    wall_start = time.perf_counter()
+    for _ in range(repeat):
+        for item in frames:
+            result, timings = run_frame(item["frame"], face_matcher, face_detector, scale, face_encoder, face_scorer)
+            for stage in STAGES:
+                stage_times[stage].append(timings[stage])
+            counts["frames"] += 1
+            counts["encoded"] += sum(result["attempted"]) if len(face_matcher) > 0 else 0
+            prediction = frame_prediction(result)
+            if prediction is None:
+                continue
+            counts["detected"] += 1
+
+            label = item["label"]
+            if label is None:
+                continue
+            if label in UNKNOWN_LABELS or label not in known_names:
+                if prediction == "Unknown":
+                    counts["rejected"] += 1
+                else:
+                    counts["false_accepts"] += 1
+            elif prediction == label:
+                counts["correct"] += 1
+            elif prediction == "Unknown":
+                counts["missed"] += 1
+            else:
+                counts["wrong"] += 1
+    wall_time = time.perf_counter() - wall_start
+    face_detector.close()
+
+    labelled_known = counts["correct"] + counts["wrong"] + counts["missed"]
+    return {
+        "settings": {
+            "detector": detector + (" (roi)" if roi else ""), "scale": scale, "scale_factor": scale_factor, "min_neighbors": min_neighbors,
+            "tolerance": tolerance, "matcher": matcher_mode, "gallery_size": len(face_matcher),
+            "encoder": encoder, "landmarks": model if encoder == "crop" else "small",
+            "num_jitters": num_jitters if encoder == "crop" else 1, "quality_gate": quality
+        },
+        "fps": counts["frames"] / wall_time if wall_time > 0 else 0.0,
+        "stages_ms": {
+            stage: {
+                "mean": float(np.mean(values)),
+                "p50": float(np.percentile(values, 50)),
+                "p90": float(np.percentile(values, 90)),
+                "p99": float(np.percentile(values, 99))
+            }
+            for stage, values in stage_times.items() if values
+        },
+        "counts": counts,
+        "detection_rate": counts["detected"] / counts["frames"] if counts["frames"] else 0.0,
+        "scanned_fraction": face_detector.scanned_fraction if roi else 1.0,
+        "accuracy": counts["correct"] / labelled_known if labelled_known else None
+    }
+
+# Function to print one benchmark result as a small table
+def print_result(result):
+    settings = result["settings"]
+    print(f"\ndetector={settings['detector']} scale={settings['scale']} scaleFactor={settings['scale_factor']} minNeighbors={settings['min_neighbors']} "
+          f"tolerance={settings['tolerance']} matcher={settings['matcher']} gallery={settings['gallery_size']}")
+    print(f"  encoder={settings['encoder']} landmarks={settings['landmarks']} jitters={settings['num_jitters']} "
+          f"quality_gate={settings['quality_gate']}")
+    print(f"  {result['fps']:.1f} frames/sec, faces found in {result['detection_rate']:.1%} of frames, "
+          f"{result['scanned_fraction']:.1%} of the frame area scanned")
+    print(f"  {result['counts']['encoded']} faces encoded")
+    print(f"  {'stage':<8} {'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8}  (ms)")
+    for stage, stats in result["stages_ms"].items():
+        print(f"  {stage:<8} {stats['mean']:8.2f} {stats['p50']:8.2f} {stats['p90']:8.2f} {stats['p99']:8.2f}")
+    counts = result["counts"]
+    if result["accuracy"] is not None:
+        print(f"  accuracy {result['accuracy']:.1%} (correct {counts['correct']}, wrong {counts['wrong']}, "
+              f"missed {counts['missed']})")
+    if counts["rejected"] or counts["false_accepts"]:
+        print(f"  strangers: rejected {counts['rejected']}, false accepts {counts['false_accepts']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay images or a video through the recognition path and report speed and accuracy")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--images", help="directory of images (see the layout notes in benchmark.py)")
+    source.add_argument("--video", help="recorded video file")
+    parser.add_argument("--label", help="ground-truth name for every frame of --video")
+    parser.add_argument("--max-frames", type=int, help="stop reading the video after this many frames")
+    parser.add_argument("--gallery", default=GALLERY_STORE_PATH, help="gallery store to match against")
+    parser.add_argument("--enroll", help="build the gallery from the first photo in each <Name>/ folder of this directory instead")
+    parser.add_argument("--synthetic", type=int, default=0, help="add this many random distractor identities to the gallery")
+    parser.add_argument("--detector", nargs="+", default=["haar"], choices=sorted(DETECTOR_BACKENDS),
+                        help="face detector backend(s), see face_detectors.py")
+    parser.add_argument("--roi", action="store_true", help="search around the previous faces only (for --video)")
+    parser.add_argument("--encoder", nargs="+", default=["crop"], choices=["crop", "full"],
+                        help="encode from face crops (face_encoder.py) or from the whole converted frame")
+    parser.add_argument("--landmarks", nargs="+", default=["small"], choices=["small", "large"],
+                        help="dlib landmark model(s) used by the crop encoder")
+    parser.add_argument("--num-jitters", type=int, nargs="+", default=[1],
+                        help="re-samples per face by the crop encoder")
+    parser.add_argument("--quality", nargs="+", default=["on"], choices=["on", "off"],
+                        help="skip encoding faces that fail the quality checks in face_quality.py")
+    parser.add_argument("--scale", type=float, nargs="+", default=[0.3], help="downscale factor(s) applied before detection")
+    parser.add_argument("--scale-factor", type=float, nargs="+", default=[1.3], help="Haar cascade scaleFactor value(s)")
+    parser.add_argument("--min-neighbors", type=int, nargs="+", default=[5], help="Haar cascade minNeighbors value(s)")
+    parser.add_argument("--tolerance", type=float, nargs="+", default=[0.6], help="match tolerance value(s)")
+    parser.add_argument("--matcher", nargs="+", default=["exact"],
+                        choices=sorted(MATCHER_MODES) + [f"mapped-{dtype}" for dtype in GALLERY_DTYPES],
+                        help="in-memory matcher, or a memory-mapped gallery stored as mapped-<dtype>")
+    parser.add_argument("--warmup", type=int, default=3, help="frames run before timing starts")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the frames per setting")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    if args.images:
+        frames = load_image_frames(args.images)
+    else:
+        frames = load_video_frames(args.video, args.label, args.max_frames)
+    if not frames:
+        parser.error("no frames to benchmark")
+
+    known_face_names, known_face_encodings, enrolled_paths = load_benchmark_gallery(args.gallery, args.enroll)
+    if enrolled_paths:
+        frames = exclude_enrolled(frames, enrolled_paths)
+        print(f"{len(enrolled_paths)} enrollment photos left out of the evaluated frames")
+        if not frames:
+            parser.error("every frame was used for enrollment; add more photos per person")
+    known_face_names, known_face_encodings = add_synthetic_identities(known_face_names, known_face_encodings, args.synthetic)
+    print(f"Benchmarking {len(frames)} frames against {len(known_face_names)} gallery identities")
+
+    results = []
+    for detector, encoder, model, num_jitters, quality, scale, scale_factor, min_neighbors, tolerance, matcher_mode in itertools.product(
+            args.detector, args.encoder, args.landmarks, args.num_jitters, args.quality, args.scale, args.scale_factor,
+            args.min_neighbors, args.tolerance, args.matcher):
+        result = run_benchmark(frames, known_face_names, known_face_encodings, scale, scale_factor,
+                               min_neighbors, tolerance, matcher_mode, args.warmup, args.repeat, detector, args.roi,
+                               encoder, model, num_jitters, quality == "on")
+        print_result(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
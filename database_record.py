@@ -1,39 +1,42 @@
 import cv2
 import face_recognition
 from pymongo import MongoClient
-from datetime import datetime
+from pymongo.errors import PyMongoError
 import os
 import numpy as np
 import time
 import pyttsx3
 from collections import deque
 import threading
-import queue
+import argparse
+from gallery_watcher import GalleryWatcher
+from pipeline import LatestFrameCapture, RecognitionWorker
+from face_tracker import FaceTracker
+from face_detectors import create_detector
+from face_encoder import FaceEncoder, BufferPool
+from face_quality import FaceQualityScorer
+from motion_gate import MotionDetector, AdaptiveScheduler
+from attendance_writer import AttendanceWriter
+from attendance_journal import AttendanceJournal
+from roster_cache import RosterCache, ensure_student_indexes
+from occupancy import get_occupancy_collection, ensure_occupancy_indexes, warm_start_entry_state
+from attendance_store import build_attendance_record, ensure_attendance_indexes
+from metrics import metrics, MetricsServer, MetricsLogger, draw_metrics_overlay
+from preview import PreviewPublisher, MjpegServer
+from speech import Speaker, PRIORITY_FAILURE, PRIORITY_WELCOME, PRIORITY_INFO
+from manual_auth import ManualAuthDesk, ConsoleInput, ManualAuthServer
 
-# Global variables for threading
-speech_queue = queue.Queue()
-speech_thread_running = False
+# Folder holding the registered students' face photos
+FACE_IMAGES_DIR = r"E:\Projects\Hostel_Biometric\hostel_biometric_env"
 
-# Speech thread function
-def speech_thread_function(engine):
-    global speech_thread_running
-    speech_thread_running = True
-    while speech_thread_running:
-        try:
-            # Get text from queue with timeout to allow thread to exit
-            text = speech_queue.get(timeout=1.0)
-            if text == "EXIT":
-                break
-            engine.say(text)
-            engine.runAndWait()
-            speech_queue.task_done()
-        except queue.Empty:
-            continue
-        except Exception as e:
-            print(f"Error in speech thread: {str(e)}")
-    print("Speech thread exiting")
+# Students recognized when MongoDB is unavailable
+OFFLINE_STUDENTS = [
+    {"Name": "Snehil Singh", "Roll No": 22052509, "Face Registered": True},
+    {"Name": "Dev Mishra", "Roll No": 22052510, "Face Registered": True}
+]
 
 # Initialize text-to-speech engine
+# Returns a Speaker (speech.py) that owns the engine and its thread, or None without audio
 def init_voice_engine():
     try:
         engine = pyttsx3.init()
@@ -42,52 +45,96 @@ def init_voice_engine():
         engine.setProperty('volume', 0.9)  # Volume (0.0 to 1.0)
         
         # Start speech thread
-        speech_thread = threading.Thread(target=speech_thread_function, args=(engine,), daemon=True)
-        speech_thread.start()
-        
-        return engine
+        return Speaker(engine).start()
     except Exception as e:
         print(f"Warning: Could not initialize voice engine: {str(e)}")
         return None
 
 # Function to speak text without blocking
-def speak_text(engine, text):
+# Failures (PRIORITY_FAILURE) are spoken before welcomes; stale announcements are dropped
+def speak_text(engine, text, priority=PRIORITY_INFO):
     if engine:
         try:
-            # Add text to queue for speech thread to process
-            speech_queue.put(text)
+            engine.say(text, priority)
         except Exception as e:
             print(f"Error queuing text for speech: {str(e)}")
 
+MONGO_URI = "mongodb://localhost:27017/"
+SERVER_SELECTION_TIMEOUT_MS = 2000  # how long to wait for MongoDB before treating it as down
+
 # MongoDB connection setup
-def get_db():
+# MongoClient connects lazily, so the server is pinged here: a gate started while MongoDB is down
+# has to know it is offline, not fail on its first query once the server selection times out
+def get_db(uri=None):
     # connecting to the MongoDB Compass server
+    client = None
     try:
-        client = MongoClient("mongodb://localhost:27017/")
+        client = MongoClient(uri or MONGO_URI, serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS)
+        client.admin.command("ping")
         db = client["Hostel_Attendance"]  # Database for all hostel related data
         attendance_collection = db["Attendance_records"]  # collection to store attendance records
         students_collection = db["Students"]  # collection to store student information
         return db, attendance_collection, students_collection, True
     except Exception as e:
         print("Error: Could not connect to MongoDB:", e)
+        if client is not None:
+            client.close()
+        return None, None, None, False
+
+# Function to connect at startup and prepare the collections the gate uses
+# Returns (attendance_collection, students_collection, occupancy_collection, db_connected); when
+# MongoDB is unreachable the gate runs offline and the attendance writer connects later
+def open_database():
+    db, attendance_collection, students_collection, db_connected = get_db()
+    if not db_connected:
+        print("Failed to connect to MongoDB. Continuing without database functionality.")
+        return None, None, None, False
+    try:
+        # Initialize database if needed
+        init_database(students_collection)
+        ensure_attendance_indexes(attendance_collection)
+        occupancy_collection = get_occupancy_collection(db)
+        ensure_occupancy_indexes(occupancy_collection)
+    except PyMongoError as e:
+        print(f"⚠ Warning: MongoDB stopped responding during startup, continuing offline: {str(e)}")
         return None, None, None, False
+    return attendance_collection, students_collection, occupancy_collection, True
+
+# Function to create the in-memory student roster (the offline sample roster without MongoDB)
+def open_roster(students_collection):
+    if students_collection is not None:
+        return RosterCache(students_collection).load().start()
+    return RosterCache(None, seed_students=OFFLINE_STUDENTS)
+
+# Function to connect the attendance writer to MongoDB once it is reachable after a failed startup
+# Returns (attendance_collection, occupancy_collection), or None while MongoDB is still down
+def connect_attendance():
+    db, attendance_collection, students_collection, db_connected = get_db()
+    if not db_connected:
+        return None
+    ensure_attendance_indexes(attendance_collection)
+    occupancy_collection = get_occupancy_collection(db)
+    ensure_occupancy_indexes(occupancy_collection)
+    return attendance_collection, occupancy_collection
 
 # Pre-load the face cascade classifier to avoid loading it repeatedly
 face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
 
 # Function to detect faces using OpenCV's Haar cascade - optimized version
-def detect_faces(frame):
+def detect_faces(frame, scale_factor=1.3, min_neighbors=5):
     # Convert frame to grayscale for face detection
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    with metrics.timer("convert_gray"):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
     
     # Detect faces with optimized parameters
-    faces = face_cascade.detectMultiScale(
-        gray, 
-        scaleFactor=1.3,      # Higher value for faster detection but less accuracy
-        minNeighbors=5,       # Higher value means fewer false positives
-        minSize=(30, 30),     # Minimum face size
-        flags=cv2.CASCADE_SCALE_IMAGE  # Use image pyramid for better performance
-    )
+    with metrics.timer("detect"):
+        faces = face_cascade.detectMultiScale(
+            gray, 
+            scaleFactor=scale_factor,      # Higher value for faster detection but less accuracy
+            minNeighbors=min_neighbors,    # Higher value means fewer false positives
+            minSize=(30, 30),     # Minimum face size
+            flags=cv2.CASCADE_SCALE_IMAGE  # Use image pyramid for better performance
+        )
     
     # Return face locations in (top, right, bottom, left) format to match face_recognition library
     face_locations = []
@@ -97,48 +144,119 @@ def detect_faces(frame):
     return face_locations
 
 # Function to recognize faces - optimized version
-def recognize_faces(frame, known_face_encodings, known_face_names):
+# With a face tracker, faces keep stable track IDs and only tracks that need it are re-encoded
+# face_detector is any backend from face_detectors.py; without one the Haar cascade above is used
+# face_encoder (face_encoder.py) encodes from face crops; without one the whole frame is converted to RGB
+# face_scorer (face_quality.py) keeps blurry, tiny, badly lit or turned faces away from the encoder
+# The last list returned flags the faces that were a recognition attempt this frame
+def recognize_faces(frame, face_matcher, face_tracker=None, face_detector=None, face_encoder=None, face_scorer=None):
     # Detect faces using OpenCV
-    face_locations = detect_faces(frame)
+    face_locations = face_detector.detect(frame) if face_detector else detect_faces(frame)
     
     # If no faces are detected, return empty lists
     if not face_locations:
-        return [], []
-    
-    # Convert frame from BGR to RGB for face_recognition
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    
-    # Initialize face names
-    face_names = ["Unknown"] * len(face_locations)
+        if face_tracker:
+            face_tracker.update([])
+        return [], [], [], []
+    
+    # Score face quality before spending an encoder call on it
+    qualities = [None] * len(face_locations)
+    usable = [True] * len(face_locations)
+    if face_scorer:
+        with metrics.timer("quality"):
+            scores = [face_scorer.score(frame, box) for box in face_locations]
+        qualities = [score["quality"] for score in scores]
+        usable = [score["passed"] for score in scores]
+        for score in scores:
+            if not score["passed"]:
+                metrics.inc(f"faces_rejected_{score['reason']}")
+    
+    # Initialize face names and decide which faces need the encoder
+    if face_tracker:
+        tracks = face_tracker.update(face_locations)
+        face_names = [track.name for track in tracks]
+        track_ids = [track.track_id for track in tracks]
+        to_encode = [i for i, track in enumerate(tracks)
+                     if usable[i] and face_tracker.needs_encoding(track, quality=qualities[i])]
+        face_tracker.encoder_skips += len(face_locations) - len(to_encode)
+    else:
+        tracks = None
+        face_names = ["Unknown"] * len(face_locations)
+        track_ids = [None] * len(face_locations)
+        to_encode = [i for i in range(len(face_locations)) if usable[i]]
+    attempted = [False] * len(face_locations)
+    for i in to_encode:
+        attempted[i] = True
     
     # Try to use face_recognition if we have known faces
-    if known_face_encodings:
+    if len(face_matcher) > 0 and to_encode:
         try:
-            # Get face encodings for detected faces
-            face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+            if face_encoder:
+                # Convert and encode only the face regions
+                face_encodings = face_encoder.encode(frame, [face_locations[i] for i in to_encode])
+            else:
+                # Convert frame from BGR to RGB for face_recognition
+                with metrics.timer("convert_rgb"):
+                    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                
+                # Get face encodings for detected faces
+                with metrics.timer("encode"):
+                    face_encodings = face_recognition.face_encodings(rgb_frame, [face_locations[i] for i in to_encode])
+            if face_tracker:
+                face_tracker.encoder_calls += len(face_encodings)
             
-            # Compare each face with known faces
-            for i, face_encoding in enumerate(face_encodings):
-                try:
-                    # Compare with known faces
-                    matches = face_recognition.compare_faces(known_face_encodings, face_encoding, tolerance=0.6)
-                    
-                    # If a match is found, use the name of the first match
-                    if True in matches:
-                        first_match_index = matches.index(True)
-                        face_names[i] = known_face_names[first_match_index]
-                except Exception as e:
-                    print(f"Error comparing face {i}: {str(e)}")
+            # Match all faces against the gallery in one batched distance computation
+            with metrics.timer("match"):
+                matches = face_matcher.match(face_encodings)
+            for i, match in zip(to_encode, matches):
+                if tracks:
+                    face_tracker.assign_identity(tracks[i], match, quality=qualities[i])
+                    face_names[i] = tracks[i].name
+                else:
+                    face_names[i] = match["name"]
         except Exception as e:
             print(f"Error encoding faces: {str(e)}")
     
-    return face_locations, face_names
+    return face_locations, face_names, track_ids, attempted
+
+# Function to run recognition on a full-size frame (downscale, recognize, scale boxes back up)
+# With a face encoder, the downscaled frame is written into one of its reused buffers
+def process_frame(frame, face_matcher, scale=0.3, face_tracker=None, face_detector=None, face_encoder=None,
+                  face_scorer=None):
+    with metrics.timer("resize"):
+        if face_encoder:
+            size = (int(round(frame.shape[1] * scale)), int(round(frame.shape[0] * scale)))
+            small_frame = face_encoder.buffers.get("small_frame", (size[1], size[0]) + frame.shape[2:])
+            cv2.resize(frame, size, dst=small_frame)
+        else:
+            small_frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale)
+    face_locations, face_names, track_ids, attempted = recognize_faces(small_frame, face_matcher, face_tracker,
+                                                                       face_detector, face_encoder, face_scorer)
+    
+    # Scale face locations back to original size
+    face_locations = [(int(top / scale), int(right / scale), int(bottom / scale), int(left / scale)) 
+                     for top, right, bottom, left in face_locations]
+    return {
+        "face_locations": face_locations,
+        "face_names": face_names,
+        "track_ids": track_ids,
+        "attempted": attempted,
+        "active_track_ids": face_tracker.active_track_ids() if face_tracker else []
+    }
+
+# Function to create the configured face detector, falling back to the Haar cascade if it cannot load
+def load_face_detector(backend="haar", options=None):
+    try:
+        return create_detector(backend, **(options or {}))
+    except (OSError, cv2.error, ValueError) as e:
+        print(f"⚠ Warning: Could not load the '{backend}' face detector ({str(e)}), using Haar instead")
+        return create_detector("haar")
 
 # Function to verify student by roll number
-def verify_student_by_id(students_collection, roll_number):
+def verify_student_by_id(roster_cache, roll_number):
     try:
-        # Check if the roll number exists in the database
-        student = students_collection.find_one({"Roll No": roll_number})
+        # Check if the roll number exists in the roster (falls back to the database on a miss)
+        student = roster_cache.get_by_roll(roll_number)
         if student:
             return True, student["Name"]
         return False, None
@@ -147,13 +265,11 @@ def verify_student_by_id(students_collection, roll_number):
         return False, None
 
 # Function to handle manual authorization
-def manual_authorization(students_collection):
-    print("\n--- Manual Authorization Required ---")
-    roll_number = input("Please enter your Roll Number: ")
-    
+# roll_number is the text typed on the keypad, the console or the HTTP endpoint (see manual_auth.py)
+def manual_authorization(roster_cache, roll_number):
     try:
         # Verify the roll number
-        is_valid, name = verify_student_by_id(students_collection, int(roll_number))
+        is_valid, name = verify_student_by_id(roster_cache, int(roll_number))
         
         if is_valid:
             print(f"Authorization successful. Welcome, {name}!")
@@ -168,9 +284,9 @@ def manual_authorization(students_collection):
 # Function to add a new face to the database
 def register_new_face(frame, name, roll_number):
     try:
-        # Save the face image
-        filename = f"{name.replace(' ', '_')}.jpg"  # Use name as filename for easier loading
-        image_path = os.path.join(r"E:\Projects\Hostel_Biometric\hostel_biometric_env", filename)
+        # Save the face image under the name the gallery sync loads it from
+        filename = f"{name}.jpg"
+        image_path = os.path.join(FACE_IMAGES_DIR, filename)
         
         # Resize and save the image
         cv2.imwrite(image_path, frame)
@@ -181,39 +297,9 @@ def register_new_face(frame, name, roll_number):
         print(f"❌ Error registering new face: {str(e)}")
         return False
 
-# Function to load face encodings for known students
-def load_face_encodings(known_face_names):
-    known_face_encodings = []
-    base_path = r"E:\Projects\Hostel_Biometric\hostel_biometric_env"
-    
-    for name in known_face_names:
-        image_path = os.path.join(base_path, f"{name}.jpg")
-        
-        if os.path.exists(image_path):
-            try:
-                print(f"Loading image for {name}...")
-                image = face_recognition.load_image_file(image_path)
-                
-                try:
-                    # Try to get face encodings
-                    encodings = face_recognition.face_encodings(image)
-                    
-                    if encodings and len(encodings) > 0:
-                        known_face_encodings.append(encodings[0])
-                        print(f"✅ Successfully encoded face for {name}")
-                    else:
-                        print(f"⚠ Warning: No face detected in {image_path}. Skipping...")
-                except Exception as e:
-                    print(f"❌ Error encoding face for {name}: {str(e)}")
-            except Exception as e:
-                print(f"❌ Error loading image for {name}: {str(e)}")
-        else:
-            print(f"❌ Error: Image file '{image_path}' not found! Make sure it's in the correct folder.")
-    
-    return known_face_encodings
-
 # Function to initialize the database with sample data if needed
 def init_database(students_collection):
+    ensure_student_indexes(students_collection)
     if students_collection.count_documents({}) == 0:
         sample_students = [
             {"Name": "Snehil Singh", "Roll No": 22052509, "Face Registered": True},
@@ -225,18 +311,9 @@ def init_database(students_collection):
         print("Sample student data added to database.")
 
 # Function to record attendance in the database
-def record_attendance(attendance_collection, name, roll_no, method, entry_type):
-    attendance_time = datetime.now().strftime("%H:%M")
-    
-    attendance_record = {
-        "Name": name,
-        "Roll No": roll_no,
-        "Attendance": True,
-        "Date": datetime.now().strftime("%Y-%m-%d"),
-        "Time of Attendance": attendance_time,
-        "Method": method,
-        "Entry Type": entry_type
-    }
+# attendance_collection may be a pymongo collection or an AttendanceWriter, which queues the record
+def record_attendance(attendance_collection, name, roll_no, method, entry_type, camera=None):
+    attendance_record = build_attendance_record(name, roll_no, method, entry_type, camera)
     
     try:
         attendance_collection.insert_one(attendance_record)
@@ -247,36 +324,80 @@ def record_attendance(attendance_collection, name, roll_no, method, entry_type):
         return False
 
 # Function to handle unknown face authentication
-def handle_unknown_face(video_capture, display_frame, face_id, face_location, unknown_face_counters, 
-                        max_unknown_attempts, db_connected, students_collection, attendance_collection, 
-                        voice_engine, cooldown_duration, known_face_encodings, known_face_names, last_entry_time):
+# After max_unknown_attempts a manual authorization request is queued on auth_desk; it is answered
+# through its input channels while the camera loop keeps running (see process_manual_auth)
+def handle_unknown_face(display_frame, face_id, face_location, unknown_face_counters, max_unknown_attempts,
+                        db_connected, voice_engine, auth_desk):
     top, right, bottom, left = face_location
     
+    # While a request is open or just finished, the person at the desk is still unknown to the matcher
+    # (possibly under a new track): don't count, announce or ask again until the desk is free
+    if auth_desk.busy():
+        unknown_face_counters.pop(face_id, None)
+        return unknown_face_counters
+    
     # Track attempts for this unknown face
     if face_id not in unknown_face_counters:
         unknown_face_counters[face_id] = 1
     else:
         unknown_face_counters[face_id] += 1
     
-    # Display attempt count
-    attempt_text = f"Verifying... ({unknown_face_counters[face_id]}/{max_unknown_attempts})"
-    cv2.putText(display_frame, attempt_text, (left, bottom + 25), 
-              cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+    # Display attempt count (display_frame is None when this frame is not being rendered)
+    if display_frame is not None:
+        attempt_text = f"Verifying... ({unknown_face_counters[face_id]}/{max_unknown_attempts})"
+        cv2.putText(display_frame, attempt_text, (left, bottom + 25), 
+                  cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
     
-    # If max attempts reached, trigger manual authorization
+    # If max attempts reached, ask for manual authorization
     if unknown_face_counters[face_id] >= max_unknown_attempts:
-        # Pause video display
-        cv2.putText(display_frame, "Manual Authorization Required", (left, bottom + 40), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
-        cv2.imshow('Hostel Biometric System', display_frame)
-        cv2.waitKey(1)
+        unknown_face_counters[face_id] = 0
         
         # Voice feedback
-        speak_text(voice_engine, "Authentication failed")
+        speak_text(voice_engine, "Authentication failed", PRIORITY_FAILURE)
+        
+        if db_connected and auth_desk.open_request(face_id):
+            print("\n--- Manual Authorization Required ---")
+            print("Enter the Roll Number on the keypad, in this console or through the manual authorization endpoint")
+    
+    return unknown_face_counters
+
+# Function to finish a face registration from a captured frame
+# Runs on its own thread: encoding a full frame takes long enough to stall the camera loop
+# The manual authorization request stays open until the face is in the gallery
+def complete_registration(frame, name, roll_number, roster_cache, gallery_watcher, auth_desk=None, request=None):
+    try:
+        _complete_registration(frame, name, roll_number, roster_cache, gallery_watcher)
+    finally:
+        if auth_desk is not None:
+            auth_desk.close(request)
+
+def _complete_registration(frame, name, roll_number, roster_cache, gallery_watcher):
+    if register_new_face(frame, name, roll_number):
+        # Update database
+        roster_cache.set_face_registered(roll_number)
+        print("Face registered successfully!")
         
-        if db_connected:
-            # Perform manual authorization
-            is_authorized, auth_name, auth_roll = manual_authorization(students_collection)
+        # Store the encoding; the gallery watcher swaps in a matcher that includes it
+        try:
+            image_path = os.path.join(FACE_IMAGES_DIR, f"{name}.jpg")
+            image = face_recognition.load_image_file(image_path)
+            encodings = face_recognition.face_encodings(image)
+            if encodings and len(encodings) > 0:
+                gallery_watcher.add_face(roll_number, name, image_path, encodings[0])
+                print(f"✅ Added {name} to recognition database")
+            else:
+                print(f"⚠ Warning: No face found in the registration photo of {name}")
+        except Exception as e:
+            print(f"❌ Error adding face to recognition database: {str(e)}")
+
+# Function to apply the answers queued on the manual authorization desk
+# frame is the newest camera frame, used for the registration photo; returns (cooldown_info, last_entry_time)
+def process_manual_auth(auth_desk, frame, roster_cache, attendance_collection, voice_engine, cooldown_duration,
+                        gallery_watcher, last_entry_time):
+    cooldown_info = None
+    for event, request, text in auth_desk.poll():
+        if event == "roll":
+            is_authorized, auth_name, auth_roll = manual_authorization(roster_cache, text)
             
             if is_authorized:
                 # Determine entry type
@@ -285,17 +406,13 @@ def handle_unknown_face(video_capture, display_frame, face_id, face_location, un
                     entry_type = "Exit"
                 
                 # Record attendance
-                success = record_attendance(attendance_collection, auth_name, auth_roll, "Manual ID", entry_type)
-                
-                if success:
+                if record_attendance(attendance_collection, auth_name, auth_roll, "Manual ID", entry_type):
                     # Update last entry time and type
-                    current_time = time.time()
                     last_entry_time[auth_name] = {
-                        "time": current_time,
+                        "time": time.time(),
                         "type": entry_type
                     }
                     
-                    # Set cooldown info for return
                     cooldown_info = {
                         "active": True,
                         "end_time": time.time() + cooldown_duration,
@@ -304,45 +421,15 @@ def handle_unknown_face(video_capture, display_frame, face_id, face_location, un
                     }
                     
                     # Voice feedback
-                    speak_text(voice_engine, f"{entry_type} successful. Welcome, {auth_name}")
+                    speak_text(voice_engine, f"{entry_type} successful. Welcome, {auth_name}", PRIORITY_WELCOME)
                     
                     # Ask if user wants to register their face
-                    register_face = input("Would you like to register your face for future recognition? (y/n): ")
-                    if register_face.lower() == 'y':
-                        # Take a clear picture
-                        print("Please look at the camera for a clear picture...")
-                        for countdown in range(3, 0, -1):
-                            print(f"{countdown}...")
-                            time.sleep(1)
-                        
-                        # Capture frame for registration
-                        ret, reg_frame = video_capture.read()
-                        if ret:
-                            if register_new_face(reg_frame, auth_name, auth_roll):
-                                # Update database
-                                students_collection.update_one(
-                                    {"Roll No": auth_roll},
-                                    {"$set": {"Face Registered": True}}
-                                )
-                                print("Face registered successfully!")
-                                
-                                # Reload face encodings
-                                try:
-                                    image = face_recognition.load_image_file(os.path.join(
-                                        r"E:\Projects\Hostel_Biometric\hostel_biometric_env", f"{auth_name}.jpg"))
-                                    encodings = face_recognition.face_encodings(image)
-                                    if encodings and len(encodings) > 0:
-                                        known_face_encodings.append(encodings[0])
-                                        known_face_names.append(auth_name)
-                                        print(f"✅ Added {auth_name} to recognition database")
-                                except Exception as e:
-                                    print(f"❌ Error adding face to recognition database: {str(e)}")
-                        else:
-                            print("Failed to capture image for registration.")
-                    
-                    return cooldown_info, unknown_face_counters, known_face_encodings, known_face_names
+                    print("Would you like to register your face for future recognition? (y/n)")
+                    auth_desk.await_registration(request, auth_name, auth_roll)
+                    continue
             
             # If we get here, authentication failed
+            auth_desk.close(request)
             cooldown_info = {
                 "active": True,
                 "end_time": time.time() + cooldown_duration,
@@ -351,19 +438,36 @@ def handle_unknown_face(video_capture, display_frame, face_id, face_location, un
             }
             
             # Voice feedback
-            speak_text(voice_engine, "Authentication failed")
-            
-            # Reset counter for this face
-            unknown_face_counters[face_id] = 0
-            
-            return cooldown_info, unknown_face_counters, known_face_encodings, known_face_names
+            speak_text(voice_engine, "Authentication failed", PRIORITY_FAILURE)
+        
+        elif event == "register":
+            if text == "y":
+                print("Please look at the camera for a clear picture...")
+                speak_text(voice_engine, "Please look at the camera")
+                auth_desk.schedule_capture(request)
+            else:
+                auth_desk.close(request)
+        
+        elif event == "capture":
+            # Take the registration photo from the live pipeline; encoding happens off this thread
+            auth_desk.begin_registration(request)
+            threading.Thread(target=complete_registration,
+                             args=(frame.copy(), request.name, request.roll, roster_cache, gallery_watcher,
+                                   auth_desk, request),
+                             daemon=True).start()
+        
+        elif event == "timeout":
+            print("Manual authorization timed out.")
+        
+        elif event == "cancel":
+            print("Manual authorization cancelled.")
     
-    # If we didn't reach max attempts yet
-    return None, unknown_face_counters, known_face_encodings, known_face_names
+    return cooldown_info, last_entry_time
 
 # Function to handle known face authentication
-def handle_known_face(face_location, name, db_connected, students_collection, attendance_collection, 
-                     voice_engine, cooldown_duration, last_entry_time, min_entry_gap, display_frame):
+# camera (optional) is a camera config dict; a fixed "direction" overrides the Entry/Exit alternation
+def handle_known_face(face_location, name, roster_cache, attendance_collection, 
+                     voice_engine, cooldown_duration, last_entry_time, min_entry_gap, display_frame, camera=None):
     top, right, bottom, left = face_location
     current_time = time.time()
     
@@ -374,18 +478,21 @@ def handle_known_face(face_location, name, db_connected, students_collection, at
         can_mark_entry = time_since_last >= min_entry_gap
     
     # Mark attendance if recognized and enough time has passed
-    if db_connected and can_mark_entry:
-        # Get roll number from database
-        student = students_collection.find_one({"Name": name})
+    # (the attendance writer journals locally, so this also works while MongoDB is down)
+    if attendance_collection is not None and can_mark_entry:
+        # Get roll number from the in-memory roster
+        student = roster_cache.get_by_name(name)
         roll_no = student["Roll No"] if student else 0
         
         # Determine if this is an entry or exit
         entry_type = "Entry"  # Default
-        if name in last_entry_time and last_entry_time[name]["type"] == "Entry":
+        if camera and camera.get("direction"):
+            entry_type = camera["direction"]
+        elif name in last_entry_time and last_entry_time[name]["type"] == "Entry":
             entry_type = "Exit"
         
         # Record attendance
-        success = record_attendance(attendance_collection, name, roll_no, "Facial Recognition", entry_type)
+        success = record_attendance(attendance_collection, name, roll_no, "Facial Recognition", entry_type, camera)
         
         if success:
             # Update last entry time and type
@@ -403,11 +510,11 @@ def handle_known_face(face_location, name, db_connected, students_collection, at
             }
             
             # Voice feedback
-            speak_text(voice_engine, f"{entry_type} successful. Welcome, {name}")
+            speak_text(voice_engine, f"{entry_type} successful. Welcome, {name}", PRIORITY_WELCOME)
             
             return cooldown_info, last_entry_time
     
-    elif name in last_entry_time and not can_mark_entry:
+    elif name in last_entry_time and not can_mark_entry and display_frame is not None:
         # Show message that entry was too recent
         seconds_left = int(min_entry_gap - (current_time - last_entry_time[name]["time"]))
         wait_text = f"Please wait {seconds_left}s"
@@ -437,8 +544,34 @@ def display_cooldown(display_frame, cooldown_message, cooldown_color, cooldown_e
     cv2.putText(display_frame, countdown_text, (countdown_x, message_y + 40), 
               cv2.FONT_HERSHEY_SIMPLEX, 0.8, cooldown_color, 2)
 
+# Function to display the open manual authorization request (keypad prompt or registration countdown)
+def display_manual_auth(display_frame, auth_desk, now):
+    request = auth_desk.active
+    if request is None:
+        return
+    if request.step == "roll":
+        prompt = f"Manual Authorization - Roll No: {auth_desk.typed}_  (Enter to submit, Esc to cancel)"
+    elif request.step == "register":
+        prompt = f"{request.name}: register your face? (y/n)"
+    elif request.step == "registering":
+        prompt = f"Registering {request.name}..."
+    else:
+        prompt = f"Look at the camera... {int(request.capture_at - now) + 1}"
+    height = display_frame.shape[0]
+    cv2.rectangle(display_frame, (0, height - 65), (display_frame.shape[1], height - 25), (0, 0, 0), -1)
+    cv2.putText(display_frame, prompt, (10, height - 38),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+# Function to display attendance write status from the background writer
+def display_db_status(display_frame, stats):
+    status_text = f"DB saved: {stats['acknowledged']}  pending: {stats['pending']}  failed: {stats['failed']}"
+    color = (0, 0, 255) if stats["failed"] else (255, 255, 255)
+    cv2.putText(display_frame, status_text, (10, display_frame.shape[0] - 10), 
+              cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+
 # Main function
-def main():
+# headless: no window at all; preview_port: also publish annotated frames as MJPEG (at most preview_fps)
+def main(headless=False, preview_port=None, preview_fps=5.0, display_fps=15.0):
     print("Starting Hostel Biometric System...")
     start_time = time.time()
     
@@ -446,33 +579,42 @@ def main():
     voice_engine = init_voice_engine()
     
     # Connect to database
-    db, attendance_collection, students_collection, db_connected = get_db()
-    if not db_connected:
-        print("Failed to connect to MongoDB. Continuing without database functionality.")
-    else:
-        # Initialize database if needed
-        init_database(students_collection)
+    attendance_collection, students_collection, occupancy_collection, db_connected = open_database()
+    
+    # Student roster cached in memory and kept fresh in the background
+    roster_cache = open_roster(students_collection)
+    
+    # Attendance is journaled locally first, then sent by a background batch writer so MongoDB
+    # round-trips never stall the camera loop and an outage does not lose events
+    attendance_journal = AttendanceJournal()
+    attendance_writer = AttendanceWriter(attendance_collection, journal=attendance_journal,
+                                         occupancy_collection=occupancy_collection,
+                                         connect=None if db_connected else connect_attendance).start()
     
     # System parameters
-    last_entry_time = {}  # Track last entry time for each person
+    # Last entry/exit per person, restored from history so min_entry_gap and the Entry/Exit
+    # alternation survive a restart
+    last_entry_time = warm_start_entry_state(attendance_collection, occupancy_collection, attendance_journal)
     min_entry_gap = 60  # Minimum seconds between entries (1 minute)
-    unknown_face_counters = {}  # Track unknown faces and their attempt counts
+    unknown_face_counters = {}  # Track unknown faces (by track ID) and their attempt counts
     max_unknown_attempts = 5  # Maximum number of attempts before manual authorization
     cooldown_duration = 3.0  # 3 seconds cooldown
-    
-    # Get all students with registered faces
-    known_face_names = []
-    
-    # Loading student names
-    if db_connected:
-        registered_students = students_collection.find({"Face Registered": True})
-        for student in registered_students:
-            known_face_names.append(student["Name"])
-    else:
-        known_face_names = ["Snehil Singh", "Dev Mishra"]
-    
-    # Load face encodings
-    known_face_encodings = load_face_encodings(known_face_names)
+    matcher_mode = "exact"  # "ivf" for campus-scale galleries (approximate, see face_matcher.py)
+    matcher_options = {}  # e.g. {"nprobe": 8} to raise IVF recall at the cost of latency
+    detector_backend = "haar"  # "dnn" (needs the model files in models/) or "hog", see face_detectors.py
+    detector_options = {}  # e.g. {"profiles": True} for Haar, {"confidence": 0.6} for DNN, {"roi": True} to search around known faces
+    encoder_options = {"model": "small", "num_jitters": 1}  # "large" = 68-point landmarks; more jitters = steadier but slower
+    quality_options = {}  # e.g. {"min_sharpness": 50.0}, see face_quality.py (None to encode every face)
+    metrics_port = 9100  # Prometheus endpoint at http://127.0.0.1:9100/metrics (None to disable)
+    metrics_log_interval = 60.0  # Seconds between JSON metrics log lines (None to disable)
+    show_metrics = False  # Live FPS/latency overlay, toggled with 'm'
+    manual_auth_port = 8082  # Local HTTP endpoint for manual authorization answers (None to disable)
+    
+    # Load face encodings for students with registered faces (from the gallery store where possible)
+    # The watcher then follows the roster and swaps in a new matcher when students are added,
+    # re-photographed or removed, without restarting the gate
+    gallery_watcher = GalleryWatcher(roster_cache, FACE_IMAGES_DIR, matcher_mode=matcher_mode,
+                                     matcher_options=matcher_options).load().start()
     
     # Initialize camera
     print("Initializing camera...")
@@ -489,8 +631,6 @@ def main():
         exit()
     
     # Performance variables
-    frame_count = 0
-    process_every_n_frames = 8  # Process every 8th frame for better performance
     last_process_time = time.time()
     fps_values = deque(maxlen=10)
     processing_times = deque(maxlen=10)
@@ -501,20 +641,82 @@ def main():
     cooldown_message = ""
     cooldown_color = (0, 255, 0)  # Default green
     
-    # Create window
-    cv2.namedWindow('Hostel Biometric System', cv2.WINDOW_NORMAL)
+    # Pipeline stages: capture thread -> recognition worker -> render loop (this thread)
+    face_detector = load_face_detector(detector_backend, detector_options)
+    face_encoder = FaceEncoder(**encoder_options)  # Encodes from face crops in reused buffers
+    face_scorer = FaceQualityScorer(**quality_options) if quality_options is not None else None
+    face_tracker = FaceTracker()  # Gives faces stable IDs so the encoder only runs when needed
+    tracker_generation = [gallery_watcher.generation]
+    
+    def process_with_current_gallery(frame):
+        # Take the matcher once per frame: a reload replaces it whole, so a frame never sees a half-updated gallery
+        generation, face_matcher = gallery_watcher.current
+        if generation != tracker_generation[0]:
+            face_tracker.invalidate_identities()  # identities may refer to removed or re-photographed students
+            tracker_generation[0] = generation
+        return process_frame(frame, face_matcher, face_tracker=face_tracker, face_detector=face_detector,
+                             face_encoder=face_encoder, face_scorer=face_scorer)
+    
+    capture = LatestFrameCapture(video_capture).start()
+    recognition_worker = RecognitionWorker(process_with_current_gallery).start()
+    motion_detector = MotionDetector()  # Skips recognition while the doorway is empty and static
+    scheduler = AdaptiveScheduler(target_latency=0.25)  # Tunes the processing rate to the latency budget
+    last_frame_id = None
+    latest_faces = []  # (face_location, name, track_id, attempted) from the newest recognition result
+    
+    # Metrics: stage timings are recorded where they happen; queue depths and rates are read on export
+    metrics.set_gauge("speech_queue_depth", lambda: voice_engine.depth if voice_engine else 0)
+    metrics.set_gauge("attendance_pending", lambda: attendance_writer.stats()["pending"])
+    metrics.set_gauge("fps", lambda: np.mean(fps_values) if fps_values else 0.0)
+    metrics.set_gauge("frames_processed", lambda: scheduler.processed_frames)
+    metrics.set_gauge("frames_skipped", lambda: scheduler.skipped_frames)
+    metrics.set_gauge("encoder_calls", lambda: face_tracker.encoder_calls)
+    metrics.set_gauge("encoder_skips", lambda: face_tracker.encoder_skips)
+    metrics_server = MetricsServer(port=metrics_port).start() if metrics_port else None
+    metrics_logger = MetricsLogger(interval=metrics_log_interval).start() if metrics_log_interval else None
+    
+    # Display: a local window (unless headless) and/or a rate-limited MJPEG preview
+    # Frames are only copied and annotated when one of them is due to show a frame
+    window_open = not headless
+    if window_open:
+        cv2.namedWindow('Hostel Biometric System', cv2.WINDOW_NORMAL)
+    preview = PreviewPublisher(max_fps=preview_fps) if preview_port else None
+    preview_server = MjpegServer(preview, port=preview_port).start() if preview else None
+    display_interval = 1.0 / display_fps
+    last_display_time = 0
+    display_buffers = BufferPool()  # the display frame is drawn on a reused copy, not a new one each frame
+    
+    # Manual authorization: answered on the window keypad, in the console or over local HTTP,
+    # while recognition keeps running for everyone else at the gate
+    auth_desk = ManualAuthDesk()
+    ConsoleInput(auth_desk).start()
+    auth_server = ManualAuthServer(auth_desk, port=manual_auth_port).start() if manual_auth_port else None
+    
+    # Send a rendered frame wherever it is due; returns the key pressed in the window (or None)
+    def show_display(display_frame):
+        nonlocal last_display_time
+        if preview_due:
+            preview.publish(display_frame)
+        if window_due:
+            last_display_time = frame_start_time
+            cv2.imshow('Hostel Biometric System', display_frame)
+            return cv2.waitKey(1) & 0xFF
+        return None
     
     # Startup complete
     startup_time = time.time() - start_time
-    print(f"System initialized in {startup_time:.2f} seconds")
+    print(f"System initialized in {startup_time:.2f} seconds" + (" (headless, Ctrl+C to stop)" if headless else ""))
     
     try:
         while True:
-            # Capture frame
-            ret, frame = video_capture.read()
-            if not ret:
-                print("Error: Could not read frame")
-                break
+            # Wait for the next captured frame (the loop runs at camera rate)
+            frame_data = capture.wait_for_frame(last_frame_id)
+            if frame_data is None:
+                if capture.failed:
+                    print("Error: Could not read frame")
+                    break
+                continue
+            last_frame_id, frame, captured_at = frame_data
             
             # Timing
             frame_start_time = time.time()
@@ -523,77 +725,99 @@ def main():
             last_process_time = frame_start_time
             fps_values.append(min(instantaneous_fps, 60))
             
-            # Create display frame
-            display_frame = frame.copy()
-            cv2.putText(display_frame, "Hostel Biometric System", (10, 30), 
-                      cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            # Create a display frame only if the window or the preview will show it
+            window_due = window_open and frame_start_time - last_display_time >= display_interval
+            preview_due = preview is not None and preview.wants_frame(frame_start_time)
+            display_frame = None
+            if window_due or preview_due:
+                render_start = time.perf_counter()
+                display_frame = display_buffers.get("display", frame.shape)
+                np.copyto(display_frame, frame)
+                cv2.putText(display_frame, "Hostel Biometric System", (10, 30), 
+                          cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                display_db_status(display_frame, attendance_writer.stats())
+            
+            # Apply manual authorization answers (the registration photo is taken from this frame)
+            cooldown_info, last_entry_time = process_manual_auth(
+                auth_desk, frame, roster_cache, attendance_writer, voice_engine, cooldown_duration,
+                gallery_watcher, last_entry_time
+            )
+            if cooldown_info:
+                cooldown_active = cooldown_info["active"]
+                cooldown_end_time = cooldown_info["end_time"]
+                cooldown_message = cooldown_info["message"]
+                cooldown_color = cooldown_info["color"]
+            if display_frame is not None:
+                display_manual_auth(display_frame, auth_desk, frame_start_time)
             
             # Handle cooldown period
             if cooldown_active:
                 if frame_start_time < cooldown_end_time:
                     # Display cooldown message
-                    display_cooldown(display_frame, cooldown_message, cooldown_color, 
-                                   cooldown_end_time, frame_start_time)
-                    
-                    # Show frame and continue
-                    cv2.imshow('Hostel Biometric System', display_frame)
-                    if cv2.waitKey(1) & 0xFF == ord('q'):
-                        break
+                    if display_frame is not None:
+                        display_cooldown(display_frame, cooldown_message, cooldown_color, 
+                                       cooldown_end_time, frame_start_time)
+                        key = show_display(display_frame)
+                        if not auth_desk.handle_key(key) and key == ord('q'):
+                            break
                     continue
                 else:
                     # Cooldown period ended
                     cooldown_active = False
+                    latest_faces = []
             
-            # Only process every nth frame
-            frame_count += 1
-            if frame_count % process_every_n_frames != 0:
-                cv2.imshow('Hostel Biometric System', display_frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-                continue
-            
-            # Process frame for face recognition
-            process_start_time = time.time()
-            small_frame = cv2.resize(frame, (0, 0), fx=0.3, fy=0.3)
-            face_locations, face_names = recognize_faces(small_frame, known_face_encodings, known_face_names)
-            
-            # Scale face locations back to original size
-            face_locations = [(int(top / 0.3), int(right / 0.3), int(bottom / 0.3), int(left / 0.3)) 
-                             for top, right, bottom, left in face_locations]
+            # Hand the newest frame to the recognition worker when the scheduler wants one
+            # (stale frames are dropped, not queued)
+            motion = motion_detector.update(frame)
+            if scheduler.should_process(motion, bool(latest_faces), frame_start_time):
+                recognition_worker.submit(last_frame_id, frame, captured_at)
+                scheduler.mark_processed(frame_start_time)
             
-            # Record processing time
-            process_end_time = time.time()
-            processing_times.append(process_end_time - process_start_time)
+            # Pick up the newest finished result, ignoring frames captured before a cooldown ended
+            result = recognition_worker.get_result()
+            new_result = result is not None and result["timestamp"] >= cooldown_end_time
+            if new_result:
+                processing_times.append(result["latency"])
+                scheduler.record_latency(time.time() - result["timestamp"], result["latency"])
+                latest_faces = list(zip(result["face_locations"], result["face_names"], result["track_ids"],
+                                        result["attempted"]))
+                
+                # Forget attempt counters of tracks that have left the frame
+                active_tracks = {f"track_{track_id}" for track_id in result["active_track_ids"]}
+                unknown_face_counters = {face_id: count for face_id, count in unknown_face_counters.items()
+                                         if face_id in active_tracks}
             
-            # Process each detected face
-            for i, (face_location, name) in enumerate(zip(face_locations, face_names)):
+            # Draw the latest results on displayed frames, but act on each result only once
+            for face_location, name, track_id, attempted in latest_faces:
                 top, right, bottom, left = face_location
-                face_id = f"{left}_{top}_{right}_{bottom}"
+                face_id = f"track_{track_id}"
                 
                 # Draw rectangle around face
-                color = (0, 0, 255) if name == "Unknown" else (0, 255, 0)
-                cv2.rectangle(display_frame, (left, top), (right, bottom), color, 2)
-                cv2.putText(display_frame, name, (left, top - 10), 
-                          cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+                if display_frame is not None:
+                    color = (0, 0, 255) if name == "Unknown" else (0, 255, 0)
+                    cv2.rectangle(display_frame, (left, top), (right, bottom), color, 2)
+                    cv2.putText(display_frame, name, (left, top - 10), 
+                              cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+                
+                if not new_result:
+                    continue
                 
                 # Handle face based on recognition result
                 if name == "Unknown":
+                    # Only faces that went through the encoder this frame count as attempts
+                    # (poor-quality crops and tracks waiting for a better view do not)
+                    if not attempted:
+                        continue
+                    
                     # Handle unknown face
-                    cooldown_info, unknown_face_counters, known_face_encodings, known_face_names = handle_unknown_face(
-                        video_capture, display_frame, face_id, face_location, unknown_face_counters, 
-                        max_unknown_attempts, db_connected, students_collection, attendance_collection, 
-                        voice_engine, cooldown_duration, known_face_encodings, known_face_names, last_entry_time
+                    unknown_face_counters = handle_unknown_face(
+                        display_frame, face_id, face_location, unknown_face_counters, 
+                        max_unknown_attempts, db_connected, voice_engine, auth_desk
                     )
-                    
-                    if cooldown_info:
-                        cooldown_active = cooldown_info["active"]
-                        cooldown_end_time = cooldown_info["end_time"]
-                        cooldown_message = cooldown_info["message"]
-                        cooldown_color = cooldown_info["color"]
                 else:
                     # Handle known face
                     cooldown_info, last_entry_time = handle_known_face(
-                        face_location, name, db_connected, students_collection, attendance_collection, 
+                        face_location, name, roster_cache, attendance_writer, 
                         voice_engine, cooldown_duration, last_entry_time, min_entry_gap, display_frame
                     )
                     
@@ -603,29 +827,59 @@ def main():
                         cooldown_message = cooldown_info["message"]
                         cooldown_color = cooldown_info["color"]
             
-            # Clean up old face IDs periodically
-            if frame_count % 50 == 0:
-                unknown_face_counters = {}
-            
             # Display the frame
-            cv2.imshow('Hostel Biometric System', display_frame)
-            
-            # Check for exit
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
+            if display_frame is not None:
+                if show_metrics:
+                    draw_metrics_overlay(display_frame, np.mean(fps_values))
+                key = show_display(display_frame)
+                metrics.observe("render", time.perf_counter() - render_start)
+                
+                # Keys typed for an open manual authorization request go to the keypad
+                if auth_desk.handle_key(key):
+                    key = None
+                
+                # Check for exit ('m' toggles the metrics overlay)
+                if key == ord('q'):
+                    break
+                if key == ord('m'):
+                    show_metrics = not show_metrics
+    
+    except KeyboardInterrupt:
+        print("Stopping...")
     
     finally:
         # Clean up
+        if metrics_server:
+            metrics_server.stop()
+        if metrics_logger:
+            metrics_logger.stop()
+        if preview_server:
+            preview_server.stop()
+        if auth_server:
+            auth_server.stop()
+        recognition_worker.stop()
+        face_detector.close()
+        capture.stop()
+        gallery_watcher.stop()
+        roster_cache.stop()
+        attendance_writer.stop()
+        print("Attendance writer:", attendance_writer.stats())
+        attendance_journal.close()
         video_capture.release()
-        cv2.destroyAllWindows()
+        if window_open:
+            cv2.destroyAllWindows()
         
-        # Signal speech thread to exit
+        # Stop the speech thread (pending announcements are dropped)
         if voice_engine:
-            speech_thread_running = False
-            try:
-                speech_queue.put("EXIT")
-            except:
-                pass
+            voice_engine.stop()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Hostel Biometric System gate")
+    parser.add_argument("--headless", action="store_true", help="run without a window (e.g. as a service)")
+    parser.add_argument("--preview-port", type=int, help="serve an MJPEG preview on this local port (see kiosk.py)")
+    parser.add_argument("--preview-fps", type=float, default=5.0, help="maximum preview frame rate (default 5)")
+    parser.add_argument("--display-fps", type=float, default=15.0, help="maximum local window frame rate (default 15)")
+    args = parser.parse_args()
+
+    main(headless=args.headless, preview_port=args.preview_port, preview_fps=args.preview_fps,
+         display_fps=args.display_fps)
@@ -0,0 +1,244 @@
+import argparse
+import csv
+import multiprocessing
+import os
+import shutil
+import time
+import cv2
+import face_recognition
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+from gallery_store import GALLERY_STORE_PATH, hash_image_file, load_gallery_store, save_gallery_store
+from roster_cache import update_timestamp
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+MAX_IMAGE_SIDE = 1024  # ID photos are downscaled to this before detection; plenty for one frontal face
+
+# Bulk enrollment for a new intake of students
+# Photos are encoded across a process pool, each must contain exactly one face, and the results
+# go straight into the Students collection and the gallery store. Accepted photos are copied into
+# the face images folder as "<Name>.jpg", the layout the gate reloads them from.
+
+# Function to read enrollment rows from a CSV with "Roll No", "Name" and "Photo" columns
+# Relative photo paths are taken relative to the CSV file
+def read_enrollment_csv(csv_path):
+    base_dir = os.path.dirname(os.path.abspath(csv_path))
+    rows = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for line_no, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                rows.append({
+                    "Roll No": int(row["Roll No"]),
+                    "Name": row["Name"].strip(),
+                    "photo": os.path.join(base_dir, row["Photo"].strip())
+                })
+            except (KeyError, ValueError, AttributeError) as e:
+                print(f"⚠ Warning: Skipping line {line_no} of {csv_path}: {str(e)}")
+    return rows
+
+# Function to read enrollment rows from a folder of photos named "<Roll No>_<Name>.jpg"
+# Underscores in the name part become spaces ("22052513_Asha_Rao.jpg" -> 22052513, "Asha Rao")
+def read_enrollment_dir(photo_dir):
+    rows = []
+    for file_name in sorted(os.listdir(photo_dir)):
+        stem, extension = os.path.splitext(file_name)
+        if extension.lower() not in IMAGE_EXTENSIONS:
+            continue
+        roll_text, _, name = stem.partition("_")
+        if not roll_text.isdigit() or not name:
+            print(f"⚠ Warning: Skipping '{file_name}', expected <Roll No>_<Name>{extension}")
+            continue
+        rows.append({"Roll No": int(roll_text), "Name": name.replace("_", " ").strip(),
+                     "photo": os.path.join(photo_dir, file_name)})
+    return rows
+
+# Worker: encode one photo, rejecting anything but exactly one face
+# Runs in a pool process, so it takes and returns plain picklable values
+def encode_enrollment_photo(task):
+    row, known_hash, model = task
+    result = dict(row, encoding=None, reason=None)
+    try:
+        result["hash"] = hash_image_file(row["photo"])
+        if result["hash"] == known_hash:
+            result["reason"] = "unchanged"
+            return result
+
+        image = face_recognition.load_image_file(row["photo"])
+        longest_side = max(image.shape[:2])
+        if longest_side > MAX_IMAGE_SIDE:
+            factor = MAX_IMAGE_SIDE / longest_side
+            image = cv2.resize(image, (0, 0), fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+
+        face_locations = face_recognition.face_locations(image, model=model)
+        if len(face_locations) != 1:
+            result["reason"] = "no face found" if not face_locations else f"{len(face_locations)} faces found"
+            return result
+
+        result["encoding"] = face_recognition.face_encodings(image, face_locations)[0]
+    except Exception as e:
+        result["reason"] = f"could not read photo: {str(e)}"
+    return result
+
+# Function to drop rows that would collide: a roll number or name enrolled twice in the same batch
+def split_duplicates(rows):
+    roll_counts, name_counts = {}, {}
+    for row in rows:
+        roll_counts[row["Roll No"]] = roll_counts.get(row["Roll No"], 0) + 1
+        name_counts[row["Name"]] = name_counts.get(row["Name"], 0) + 1
+
+    unique, duplicates = [], []
+    for row in rows:
+        if roll_counts[row["Roll No"]] > 1:
+            duplicates.append(dict(row, reason="roll number listed more than once"))
+        elif name_counts[row["Name"]] > 1:
+            duplicates.append(dict(row, reason="name listed more than once (photos are stored by name)"))
+        else:
+            unique.append(row)
+    return unique, duplicates
+
+# Function to drop rows whose name already belongs to another registered student
+# Photos are stored as "<Name>.jpg", so enrolling a second "Asha Rao" would overwrite the first one's
+# photo. Names are checked against the Students collection (when connected) and the gallery store.
+def split_name_collisions(rows, students_collection, store):
+    owners = {entry["name"]: roll_no for roll_no, entry in store.items()}
+    if students_collection is not None and rows:
+        try:
+            for student in students_collection.find({"Name": {"$in": [row["Name"] for row in rows]}},
+                                                    {"Name": 1, "Roll No": 1}):
+                owners[student["Name"]] = student["Roll No"]
+        except PyMongoError as e:
+            print(f"⚠ Warning: Could not check names against Students: {str(e)}")
+
+    unique, collisions = [], []
+    for row in rows:
+        owner = owners.get(row["Name"])
+        if owner is not None and owner != row["Roll No"]:
+            collisions.append(dict(row, reason=f"name already registered to roll number {owner} "
+                                               f"(photos are stored by name)"))
+        else:
+            unique.append(row)
+    return unique, collisions
+
+# Function to copy an accepted photo into the face images folder under the name the gate loads
+def store_photo(row, image_dir):
+    destination = os.path.join(image_dir, f"{row['Name']}.jpg")
+    if os.path.splitext(row["photo"])[1].lower() in (".jpg", ".jpeg"):
+        if os.path.abspath(row["photo"]) != os.path.abspath(destination):
+            shutil.copy2(row["photo"], destination)
+    else:
+        if not cv2.imwrite(destination, cv2.imread(row["photo"])):
+            raise IOError(f"could not write {destination}")
+    return destination
+
+# Function to upsert enrolled students in bulk, keyed by roll number
+def upsert_students(students_collection, rows, batch_size=1000):
+    upserted = 0
+    for start in range(0, len(rows), batch_size):
+        updates = [
+            UpdateOne({"Roll No": row["Roll No"]},
+                      {"$set": {"Name": row["Name"], "Face Registered": True, "Updated At": update_timestamp()}},
+                      upsert=True)
+            for row in rows[start:start + batch_size]
+        ]
+        result = students_collection.bulk_write(updates, ordered=False)
+        upserted += result.upserted_count + result.modified_count
+    return upserted
+
+# Function to enroll a batch of students end to end; returns (accepted rows, rejected rows)
+def enroll_students(rows, students_collection, image_dir, store_path=GALLERY_STORE_PATH,
+                    workers=None, model="hog"):
+    start_time = time.time()
+    rows, rejected = split_duplicates(rows)
+    store = load_gallery_store(store_path, include_failed=True)
+    rows, collisions = split_name_collisions(rows, students_collection, store)
+    rejected.extend(collisions)
+
+    tasks = []
+    for row in rows:
+        cached = store.get(row["Roll No"])
+        # Only an encoded photo counts as unchanged; a cached photo without a face is checked again
+        known_hash = cached["hash"] if cached and cached["encoding"] is not None else None
+        tasks.append((row, known_hash, model))
+    accepted = []
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes=workers or os.cpu_count()) as pool:
+        for done, result in enumerate(pool.imap_unordered(encode_enrollment_photo, tasks, chunksize=8), start=1):
+            if result["reason"] == "unchanged":
+                result["encoding"] = store[result["Roll No"]]["encoding"]
+            if result["encoding"] is None:
+                rejected.append(result)
+            else:
+                accepted.append(result)
+            if done % 100 == 0:
+                print(f"Encoded {done}/{len(tasks)} photos...")
+
+    # Photos first, then the gallery store and Students, so a student is never marked
+    # registered without an encoding the gate can load
+    stored = []
+    for row in accepted:
+        try:
+            destination = store_photo(row, image_dir)
+        except (OSError, cv2.error) as e:
+            rejected.append(dict(row, encoding=None, reason=f"could not copy photo: {str(e)}"))
+            continue
+        stat = os.stat(destination)
+        store[row["Roll No"]] = {
+            "name": row["Name"],
+            "hash": row["hash"],
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "encoding": np.asarray(row["encoding"], dtype=np.float64)
+        }
+        stored.append(row)
+    save_gallery_store(store, store_path)
+
+    if students_collection is not None and stored:
+        try:
+            upserted = upsert_students(students_collection, stored)
+            print(f"Students collection updated: {upserted} students")
+        except PyMongoError as e:
+            print(f"❌ Error updating Students: {str(e)}. Re-run the enrollment once MongoDB is back "
+                  f"(unchanged photos are not re-encoded).")
+
+    print(f"Enrollment finished in {time.time() - start_time:.1f}s: {len(stored)} enrolled, {len(rejected)} rejected")
+    return stored, rejected
+
+# Function to write rejected rows to a CSV for follow-up
+def write_rejects(rejected, rejects_path):
+    with open(rejects_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Roll No", "Name", "Photo", "Reason"])
+        for row in rejected:
+            writer.writerow([row["Roll No"], row["Name"], row["photo"], row["reason"]])
+    print(f"Rejected photos listed in {rejects_path}")
+
+if __name__ == "__main__":
+    from database_record import get_db, FACE_IMAGES_DIR
+    from roster_cache import ensure_student_indexes
+
+    parser = argparse.ArgumentParser(description="Enroll a batch of students from ID photos")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dir", help='folder of photos named "<Roll No>_<Name>.jpg"')
+    source.add_argument("--csv", help='CSV with "Roll No", "Name" and "Photo" columns')
+    parser.add_argument("--image-dir", default=FACE_IMAGES_DIR, help="face images folder the gate loads photos from")
+    parser.add_argument("--gallery", default=GALLERY_STORE_PATH, help="gallery store to write encodings to")
+    parser.add_argument("--workers", type=int, help="encoding processes (default: one per CPU)")
+    parser.add_argument("--model", choices=["hog", "cnn"], default="hog", help="face detector used to validate photos")
+    parser.add_argument("--rejects", default="enrollment_rejects.csv", help="where to list rejected photos")
+    args = parser.parse_args()
+
+    rows = read_enrollment_csv(args.csv) if args.csv else read_enrollment_dir(args.dir)
+    print(f"Enrolling {len(rows)} students...")
+
+    db, attendance_collection, students_collection, db_connected = get_db()
+    if db_connected:
+        ensure_student_indexes(students_collection)
+    else:
+        students_collection = None
+        print("⚠ Warning: MongoDB is not reachable; only photos and the gallery store will be updated.")
+
+    stored, rejected = enroll_students(rows, students_collection, args.image_dir, args.gallery,
+                                       args.workers, args.model)
+    if rejected:
+        write_rejects(rejected, args.rejects)
@@ -1,8 +1,10 @@
 import cv2
+import time
+from motion_gate import MotionDetector, AdaptiveScheduler
+from face_detectors import create_detector
 
-# Loading pre-trained face detection model (Haar cascade)
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-profile_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_profileface.xml')
+# Haar cascades: frontal, profile and mirrored profile passes run concurrently, merged with non-max suppression
+face_detector = create_detector("haar", profiles=True, scale_factor=1.1, min_neighbors=5, min_size=(100, 100))
 
 # Starting the webcam
 cap = cv2.VideoCapture(0)
@@ -12,7 +14,10 @@ if not cap.isOpened():
     print("Error: Could not open video.")
     exit()
 
-frame_count = 0
+# Only run detection when the scene moves (or a face is still in view), at a rate tuned to the latency budget
+motion_detector = MotionDetector()
+scheduler = AdaptiveScheduler(target_latency=0.1)
+faces = []
 while True:
     # Frame-by-frame capturing
     ret, frame = cap.read()
@@ -20,30 +25,30 @@ while True:
         print("Error: Could not read frame")
         break
     
-    frame_count += 1
-    if frame_count % 3 != 0:  # Process every 3rd frame to reduce lag
-        continue
-    
     # Resizing frame to reduce processing time and lag
     frame = cv2.resize(frame, (640, 480))
+    
+    if not scheduler.should_process(motion_detector.update(frame), len(faces) > 0):
+        # Keep showing the last detection while the scene is static
+        if len(faces) > 0:
+            top, right, bottom, left = max(faces, key=lambda box: (box[1] - box[3]) * (box[2] - box[0]))
+            cv2.rectangle(frame, (left, top), (right, bottom), (255, 0, 0), 2)
+        cv2.imshow('Face Detection', frame)
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
+        continue
+    scheduler.mark_processed()
+    detect_start = time.time()
 
-    # Converting to grayscale as face detection works better on b/w images
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-    # Detecting faces
-    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(100, 100))
-
-    # If no frontal face detected, try profile face detection
-    if len(faces) == 0:
-        faces = profile_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(100, 100))
-        if len(faces) == 0:
-            flipped_gray = cv2.flip(gray, 1)  # Flip image for the opposite profile face
-            faces = profile_cascade.detectMultiScale(flipped_gray, scaleFactor=1.1, minNeighbors=5, minSize=(100, 100))
+    # Detecting faces (boxes in (top, right, bottom, left) order)
+    faces = face_detector.detect(frame)
+    
+    scheduler.record_latency(time.time() - detect_start)
     
     # Drawing a single box around the largest detected face
     if len(faces) > 0:
-        x, y, w, h = max(faces, key=lambda rect: rect[2] * rect[3])  # Select largest face
-        cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
+        top, right, bottom, left = max(faces, key=lambda box: (box[1] - box[3]) * (box[2] - box[0]))  # Select largest face
+        cv2.rectangle(frame, (left, top), (right, bottom), (255, 0, 0), 2)
     
     cv2.imshow('Face Detection', frame)
 
@@ -52,4 +57,5 @@ while True:
         break
     
 cap.release()
+face_detector.close()
 cv2.destroyAllWindows()
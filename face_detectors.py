@@ -0,0 +1,263 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+import face_recognition
+from metrics import metrics
+from face_encoder import BufferPool
+
+# Default model files for the OpenCV DNN backend (the res10 SSD face detector shipped with OpenCV's samples)
+DNN_MODEL_PATH = os.path.join("models", "res10_300x300_ssd_iter_140000.caffemodel")
+DNN_CONFIG_PATH = os.path.join("models", "deploy.prototxt")
+
+# Haar passes: (cascade file, run on the mirrored image). Profile cascades only see faces turned one
+# way, so the mirrored pass catches the other side.
+FRONTAL_PASS = ("haarcascade_frontalface_default.xml", False)
+PROFILE_PASSES = [("haarcascade_profileface.xml", False), ("haarcascade_profileface.xml", True)]
+
+# Interchangeable face detectors
+# Every backend takes a BGR frame and returns boxes in (top, right, bottom, left) order, the format
+# face_recognition uses. input_width shrinks the frame before detection (boxes are scaled back),
+# so each backend can run at the resolution it needs.
+
+# Function to suppress overlapping boxes, keeping the highest scoring one of each cluster
+# boxes are (top, right, bottom, left); returns the indexes to keep
+def non_max_suppression(boxes, scores, iou_threshold=0.3):
+    if len(boxes) == 0:
+        return []
+    boxes = np.asarray(boxes, dtype=np.float64)
+    top, right, bottom, left = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (right - left) * (bottom - top)
+    order = np.argsort(scores)[::-1]
+
+    keep = []
+    while order.size > 0:
+        best = order[0]
+        keep.append(int(best))
+        rest = order[1:]
+        inter_w = np.clip(np.minimum(right[best], right[rest]) - np.maximum(left[best], left[rest]), 0, None)
+        inter_h = np.clip(np.minimum(bottom[best], bottom[rest]) - np.maximum(top[best], top[rest]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / (areas[best] + areas[rest] - inter)
+        order = rest[iou <= iou_threshold]
+    return keep
+
+class FaceDetector:
+    def __init__(self, input_width=None):
+        self.input_width = input_width
+
+    def detect(self, frame):
+        scale = 1.0
+        if self.input_width and frame.shape[1] > self.input_width:
+            scale = self.input_width / frame.shape[1]
+            frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        image = self._prepare(frame)
+        with metrics.timer("detect"):
+            boxes = self._detect(image)
+        if scale != 1.0:
+            boxes = [tuple(int(v / scale) for v in box) for box in boxes]
+        return boxes
+
+    # Backend-specific conversion of the frame into the detector's input, timed outside "detect"
+    def _prepare(self, frame):
+        return frame
+
+    def _detect(self, image):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+# Haar cascades, optionally several passes (e.g. frontal + both profiles)
+# Passes run concurrently (OpenCV releases the GIL inside detectMultiScale) and their boxes are
+# merged with non-max suppression, scored by the number of neighbouring detections
+class HaarDetector(FaceDetector):
+    def __init__(self, passes=(FRONTAL_PASS,), scale_factor=1.3, min_neighbors=5, min_size=(30, 30),
+                 nms_threshold=0.3, input_width=None):
+        super().__init__(input_width)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+        self.nms_threshold = nms_threshold
+        # One classifier per pass: a classifier must not be used by two threads at once
+        self.passes = [(cv2.CascadeClassifier(cv2.data.haarcascades + cascade_file), mirrored)
+                       for cascade_file, mirrored in passes]
+        self._pool = ThreadPoolExecutor(max_workers=len(self.passes)) if len(self.passes) > 1 else None
+        self.buffers = BufferPool()
+
+    def _run_pass(self, cascade, mirrored, gray):
+        image = cv2.flip(gray, 1) if mirrored else gray
+        rects, neighbours = cascade.detectMultiScale2(
+            image,
+            scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors,
+            minSize=self.min_size,
+            flags=cv2.CASCADE_SCALE_IMAGE
+        )
+        width = gray.shape[1]
+        boxes = []
+        for (x, y, w, h) in rects:
+            if mirrored:
+                x = width - x - w
+            boxes.append((int(y), int(x + w), int(y + h), int(x)))
+        return boxes, list(neighbours)
+
+    def _prepare(self, frame):
+        with metrics.timer("convert_gray"):
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.buffers.get("gray", frame.shape[:2]))
+
+    def _detect(self, gray):
+        if self._pool is None:
+            results = [self._run_pass(cascade, mirrored, gray) for cascade, mirrored in self.passes]
+        else:
+            results = list(self._pool.map(lambda p: self._run_pass(p[0], p[1], gray), self.passes))
+
+        boxes = [box for pass_boxes, _ in results for box in pass_boxes]
+        scores = [score for _, pass_scores in results for score in pass_scores]
+        if len(self.passes) == 1:
+            return boxes
+        return [boxes[i] for i in non_max_suppression(boxes, scores, self.nms_threshold)]
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(wait=False)
+
+# OpenCV DNN detector (SSD-style output: [1, 1, N, 7] rows of image id, class, confidence, box)
+class DnnDetector(FaceDetector):
+    def __init__(self, model_path=DNN_MODEL_PATH, config_path=DNN_CONFIG_PATH, input_size=(300, 300),
+                 confidence=0.5, mean=(104.0, 177.0, 123.0), nms_threshold=0.3, input_width=None):
+        super().__init__(input_width)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"DNN face model not found: {model_path}")
+        self.net = cv2.dnn.readNet(model_path, config_path if config_path and os.path.exists(config_path) else "")
+        self.input_size = input_size
+        self.confidence = confidence
+        self.mean = mean
+        self.nms_threshold = nms_threshold
+
+    def _detect(self, frame):
+        height, width = frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(frame, 1.0, self.input_size, self.mean, swapRB=False, crop=False)
+        self.net.setInput(blob)
+        detections = self.net.forward().reshape(-1, 7)
+        detections = detections[detections[:, 2] >= self.confidence]
+
+        boxes, scores = [], []
+        for _, _, score, x1, y1, x2, y2 in detections:
+            left, top = max(0, int(x1 * width)), max(0, int(y1 * height))
+            right, bottom = min(width, int(x2 * width)), min(height, int(y2 * height))
+            if right > left and bottom > top:
+                boxes.append((top, right, bottom, left))
+                scores.append(float(score))
+        return [boxes[i] for i in non_max_suppression(boxes, scores, self.nms_threshold)]
+
+# dlib HOG detector, through face_recognition
+class HogDetector(FaceDetector):
+    def __init__(self, upsample=1, input_width=None):
+        super().__init__(input_width)
+        self.upsample = upsample
+
+    def _detect(self, frame):
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return face_recognition.face_locations(rgb_frame, number_of_times_to_upsample=self.upsample, model="hog")
+
+# Region-of-interest wrapper around any detector
+# While faces are in view only expanded windows around the previous boxes are searched; the whole
+# frame is scanned every full_scan_interval seconds (to find people who just walked in) and whenever
+# the windows come back with fewer faces than before. scanned_fraction reports the share of frame
+# area actually searched, averaged over all frames (a frame that falls back counts both passes).
+class RoiDetector(FaceDetector):
+    def __init__(self, detector, margin=0.5, full_scan_interval=1.0, nms_threshold=0.3):
+        super().__init__()
+        self.detector = detector
+        self.margin = margin  # window grows by this fraction of the box size on every side
+        self.full_scan_interval = full_scan_interval
+        self.nms_threshold = nms_threshold
+        self.full_scans = 0
+        self.roi_scans = 0
+        self._boxes = []
+        self._last_full_scan = 0.0
+        self._scanned_area = 0.0
+        self._frames = 0
+
+    @property
+    def scanned_fraction(self):
+        return self._scanned_area / self._frames if self._frames else 1.0
+
+    def _windows(self, height, width):
+        windows = []
+        for top, right, bottom, left in self._boxes:
+            pad_y = int((bottom - top) * self.margin)
+            pad_x = int((right - left) * self.margin)
+            windows.append((max(0, top - pad_y), min(width, right + pad_x),
+                            min(height, bottom + pad_y), max(0, left - pad_x)))
+        # Overlapping windows are searched once, as their bounding window; a merged window can reach
+        # one that was kept separate earlier, so merge again until nothing overlaps
+        merged = []
+        for window in sorted(windows, key=lambda w: w[3]):
+            while True:
+                for i, other in enumerate(merged):
+                    if window[3] < other[1] and other[3] < window[1] and window[0] < other[2] and other[0] < window[2]:
+                        window = (min(window[0], other[0]), max(window[1], other[1]),
+                                  max(window[2], other[2]), min(window[3], other[3]))
+                        del merged[i]
+                        break
+                else:
+                    break
+            merged.append(window)
+        return merged
+
+    def detect(self, frame):
+        now = time.time()
+        height, width = frame.shape[:2]
+        boxes = None
+        scanned = 0
+
+        if self._boxes and now - self._last_full_scan < self.full_scan_interval:
+            boxes = []
+            for top, right, bottom, left in self._windows(height, width):
+                scanned += (bottom - top) * (right - left)
+                for box in self.detector.detect(frame[top:bottom, left:right]):
+                    boxes.append((box[0] + top, box[1] + left, box[2] + top, box[3] + left))
+            if len(boxes) < len(self._boxes):
+                boxes = None  # lost a face: look everywhere this frame
+            else:
+                self.roi_scans += 1
+                keep = non_max_suppression(boxes, [(b[1] - b[3]) * (b[2] - b[0]) for b in boxes], self.nms_threshold)
+                boxes = [boxes[i] for i in keep]
+
+        if boxes is None:
+            boxes = self.detector.detect(frame)
+            scanned += height * width
+            self._last_full_scan = now
+            self.full_scans += 1
+
+        self._frames += 1
+        self._scanned_area += scanned / float(height * width)
+        metrics.set_gauge("detect_scanned_fraction", self.scanned_fraction)
+        self._boxes = list(boxes)
+        return boxes
+
+    def close(self):
+        self.detector.close()
+
+DETECTOR_BACKENDS = {
+    "haar": HaarDetector,
+    "dnn": DnnDetector,
+    "hog": HogDetector
+}
+
+# Function to build a detector by backend name; options are passed to the backend
+# ("haar" also accepts profiles=True for the frontal + both profile passes, and every backend accepts
+# roi=True, with roi_margin and full_scan_interval, to search around the previous faces only)
+def create_detector(backend="haar", **options):
+    if backend not in DETECTOR_BACKENDS:
+        raise ValueError(f"Unknown detector backend '{backend}', expected one of {sorted(DETECTOR_BACKENDS)}")
+    roi = options.pop("roi", False)
+    roi_options = {"margin": options.pop("roi_margin", 0.5),
+                   "full_scan_interval": options.pop("full_scan_interval", 1.0)}
+    if backend == "haar" and options.pop("profiles", False):
+        options["passes"] = [FRONTAL_PASS] + PROFILE_PASSES
+    face_detector = DETECTOR_BACKENDS[backend](**options)
+    return RoiDetector(face_detector, **roi_options) if roi else face_detector
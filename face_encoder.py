@@ -0,0 +1,50 @@
+import numpy as np
+import cv2
+import face_recognition
+from metrics import metrics
+
+# Reusable image buffers, so the per-frame path does not allocate
+# get() hands out a contiguous view of a flat buffer that only grows when a larger image arrives
+class BufferPool:
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, name, shape, dtype=np.uint8):
+        size = int(np.prod(shape))
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.size < size or buffer.dtype != dtype:
+            buffer = self._buffers[name] = np.empty(size, dtype=dtype)
+        return buffer[:size].reshape(shape)
+
+# Crop-first face encoder
+# Only the padded face regions are converted to RGB (into a reused buffer) and handed to dlib,
+# instead of converting the whole frame and letting dlib work on it. "small" is dlib's 5-point
+# landmark model (faster), "large" the 68-point one; num_jitters > 1 re-samples each face for a
+# slightly more stable encoding at a proportional cost.
+class FaceEncoder:
+    def __init__(self, model="small", num_jitters=1, padding=0.3):
+        self.model = model
+        self.num_jitters = num_jitters
+        self.padding = padding  # context kept around each box, as a fraction of its size
+        self.buffers = BufferPool()
+
+    # Encode the faces at face_locations (top, right, bottom, left) in a BGR frame
+    def encode(self, frame, face_locations):
+        height, width = frame.shape[:2]
+        encodings = []
+        for top, right, bottom, left in face_locations:
+            pad_y = int((bottom - top) * self.padding)
+            pad_x = int((right - left) * self.padding)
+            crop_top, crop_bottom = max(0, top - pad_y), min(height, bottom + pad_y)
+            crop_left, crop_right = max(0, left - pad_x), min(width, right + pad_x)
+
+            with metrics.timer("convert_rgb"):
+                crop_rgb = self.buffers.get("crop", (crop_bottom - crop_top, crop_right - crop_left, 3))
+                cv2.cvtColor(frame[crop_top:crop_bottom, crop_left:crop_right], cv2.COLOR_BGR2RGB, dst=crop_rgb)
+
+            # Box relative to the crop
+            local_box = (top - crop_top, right - crop_left, bottom - crop_top, left - crop_left)
+            with metrics.timer("encode"):
+                encodings.extend(face_recognition.face_encodings(
+                    crop_rgb, [local_box], num_jitters=self.num_jitters, model=self.model))
+        return encodings
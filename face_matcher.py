@@ -0,0 +1,261 @@
+import numpy as np
+
+ENCODING_SIZE = 128
+DEFAULT_TOLERANCE = 0.6
+
+# Nearest-neighbour matcher that keeps all known encodings in one contiguous matrix
+class FaceMatcher:
+    def __init__(self, known_face_encodings=None, known_face_names=None, tolerance=DEFAULT_TOLERANCE):
+        self.tolerance = tolerance
+        self._names = []
+        self._matrix = np.empty((0, ENCODING_SIZE), dtype=np.float64)
+        self._sq_norms = np.empty(0, dtype=np.float64)
+        self._count = 0
+
+        if known_face_encodings is not None and len(known_face_encodings) > 0:
+            self._matrix = np.array(known_face_encodings, dtype=np.float64).reshape(-1, ENCODING_SIZE)
+            self._sq_norms = np.einsum("ij,ij->i", self._matrix, self._matrix)
+            self._names = list(known_face_names)
+            self._count = len(self._names)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def names(self):
+        return list(self._names)
+
+    @property
+    def encodings(self):
+        return self._matrix[:self._count]
+
+    # Hook for index-based subclasses to rebuild after the gallery is replaced
+    def train(self):
+        pass
+
+    # Grow the backing matrix geometrically so repeated adds stay cheap
+    def _reserve(self, capacity):
+        if capacity <= self._matrix.shape[0]:
+            return
+        new_capacity = max(capacity, 2 * self._matrix.shape[0], 16)
+        matrix = np.empty((new_capacity, ENCODING_SIZE), dtype=np.float64)
+        sq_norms = np.empty(new_capacity, dtype=np.float64)
+        matrix[:self._count] = self._matrix[:self._count]
+        sq_norms[:self._count] = self._sq_norms[:self._count]
+        self._matrix = matrix
+        self._sq_norms = sq_norms
+
+    # Add a known face
+    def add(self, name, encoding):
+        self._reserve(self._count + 1)
+        row = np.asarray(encoding, dtype=np.float64)
+        self._matrix[self._count] = row
+        self._sq_norms[self._count] = row.dot(row)
+        self._names.append(name)
+        self._count += 1
+
+    # Remove every encoding registered under a name
+    def remove(self, name):
+        removed = 0
+        i = 0
+        while i < self._count:
+            if self._names[i] != name:
+                i += 1
+                continue
+            self._delete_row(i)
+            removed += 1
+        return removed
+
+    # Delete one row by swapping the last row into the hole
+    def _delete_row(self, i):
+        last = self._count - 1
+        if i != last:
+            self._matrix[i] = self._matrix[last]
+            self._sq_norms[i] = self._sq_norms[last]
+            self._names[i] = self._names[last]
+        self._names.pop()
+        self._count -= 1
+
+    # Squared distances between every query and every known encoding in one batched operation
+    def _squared_distances(self, queries):
+        gallery = self._matrix[:self._count]
+        query_sq = np.einsum("ij,ij->i", queries, queries)
+        distances = query_sq[:, None] + self._sq_norms[:self._count][None, :] - 2.0 * queries.dot(gallery.T)
+        np.maximum(distances, 0.0, out=distances)
+        return distances
+
+    # Find the closest known face for each query encoding
+    # Returns one dict per query: name ("Unknown" above tolerance), distance, and margin to the runner-up
+    def match(self, face_encodings):
+        if len(face_encodings) == 0:
+            return []
+
+        if self._count == 0:
+            return [{"name": "Unknown", "distance": float("inf"), "margin": 0.0, "index": -1}
+                    for _ in range(len(face_encodings))]
+
+        queries = np.asarray(face_encodings, dtype=np.float64).reshape(-1, ENCODING_SIZE)
+        return self._best_matches(self._squared_distances(queries), np.arange(self._count))
+
+    # Pick best and runner-up from a (queries x candidates) squared distance block
+    def _best_matches(self, sq_distances, candidate_ids):
+        rows = np.arange(sq_distances.shape[0])
+        if sq_distances.shape[1] > 1:
+            top2 = np.argpartition(sq_distances, 1, axis=1)[:, :2]
+            best = top2[:, 0]
+            second_distances = np.sqrt(sq_distances[rows, top2[:, 1]])
+        else:
+            best = np.zeros(sq_distances.shape[0], dtype=np.intp)
+            second_distances = np.full(sq_distances.shape[0], np.inf)
+        best_distances = np.sqrt(sq_distances[rows, best])
+
+        results = []
+        for row, col in enumerate(best):
+            index = int(candidate_ids[col])
+            distance = float(best_distances[row])
+            results.append({
+                "name": self._names[index] if distance <= self.tolerance else "Unknown",
+                "distance": distance,
+                "margin": float(second_distances[row] - distance),
+                "index": index
+            })
+        return results
+
+
+# Inverted-file (IVF) approximate matcher for campus-scale galleries
+# Encodings are partitioned into k-means clusters; each query only scans the rows in its
+# `nprobe` closest clusters, computing exact distances for those candidates.
+# Raising nprobe trades latency for recall (nprobe == n_lists is an exact scan).
+class IVFFaceMatcher(FaceMatcher):
+    def __init__(self, known_face_encodings=None, known_face_names=None, tolerance=DEFAULT_TOLERANCE,
+                 n_lists=None, nprobe=4, kmeans_iterations=15, min_train_size=1000, seed=0):
+        super().__init__(known_face_encodings, known_face_names, tolerance)
+        self.requested_n_lists = n_lists
+        self.nprobe = nprobe
+        self.kmeans_iterations = kmeans_iterations
+        self.min_train_size = min_train_size
+        self._rng = np.random.default_rng(seed)
+        self._centroids = None
+        self._list_ids = np.empty(self._matrix.shape[0], dtype=np.int32)
+        self._inverted = None
+        self._trained_count = 0
+        self.train()
+
+    # (Re)build the cluster partition from the current gallery
+    def train(self):
+        self._inverted = None
+        if self._count < self.min_train_size:
+            self._centroids = None
+            self._trained_count = self._count
+            return
+
+        data = self._matrix[:self._count]
+        n_lists = self.requested_n_lists or int(np.sqrt(self._count))
+        n_lists = max(1, min(n_lists, self._count))
+
+        centroids = data[self._rng.choice(self._count, n_lists, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            assignments = self._assign(data, centroids)
+            counts = np.bincount(assignments, minlength=n_lists)
+            order = np.argsort(assignments, kind="stable")
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            empty = counts == 0
+            sums = np.zeros_like(centroids)
+            sums[~empty] = np.add.reduceat(data[order], starts[~empty], axis=0)
+            centroids[~empty] = sums[~empty] / counts[~empty][:, None]
+            # Re-seed empty clusters with random gallery rows
+            if empty.any():
+                centroids[empty] = data[self._rng.choice(self._count, int(empty.sum()), replace=False)]
+
+        self._centroids = centroids
+        self._list_ids = np.empty(self._matrix.shape[0], dtype=np.int32)
+        self._list_ids[:self._count] = self._assign(data, centroids)
+        self._trained_count = self._count
+
+    # Nearest centroid for each row, in chunks to bound memory
+    @staticmethod
+    def _assign(data, centroids, chunk_size=4096):
+        centroid_sq = np.einsum("ij,ij->i", centroids, centroids)
+        assignments = np.empty(len(data), dtype=np.int32)
+        for start in range(0, len(data), chunk_size):
+            chunk = data[start:start + chunk_size]
+            distances = centroid_sq[None, :] - 2.0 * chunk.dot(centroids.T)
+            assignments[start:start + chunk_size] = np.argmin(distances, axis=1)
+        return assignments
+
+    # Row indices grouped by cluster, rebuilt lazily after adds/removes
+    def _inverted_lists(self):
+        if self._inverted is None:
+            list_ids = self._list_ids[:self._count]
+            order = np.argsort(list_ids, kind="stable")
+            bounds = np.searchsorted(list_ids[order], np.arange(len(self._centroids) + 1))
+            self._inverted = [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+        return self._inverted
+
+    def _reserve(self, capacity):
+        super()._reserve(capacity)
+        if self._list_ids.shape[0] < self._matrix.shape[0]:
+            list_ids = np.empty(self._matrix.shape[0], dtype=np.int32)
+            list_ids[:self._count] = self._list_ids[:self._count]
+            self._list_ids = list_ids
+
+    def add(self, name, encoding):
+        super().add(name, encoding)
+        if self._centroids is None:
+            if self._count >= self.min_train_size:
+                self.train()
+            return
+        # Retrain once the gallery has doubled since the clusters were built
+        if self._count >= 2 * self._trained_count:
+            self.train()
+            return
+        row = self._matrix[self._count - 1:self._count]
+        self._list_ids[self._count - 1] = self._assign(row, self._centroids)[0]
+        self._inverted = None
+
+    def _delete_row(self, i):
+        last = self._count - 1
+        if i != last:
+            self._list_ids[i] = self._list_ids[last]
+        super()._delete_row(i)
+        self._inverted = None
+
+    def match(self, face_encodings):
+        if self._centroids is None or len(face_encodings) == 0 or self._count == 0:
+            return super().match(face_encodings)
+
+        queries = np.asarray(face_encodings, dtype=np.float64).reshape(-1, ENCODING_SIZE)
+        nprobe = max(1, min(self.nprobe, len(self._centroids)))
+
+        # Coarse step: closest clusters for every query
+        centroid_distances = (np.einsum("ij,ij->i", self._centroids, self._centroids)[None, :]
+                              - 2.0 * queries.dot(self._centroids.T))
+        if nprobe < len(self._centroids):
+            probed = np.argpartition(centroid_distances, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probed = np.tile(np.arange(len(self._centroids)), (len(queries), 1))
+
+        # Exact re-rank over the union of candidate rows from the probed clusters
+        inverted = self._inverted_lists()
+        candidate_ids = np.concatenate([inverted[list_id] for list_id in np.unique(probed)])
+        if len(candidate_ids) == 0:
+            return super().match(face_encodings)
+
+        candidates = self._matrix[candidate_ids]
+        sq_distances = (np.einsum("ij,ij->i", queries, queries)[:, None]
+                        + self._sq_norms[candidate_ids][None, :]
+                        - 2.0 * queries.dot(candidates.T))
+        np.maximum(sq_distances, 0.0, out=sq_distances)
+        return self._best_matches(sq_distances, candidate_ids)
+
+
+MATCHER_MODES = {
+    "exact": FaceMatcher,
+    "ivf": IVFFaceMatcher
+}
+
+# Function to build a matcher for the selected mode ("exact" or "ivf")
+def create_matcher(known_face_encodings, known_face_names, mode="exact", **kwargs):
+    if mode not in MATCHER_MODES:
+        raise ValueError(f"Unknown matcher mode '{mode}', expected one of {sorted(MATCHER_MODES)}")
+    return MATCHER_MODES[mode](known_face_encodings, known_face_names, **kwargs)
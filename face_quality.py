@@ -0,0 +1,97 @@
+import numpy as np
+import cv2
+from face_encoder import BufferPool
+
+# Side of the grayscale patch the quality checks run on
+PATCH_SIZE = 64
+
+# Faces smaller than the patch are enlarged, which smooths them, so their Laplacian variance falls with
+# the face size: the same sharp face measured about 85, 134, 218 and 440 at 24, 30, 40 and 60 px
+# (skimage astronaut sample, downscaled), close to size ** 1.6. Below PATCH_SIZE the sharpness
+# thresholds are scaled by (size / PATCH_SIZE) ** SHARPNESS_SIZE_EXPONENT, so min_sharpness and
+# good_sharpness mean the same amount of blur at every face size.
+SHARPNESS_SIZE_EXPONENT = 1.6
+
+# Cheap face-quality scorer, run on each detection before the dlib encoder
+# Each check works on the face box downscaled to a small grayscale patch, so the cost does not
+# grow with the face size:
+#   size       - shortest side of the box (in pixels of the frame it was detected in)
+#   sharpness  - variance of the Laplacian; motion blur and defocus push it towards zero
+#                (thresholds are given for faces of at least PATCH_SIZE pixels, see above)
+#   brightness - mean intensity; rejects faces in shadow or against a bright window
+#   asymmetry  - difference between the left half and the mirrored right half, a rough yaw
+#                estimate (frontal faces are close to symmetric, turned faces are not)
+# score() returns the measurements, a combined quality in [0, 1] and the first failed check.
+class FaceQualityScorer:
+    def __init__(self, min_size=30, min_sharpness=100.0, good_sharpness=200.0, min_brightness=40,
+                 max_brightness=220, max_asymmetry=0.35, min_quality=0.1):
+        self.min_size = min_size
+        self.min_sharpness = min_sharpness
+        self.good_sharpness = good_sharpness  # sharpness at which a face counts as fully sharp
+        self.min_brightness = min_brightness
+        self.max_brightness = max_brightness
+        self.max_asymmetry = max_asymmetry
+        self.min_quality = min_quality
+        self.buffers = BufferPool()
+
+    def score(self, frame, face_location):
+        top, right, bottom, left = face_location
+        height, width = frame.shape[:2]
+        top, bottom = max(0, top), min(height, bottom)
+        left, right = max(0, left), min(width, right)
+        size = min(bottom - top, right - left)
+        if size <= 0:
+            return {"quality": 0.0, "passed": False, "reason": "size", "size": 0}
+
+        crop = frame[top:bottom, left:right]
+        gray = self.buffers.get("gray", crop.shape[:2])
+        cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY, dst=gray)
+        # Area averaging to shrink; linear to enlarge (nearest-style blocks would read as sharp edges)
+        patch = self.buffers.get("patch", (PATCH_SIZE, PATCH_SIZE))
+        cv2.resize(gray, (PATCH_SIZE, PATCH_SIZE), dst=patch,
+                   interpolation=cv2.INTER_AREA if size >= PATCH_SIZE else cv2.INTER_LINEAR)
+
+        sharpness = float(cv2.Laplacian(patch, cv2.CV_32F).var())
+        brightness = float(patch.mean())
+        half = PATCH_SIZE // 2
+        left_half = patch[:, :half].astype(np.float32)
+        right_half = patch[:, half:][:, ::-1].astype(np.float32)
+        asymmetry = float(np.abs(left_half - right_half).mean() / max(brightness, 1.0))
+
+        sharp_scale = 1.0 if size >= PATCH_SIZE else (size / float(PATCH_SIZE)) ** SHARPNESS_SIZE_EXPONENT
+        min_sharpness = self.min_sharpness * sharp_scale
+        good_sharpness = self.good_sharpness * sharp_scale
+
+        # Combined quality: each factor is 1 for a good face and falls towards 0
+        size_factor = min(1.0, size / (2.0 * self.min_size))
+        sharp_factor = min(1.0, sharpness / good_sharpness)
+        if brightness < self.min_brightness:
+            light_factor = brightness / self.min_brightness
+        elif brightness > self.max_brightness:
+            light_factor = (255.0 - brightness) / (255.0 - self.max_brightness)
+        else:
+            light_factor = 1.0
+        pose_factor = max(0.0, 1.0 - asymmetry / (2.0 * self.max_asymmetry))
+        quality = size_factor * sharp_factor * light_factor * pose_factor
+
+        reason = None
+        if size < self.min_size:
+            reason = "size"
+        elif sharpness < min_sharpness:
+            reason = "blur"
+        elif not self.min_brightness <= brightness <= self.max_brightness:
+            reason = "lighting"
+        elif asymmetry > self.max_asymmetry:
+            reason = "pose"
+        elif quality < self.min_quality:
+            reason = "quality"
+
+        return {
+            "quality": quality,
+            "passed": reason is None,
+            "reason": reason,
+            "size": size,
+            "sharpness": sharpness,
+            "brightness": brightness,
+            "asymmetry": asymmetry
+        }
@@ -0,0 +1,142 @@
+import time
+
+# Function to compute intersection-over-union of two (top, right, bottom, left) boxes
+def box_iou(box_a, box_b):
+    top = max(box_a[0], box_b[0])
+    right = min(box_a[1], box_b[1])
+    bottom = min(box_a[2], box_b[2])
+    left = max(box_a[3], box_b[3])
+    if right <= left or bottom <= top:
+        return 0.0
+    intersection = (right - left) * (bottom - top)
+    area_a = (box_a[1] - box_a[3]) * (box_a[2] - box_a[0])
+    area_b = (box_b[1] - box_b[3]) * (box_b[2] - box_b[0])
+    return intersection / float(area_a + area_b - intersection)
+
+# Function to get the centre point and diagonal length of a box
+def box_centre(box):
+    top, right, bottom, left = box
+    return (left + right) / 2.0, (top + bottom) / 2.0, ((right - left) ** 2 + (bottom - top) ** 2) ** 0.5
+
+# One tracked face with its cached identity
+class Track:
+    def __init__(self, track_id, box, now):
+        self.track_id = track_id
+        self.box = box
+        self.name = "Unknown"
+        self.distance = float("inf")
+        self.margin = 0.0
+        self.created_at = now
+        self.last_seen = now
+        self.last_encoded = None
+        self.best_quality = 0.0  # quality of the best crop encoded for this track so far
+        self.identity_quality = 0.0  # quality of the crop the current identity came from
+        self.hits = 1
+        self.missed = 0
+
+# Frame-to-frame tracker that gives detected faces stable IDs (IoU association with a centroid fallback)
+class FaceTracker:
+    def __init__(self, iou_threshold=0.3, max_centroid_shift=0.5, max_missed=5,
+                 reverify_interval=2.0, confident_distance=0.5, retry_interval=0.5):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_shift = max_centroid_shift  # fraction of the box diagonal
+        self.max_missed = max_missed  # processed frames a track survives without a detection
+        self.reverify_interval = reverify_interval  # seconds before a confident identity is re-encoded
+        self.confident_distance = confident_distance
+        self.retry_interval = retry_interval  # seconds before an uncertain track is retried with a crop no better than before
+        self.tracks = {}
+        self.encoder_calls = 0
+        self.encoder_skips = 0
+        self._next_id = 1
+
+    # Associate this frame's detections with existing tracks; returns one Track per detection, in order
+    def update(self, face_locations, now=None):
+        now = time.time() if now is None else now
+        candidates = []
+        for det_index, box in enumerate(face_locations):
+            det_x, det_y, det_diag = box_centre(box)
+            for track_id, track in self.tracks.items():
+                iou = box_iou(box, track.box)
+                if iou >= self.iou_threshold:
+                    candidates.append((1, iou, det_index, track_id))
+                    continue
+                track_x, track_y, track_diag = box_centre(track.box)
+                shift = ((det_x - track_x) ** 2 + (det_y - track_y) ** 2) ** 0.5
+                if shift <= self.max_centroid_shift * max(det_diag, track_diag):
+                    candidates.append((0, -shift, det_index, track_id))
+
+        # Greedy assignment: IoU matches first (highest overlap), then nearest centroids
+        candidates.sort(reverse=True)
+        assigned = [None] * len(face_locations)
+        used_tracks = set()
+        for _, _, det_index, track_id in candidates:
+            if assigned[det_index] is not None or track_id in used_tracks:
+                continue
+            track = self.tracks[track_id]
+            track.box = face_locations[det_index]
+            track.last_seen = now
+            track.hits += 1
+            track.missed = 0
+            assigned[det_index] = track
+            used_tracks.add(track_id)
+
+        # Age out tracks that were not seen
+        for track_id in list(self.tracks):
+            if track_id not in used_tracks:
+                self.tracks[track_id].missed += 1
+                if self.tracks[track_id].missed > self.max_missed:
+                    del self.tracks[track_id]
+
+        # Start new tracks for unmatched detections
+        for det_index, box in enumerate(face_locations):
+            if assigned[det_index] is None:
+                track = Track(self._next_id, box, now)
+                self._next_id += 1
+                self.tracks[track.track_id] = track
+                assigned[det_index] = track
+
+        return assigned
+
+    def is_confident(self, track):
+        return track.name != "Unknown" and track.distance <= self.confident_distance
+
+    # Whether a track's face should go through the encoder this frame
+    # With a crop quality, an uncertain track is only retried straight away when this crop is
+    # better than the best one already encoded for it; otherwise it waits retry_interval.
+    # A confident identity is re-verified every reverify_interval, but only with a crop at least
+    # as good as the one it came from (a worse crop could not replace it, see assign_identity)
+    def needs_encoding(self, track, now=None, quality=None):
+        now = time.time() if now is None else now
+        if track.last_encoded is None:
+            return True
+        if not self.is_confident(track):
+            if quality is None or quality > track.best_quality:
+                return True
+            return now - track.last_encoded >= self.retry_interval
+        if quality is not None and quality < track.identity_quality:
+            return False
+        return now - track.last_encoded >= self.reverify_interval
+
+    # Store the matcher result for a track; returns False if the track keeps its current identity
+    # A confident identity is not replaced by the result from a worse crop than the one behind it,
+    # so a blurred or turned frame during re-verification cannot relabel the person
+    def assign_identity(self, track, match, now=None, quality=None):
+        track.last_encoded = time.time() if now is None else now
+        if quality is not None:
+            track.best_quality = max(track.best_quality, quality)
+            if self.is_confident(track) and quality < track.identity_quality:
+                return False
+            track.identity_quality = quality
+        track.name = match["name"]
+        track.distance = match["distance"]
+        track.margin = match["margin"]
+        return True
+
+    # Forget cached identities (after the gallery changes) so every track is re-encoded once
+    def invalidate_identities(self):
+        for track in self.tracks.values():
+            track.last_encoded = None
+            track.identity_quality = 0.0
+
+    def active_track_ids(self):
+        return list(self.tracks.keys())
@@ -0,0 +1,314 @@
+import argparse
+import multiprocessing
+import os
+import time
+import numpy as np
+from gallery_store import GALLERY_STORE_PATH, load_gallery_store
+from face_matcher import FaceMatcher, DEFAULT_TOLERANCE, ENCODING_SIZE
+
+# Memory-mapped gallery: one contiguous encoding matrix in a flat file plus a sidecar index
+#   face_gallery.map            64-byte header (magic + token) followed by the matrix, row-major
+#   face_gallery.map.index.npz  roll numbers, names, dtype, shape, per-dimension int8 scales,
+#                               squared row norms and the same token
+# Every process that opens the file maps the same pages (the OS page cache holds one copy), and
+# distances are computed on the mapped rows directly. float16 halves the matrix again compared
+# with float32 (a quarter of the float64 gallery); int8 stores each dimension with its own scale
+# (an eighth). The token ties the two files together, so a half-written pair is never used.
+MAPPED_GALLERY_PATH = "face_gallery.map"
+MAGIC = b"HBGALLRY"
+HEADER_SIZE = 64
+GALLERY_DTYPES = ("float64", "float32", "float16", "int8")
+
+# Function to get the sidecar index path of a mapped gallery
+def index_path(path):
+    return path + ".index.npz"
+
+# Function to quantize encodings; returns the stored matrix and the int8 scales (None for floats)
+def quantize(encodings, dtype="float16"):
+    encodings = np.asarray(encodings, dtype=np.float64).reshape(-1, ENCODING_SIZE)
+    if dtype == "int8":
+        scales = np.abs(encodings).max(axis=0) / 127.0 if len(encodings) else np.ones(ENCODING_SIZE)
+        scales[scales == 0] = 1.0
+        return np.clip(np.rint(encodings / scales), -127, 127).astype(np.int8), scales
+    if dtype not in GALLERY_DTYPES:
+        raise ValueError(f"Unknown gallery dtype '{dtype}', expected one of {GALLERY_DTYPES}")
+    return encodings.astype(dtype), None
+
+# Function to turn stored rows back into float64 encodings
+def dequantize(rows, scales=None):
+    rows = np.asarray(rows, dtype=np.float64)
+    return rows * scales if scales is not None else rows
+
+# Function to write a mapped gallery (matrix file first, then the index that points at it)
+def save_mapped_gallery(roll_numbers, names, encodings, path=MAPPED_GALLERY_PATH, dtype="float16"):
+    matrix, scales = quantize(encodings, dtype)
+    stored = dequantize(matrix, scales)
+    token = os.urandom(16)
+    try:
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write((MAGIC + token).ljust(HEADER_SIZE, b"\0"))
+            f.write(np.ascontiguousarray(matrix).tobytes())
+        os.replace(temp_path, path)
+
+        temp_index = index_path(path) + ".tmp"
+        with open(temp_index, "wb") as f:
+            np.savez(
+                f,
+                token=np.frombuffer(token, dtype=np.uint8),
+                roll_numbers=np.array(roll_numbers, dtype=np.int64),
+                names=np.array(names, dtype=np.str_),
+                dtype=np.array(dtype),
+                shape=np.array(matrix.shape, dtype=np.int64),
+                scales=scales if scales is not None else np.empty(0),
+                sq_norms=np.einsum("ij,ij->i", stored, stored)
+            )
+        os.replace(temp_index, index_path(path))
+        return True
+    except Exception as e:
+        # On Windows a file that another process still maps cannot be replaced
+        print(f"❌ Error saving mapped gallery: {str(e)}")
+        return False
+
+# Function to export the gallery store as a mapped gallery
+def export_mapped_gallery(store_path=GALLERY_STORE_PATH, path=MAPPED_GALLERY_PATH, dtype="float16"):
+    store = load_gallery_store(store_path)
+    roll_numbers = sorted(store.keys())
+    encodings = [store[roll_no]["encoding"] for roll_no in roll_numbers]
+    return save_mapped_gallery(roll_numbers, [store[roll_no]["name"] for roll_no in roll_numbers],
+                               encodings, path, dtype)
+
+# Function to get the file of one published generation of a mapped gallery
+def generation_path(path, generation):
+    return f"{path}.{generation}"
+
+# Function to delete a mapped gallery and its index; returns False if a file is still in use
+def remove_mapped_gallery(path):
+    try:
+        for file_path in (path, index_path(path)):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        return True
+    except OSError:
+        return False
+
+# Publishes the gallery store to camera worker processes as a series of mapped galleries
+# Each export goes to a new file (face_gallery.map.<generation>) and the generation number is shared
+# with the workers, which map the new file and drop the old one. A file is never rewritten while
+# mapped (Windows refuses to replace it); old generations are deleted once nothing maps them.
+class MappedGalleryPublisher:
+    def __init__(self, path=MAPPED_GALLERY_PATH, dtype="float16", context=multiprocessing):
+        self.path = path
+        self.dtype = dtype
+        self.generation = context.Value("i", 0, lock=False)  # 0 until the first export
+        self._generations = []  # generations written and not deleted yet, oldest first
+        self._remove_leftovers()
+
+    @property
+    def current_path(self):
+        return generation_path(self.path, self.generation.value)
+
+    # Export the store as the next generation; returns False (keeping the current one) if that fails
+    def publish(self, store_path=GALLERY_STORE_PATH):
+        generation = self.generation.value + 1
+        if not export_mapped_gallery(store_path, generation_path(self.path, generation), self.dtype):
+            remove_mapped_gallery(generation_path(self.path, generation))
+            return False
+        self.generation.value = generation
+        self._generations.append(generation)
+        self._remove_old()
+        return True
+
+    # Delete older generations; one still mapped by a worker is retried on the next publish
+    def _remove_old(self, keep_current=True):
+        for generation in list(self._generations):
+            if keep_current and generation == self.generation.value:
+                continue
+            if remove_mapped_gallery(generation_path(self.path, generation)):
+                self._generations.remove(generation)
+
+    # Generations left behind by an earlier run
+    def _remove_leftovers(self):
+        directory = os.path.dirname(self.path) or "."
+        prefix = os.path.basename(self.path) + "."
+        try:
+            file_names = os.listdir(directory)
+        except OSError:
+            return
+        for file_name in file_names:
+            generation = file_name[len(prefix):].split(".")[0]
+            if file_name.startswith(prefix) and generation.isdigit():
+                remove_mapped_gallery(os.path.join(directory, prefix + generation))
+
+    def close(self):
+        self._remove_old(keep_current=False)
+
+# Read-only view of a mapped gallery
+class MappedGallery:
+    def __init__(self, path=MAPPED_GALLERY_PATH):
+        with np.load(index_path(path), allow_pickle=False) as index:
+            token = index["token"].tobytes()
+            self.roll_numbers = [int(roll_no) for roll_no in index["roll_numbers"]]
+            self.names = [str(name) for name in index["names"]]
+            self.dtype = str(index["dtype"])
+            shape = tuple(int(n) for n in index["shape"])
+            self.scales = index["scales"] if self.dtype == "int8" else None
+            self.sq_norms = index["sq_norms"]
+
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        if header[:len(MAGIC)] != MAGIC or header[len(MAGIC):len(MAGIC) + 16] != token:
+            raise ValueError(f"Mapped gallery '{path}' does not match its index (rewritten while opening?)")
+
+        self.path = path
+        if shape[0] == 0:
+            self.matrix = np.empty(shape, dtype=self.dtype)
+        else:
+            self.matrix = np.memmap(path, dtype=self.dtype, mode="r", offset=HEADER_SIZE, shape=shape)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def nbytes(self):
+        return self.matrix.nbytes
+
+    def encodings(self):
+        return dequantize(self.matrix, self.scales)
+
+    def matcher(self, **kwargs):
+        return MappedFaceMatcher(self, **kwargs)
+
+    # Drop the mapping (it is released once no matcher refers to it either)
+    def close(self):
+        self.matrix = None
+
+# Exact matcher that computes distances on the mapped rows, a block at a time
+# Rows are widened to float32 one block at a time, so the temporary memory stays bounded however
+# large the gallery is; for int8 the per-dimension scales are folded into the query instead of
+# the gallery. Adding or removing faces first copies the gallery into private float64 memory.
+class MappedFaceMatcher(FaceMatcher):
+    def __init__(self, gallery, tolerance=DEFAULT_TOLERANCE, block_size=8192):
+        super().__init__(tolerance=tolerance)
+        self.gallery = gallery
+        self.block_size = block_size
+        self._matrix = gallery.matrix
+        self._scales = gallery.scales
+        self._sq_norms = gallery.sq_norms
+        self._names = list(gallery.names)
+        self._count = len(self._names)
+
+    @property
+    def encodings(self):
+        if self.gallery is None:
+            return super().encodings
+        return dequantize(self._matrix[:self._count], self._scales)
+
+    def _squared_distances(self, queries):
+        if self.gallery is None:
+            return super()._squared_distances(queries)
+        weighted = queries * self._scales if self._scales is not None else queries
+        weighted = weighted.astype(np.float32)
+        dots = np.empty((len(queries), self._count), dtype=np.float64)
+        for start in range(0, self._count, self.block_size):
+            block = self._matrix[start:start + self.block_size].astype(np.float32)
+            dots[:, start:start + len(block)] = weighted.dot(block.T)
+        query_sq = np.einsum("ij,ij->i", queries, queries)
+        distances = query_sq[:, None] + self._sq_norms[:self._count][None, :] - 2.0 * dots
+        np.maximum(distances, 0.0, out=distances)
+        return distances
+
+    # Move to private float64 storage before the gallery is modified
+    def _make_private(self):
+        if self.gallery is None:
+            return
+        self._matrix = dequantize(self._matrix[:self._count], self._scales)
+        self._sq_norms = np.array(self._sq_norms[:self._count], dtype=np.float64)
+        self._scales = None
+        self.gallery = None
+
+    def add(self, name, encoding):
+        self._make_private()
+        super().add(name, encoding)
+
+    def _delete_row(self, i):
+        self._make_private()
+        super()._delete_row(i)
+
+# Function to compare a quantized gallery with the float64 one on the same queries
+# Reports distance error, how often the nearest face and the accept/reject decision agree, and
+# the matrix size and match time of each
+def compare_with_float64(names, encodings, queries, dtype, path, tolerance=DEFAULT_TOLERANCE):
+    reference = FaceMatcher(encodings, names, tolerance=tolerance)
+    save_mapped_gallery(list(range(len(names))), names, encodings, path, dtype)
+    gallery = MappedGallery(path)
+    mapped = gallery.matcher(tolerance=tolerance)
+
+    start = time.perf_counter()
+    expected = reference.match(queries)
+    reference_time = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = mapped.match(queries)
+    mapped_time = time.perf_counter() - start
+
+    errors = np.array([abs(a["distance"] - e["distance"]) for a, e in zip(actual, expected)])
+    result = {
+        "dtype": dtype,
+        "gallery_size": len(names),
+        "matrix_mb": gallery.nbytes / 1e6,
+        "float64_mb": len(names) * ENCODING_SIZE * 8 / 1e6,
+        "mean_distance_error": float(errors.mean()),
+        "max_distance_error": float(errors.max()),
+        "nearest_agreement": float(np.mean([a["index"] == e["index"] for a, e in zip(actual, expected)])),
+        "decision_agreement": float(np.mean([a["name"] == e["name"] for a, e in zip(actual, expected)])),
+        "float64_match_ms": reference_time * 1000,
+        "mapped_match_ms": mapped_time * 1000
+    }
+    del mapped
+    gallery.close()
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the face gallery as a memory-mapped, quantized matrix")
+    parser.add_argument("--store", default=GALLERY_STORE_PATH, help="gallery store to read")
+    parser.add_argument("--out", default=MAPPED_GALLERY_PATH, help="mapped gallery file to write")
+    parser.add_argument("--dtype", nargs="+", default=["float16"], choices=GALLERY_DTYPES)
+    parser.add_argument("--evaluate", action="store_true",
+                        help="compare each dtype with float64 instead of exporting")
+    parser.add_argument("--synthetic", type=int, default=0, help="pad the gallery with random identities (--evaluate)")
+    parser.add_argument("--noise", type=float, default=0.02,
+                        help="per-dimension noise added to gallery rows to make probe queries (--evaluate)")
+    parser.add_argument("--queries", type=int, default=1000, help="number of probe queries (--evaluate)")
+    args = parser.parse_args()
+
+    if not args.evaluate:
+        if export_mapped_gallery(args.store, args.out, args.dtype[0]):
+            print(f"✅ Mapped gallery written to {args.out} ({args.dtype[0]})")
+    else:
+        store = load_gallery_store(args.store)
+        names = [store[roll_no]["name"] for roll_no in sorted(store)]
+        encodings = [store[roll_no]["encoding"] for roll_no in sorted(store)]
+        rng = np.random.default_rng(0)
+        if args.synthetic:
+            scale = np.std(encodings) if encodings else 0.09
+            encodings += list(rng.normal(0.0, scale, size=(args.synthetic, ENCODING_SIZE)))
+            names += [f"synthetic_{i}" for i in range(args.synthetic)]
+        if not names:
+            parser.error("the gallery is empty (use --synthetic to evaluate on random identities)")
+
+        # Probes: noisy copies of gallery rows (same person, new photo) and as many strangers
+        matrix = np.array(encodings)
+        rows = rng.integers(0, len(matrix), args.queries)
+        probes = matrix[rows] + rng.normal(0.0, args.noise, size=(args.queries, ENCODING_SIZE))
+        strangers = rng.normal(0.0, np.std(matrix), size=(args.queries, ENCODING_SIZE))
+        queries = np.vstack([probes, strangers])
+
+        for dtype in args.dtype:
+            result = compare_with_float64(names, encodings, queries, dtype, args.out + ".eval")
+            print(f"\n{dtype}: {result['matrix_mb']:.2f} MB (float64 {result['float64_mb']:.2f} MB) for {result['gallery_size']} faces")
+            print(f"  distance error mean {result['mean_distance_error']:.5f}, max {result['max_distance_error']:.5f}")
+            print(f"  nearest face agrees {result['nearest_agreement']:.2%}, accept/reject agrees {result['decision_agreement']:.2%}")
+            print(f"  match time {result['mapped_match_ms']:.1f} ms (float64 {result['float64_match_ms']:.1f} ms) for {len(queries)} queries")
+        for leftover in (args.out + ".eval", index_path(args.out + ".eval")):
+            if os.path.exists(leftover):
+                os.remove(leftover)
@@ -0,0 +1,183 @@
+import os
+import hashlib
+import numpy as np
+import face_recognition
+
+# Default location of the persistent face gallery (encodings keyed by roll number)
+GALLERY_STORE_PATH = "face_gallery.npz"
+ENCODING_SIZE = 128
+
+# Function to hash an image file so changed photos get re-encoded
+def hash_image_file(image_path):
+    sha = hashlib.sha1()
+    with open(image_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+# Function to encode the first face found in an image file
+def encode_face_image(image_path, name):
+    try:
+        print(f"Loading image for {name}...")
+        image = face_recognition.load_image_file(image_path)
+        encodings = face_recognition.face_encodings(image)
+        if encodings and len(encodings) > 0:
+            print(f"✅ Successfully encoded face for {name}")
+            return encodings[0]
+        print(f"⚠ Warning: No face detected in {image_path}. Skipping...")
+    except Exception as e:
+        print(f"❌ Error encoding face for {name}: {str(e)}")
+    return None
+
+# Function to load the whole gallery store from disk in one bulk read
+# Photos without a detectable face are kept as entries with encoding None, so an unchanged bad
+# photo is not re-encoded on every sync; they are only returned with include_failed=True
+def load_gallery_store(store_path=GALLERY_STORE_PATH, include_failed=False):
+    store = {}
+    if not os.path.exists(store_path):
+        return store
+
+    try:
+        with np.load(store_path, allow_pickle=False) as data:
+            roll_numbers = data["roll_numbers"]
+            names = data["names"]
+            hashes = data["hashes"]
+            mtimes = data["mtimes"]
+            sizes = data["sizes"]
+            encodings = data["encodings"]
+            # Stores written before failed photos were recorded only hold encoded faces
+            encoded = data["encoded"] if "encoded" in data.files else np.ones(len(roll_numbers), dtype=bool)
+
+        for i, roll_no in enumerate(roll_numbers):
+            if not encoded[i] and not include_failed:
+                continue
+            store[int(roll_no)] = {
+                "name": str(names[i]),
+                "hash": str(hashes[i]),
+                "mtime": float(mtimes[i]),
+                "size": int(sizes[i]),
+                "encoding": encodings[i] if encoded[i] else None
+            }
+    except Exception as e:
+        print(f"⚠ Warning: Could not read gallery store '{store_path}', rebuilding: {str(e)}")
+        return {}
+
+    return store
+
+# Function to write the gallery store to disk atomically
+def save_gallery_store(store, store_path=GALLERY_STORE_PATH):
+    roll_numbers = sorted(store.keys())
+    entries = [store[roll_no] for roll_no in roll_numbers]
+
+    encodings = np.zeros((len(entries), ENCODING_SIZE), dtype=np.float64)
+    for i, entry in enumerate(entries):
+        if entry["encoding"] is not None:
+            encodings[i] = entry["encoding"]
+
+    temp_path = store_path + ".tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            np.savez(
+                f,
+                roll_numbers=np.array(roll_numbers, dtype=np.int64),
+                names=np.array([entry["name"] for entry in entries], dtype=np.str_),
+                hashes=np.array([entry["hash"] for entry in entries], dtype=np.str_),
+                mtimes=np.array([entry["mtime"] for entry in entries], dtype=np.float64),
+                sizes=np.array([entry["size"] for entry in entries], dtype=np.int64),
+                encodings=encodings,
+                encoded=np.array([entry["encoding"] is not None for entry in entries], dtype=bool)
+            )
+        os.replace(temp_path, store_path)
+        return True
+    except Exception as e:
+        print(f"❌ Error saving gallery store: {str(e)}")
+        return False
+
+# Function to build a store entry for an image, reusing the cached encoding when the file is unchanged
+# A photo without a detectable face gives an entry with encoding None ("failed"), which is then
+# cached like any other entry until the file changes
+def _refresh_entry(cached, name, image_path):
+    stat = os.stat(image_path)
+
+    # Same size and modification time: trust the cached hash without re-reading the file
+    if cached and cached["mtime"] == stat.st_mtime and cached["size"] == stat.st_size:
+        if cached["name"] != name:
+            return dict(cached, name=name), "updated"
+        return cached, "cached"
+
+    image_hash = hash_image_file(image_path)
+    if cached and cached["hash"] == image_hash:
+        return dict(cached, name=name, mtime=stat.st_mtime, size=stat.st_size), "updated"
+
+    encoding = encode_face_image(image_path, name)
+    entry = {
+        "name": name,
+        "hash": image_hash,
+        "mtime": stat.st_mtime,
+        "size": stat.st_size,
+        "encoding": None if encoding is None else np.asarray(encoding, dtype=np.float64)
+    }
+    return entry, "failed" if encoding is None else "encoded"
+
+# Function to sync the gallery store with the registered students, only encoding new or changed photos
+def sync_gallery_store(students, image_dir, store_path=GALLERY_STORE_PATH):
+    store = load_gallery_store(store_path, include_failed=True)
+    synced = {}
+    changed = False
+    encoded = 0
+
+    for student in students:
+        name = student["Name"]
+        roll_no = int(student["Roll No"])
+        image_path = os.path.join(image_dir, f"{name}.jpg")
+
+        if not os.path.exists(image_path):
+            print(f"❌ Error: Image file '{image_path}' not found! Make sure it's in the correct folder.")
+            continue
+
+        try:
+            entry, status = _refresh_entry(store.get(roll_no), name, image_path)
+        except Exception as e:
+            print(f"❌ Error loading image for {name}: {str(e)}")
+            continue
+
+        if status != "cached":
+            changed = True
+        if status == "encoded":
+            encoded += 1
+        synced[roll_no] = entry
+
+    # Drop students that are no longer registered
+    if set(store.keys()) != set(synced.keys()):
+        changed = True
+
+    if changed:
+        save_gallery_store(synced, store_path)
+
+    gallery = {roll_no: entry for roll_no, entry in synced.items() if entry["encoding"] is not None}
+    failed = len(synced) - len(gallery)
+    print(f"Gallery ready: {len(gallery)} faces ({len(gallery) - encoded} loaded from store, {encoded} encoded"
+          + (f", {failed} photos without a detectable face)" if failed else ")"))
+    return gallery
+
+# Function to add or replace a single student's encoding in the store
+def add_to_gallery_store(roll_no, name, image_path, encoding, store_path=GALLERY_STORE_PATH):
+    store = load_gallery_store(store_path, include_failed=True)
+    stat = os.stat(image_path)
+    store[int(roll_no)] = {
+        "name": name,
+        "hash": hash_image_file(image_path),
+        "mtime": stat.st_mtime,
+        "size": stat.st_size,
+        "encoding": np.asarray(encoding, dtype=np.float64)
+    }
+    return save_gallery_store(store, store_path)
+
+# Function to split a gallery into the parallel name/encoding lists used by the recognizer
+def gallery_to_lists(gallery):
+    known_face_names = []
+    known_face_encodings = []
+    for roll_no in sorted(gallery.keys()):
+        known_face_names.append(gallery[roll_no]["name"])
+        known_face_encodings.append(gallery[roll_no]["encoding"])
+    return known_face_names, known_face_encodings
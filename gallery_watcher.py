@@ -0,0 +1,121 @@
+import os
+import threading
+from gallery_store import GALLERY_STORE_PATH, sync_gallery_store, load_gallery_store, add_to_gallery_store, gallery_to_lists
+from face_matcher import create_matcher
+
+# Keeps the recognizer's matcher in step with the Students roster and the gallery store
+# Changes are picked up in the background: new, re-photographed and removed students are synced into
+# the store (only changed photos are encoded), a fresh matcher is built off to the side, and then it
+# replaces the old one in a single assignment. Readers take `current` once per frame, so they always
+# see one complete gallery and never wait for a reload.
+#
+# With a roster cache the watcher owns the store (it syncs it from Students); without one it only
+# follows the store file, e.g. in a process that reads a store another process keeps synced.
+# Faces registered at the gate are queued by add_face() and written to the store by the next
+# reload, so the registration thread never waits for a sync in progress.
+class GalleryWatcher:
+    def __init__(self, roster_cache=None, image_dir=None, store_path=GALLERY_STORE_PATH,
+                 matcher_mode="exact", matcher_options=None, interval=2.0):
+        self.roster_cache = roster_cache
+        self.image_dir = image_dir
+        self.store_path = store_path
+        self.matcher_mode = matcher_mode
+        self.matcher_options = matcher_options or {}
+        self.interval = interval
+        self.current = (0, create_matcher([], [], mode=matcher_mode, **self.matcher_options))  # (generation, matcher)
+        self._lock = threading.Lock()  # guards the queued faces
+        self._reload_lock = threading.Lock()  # one reload (and store write) at a time
+        self._new_faces = []
+        self._reload_requested = threading.Event()
+        self._signature = None
+        self._roster_version = None
+        self._store_mtime = None
+        self._running = False
+        self._thread = None
+
+    @property
+    def matcher(self):
+        return self.current[1]
+
+    @property
+    def generation(self):
+        return self.current[0]
+
+    # Build the first matcher in the calling thread
+    def load(self):
+        self.reload()
+        return self
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    # Ask for a reload on the next check instead of waiting for a change to be noticed
+    def request_reload(self):
+        self._reload_requested.set()
+
+    # Queue one newly registered face; the next reload stores it and makes it recognisable
+    def add_face(self, roll_no, name, image_path, encoding):
+        with self._lock:
+            self._new_faces.append((roll_no, name, image_path, encoding))
+        self.request_reload()
+
+    def _store_mtime_now(self):
+        try:
+            return os.stat(self.store_path).st_mtime
+        except OSError:
+            return None
+
+    # The store owner follows the roster (a store written by another tool before its students reach
+    # the roster would otherwise be synced away); followers watch the store file itself
+    def _changed(self):
+        if self.roster_cache is not None:
+            return self.roster_cache.version != self._roster_version
+        return self._store_mtime_now() != self._store_mtime
+
+    def _run(self):
+        while self._running:
+            requested = self._reload_requested.wait(self.interval)
+            self._reload_requested.clear()
+            if not self._running:
+                break
+            if requested or self._changed():
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"❌ Gallery reload failed, keeping the current gallery: {str(e)}")
+
+    # Sync (or read) the store and swap in a new matcher if the gallery changed
+    def reload(self):
+        with self._reload_lock:
+            with self._lock:
+                new_faces, self._new_faces = self._new_faces, []
+            for roll_no, name, image_path, encoding in new_faces:
+                add_to_gallery_store(roll_no, name, image_path, encoding, self.store_path)
+
+            if self.roster_cache is not None:
+                self._roster_version = self.roster_cache.version
+                gallery = sync_gallery_store(self.roster_cache.registered_students(), self.image_dir, self.store_path)
+            else:
+                gallery = load_gallery_store(self.store_path)
+            self._store_mtime = self._store_mtime_now()
+
+            signature = {roll_no: (entry["name"], entry["hash"]) for roll_no, entry in gallery.items()}
+            if signature == self._signature:
+                return False
+
+            known_face_names, known_face_encodings = gallery_to_lists(gallery)
+            face_matcher = create_matcher(known_face_encodings, known_face_names,
+                                          mode=self.matcher_mode, **self.matcher_options)
+            self._signature = signature
+            self.current = (self.current[0] + 1, face_matcher)
+        print(f"Gallery reloaded: {len(face_matcher)} faces")
+        return True
+
+    def stop(self):
+        self._running = False
+        self._reload_requested.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
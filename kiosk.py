@@ -0,0 +1,45 @@
+import argparse
+import time
+import cv2
+
+WINDOW_NAME = "Hostel Biometric System"
+
+# Kiosk display: a separate process that shows the gate's MJPEG preview on a local screen
+# The gate itself runs headless (python database_record.py --headless --preview-port 8081), so a
+# crashed or closed display never stops recognition and attendance.
+def run_kiosk(url, fullscreen=True, reconnect_delay=2.0):
+    cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_NORMAL)
+    if fullscreen:
+        cv2.setWindowProperty(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+
+    try:
+        while True:
+            stream = cv2.VideoCapture(url)
+            if not stream.isOpened():
+                print(f"Waiting for the gate preview at {url}...")
+                time.sleep(reconnect_delay)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+                continue
+
+            while True:
+                ret, frame = stream.read()
+                if not ret:
+                    print("Preview stream lost, reconnecting...")
+                    break
+                cv2.imshow(WINDOW_NAME, frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    stream.release()
+                    return
+            stream.release()
+            time.sleep(reconnect_delay)
+    finally:
+        cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show a headless gate's live preview on a local display")
+    parser.add_argument("--url", default="http://127.0.0.1:8081/stream.mjpg", help="gate preview stream")
+    parser.add_argument("--windowed", action="store_true", help="do not go full screen")
+    args = parser.parse_args()
+
+    run_kiosk(args.url, fullscreen=not args.windowed)
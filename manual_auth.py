@@ -0,0 +1,256 @@
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Manual authorization requests, answered without stopping the camera loop
+# A request waits for a Roll Number ("roll" step), then, once the student is authorized, for a
+# y/n answer to registering their face ("register" step), then for the registration photo to be
+# taken after a short countdown ("capture" step), and stays open while the photo is encoded and
+# added to the gallery ("registering" step). Input channels (the keypad in the video window,
+# the console and the local HTTP endpoint) only queue answers; the camera loop applies them with
+# poll(), so attendance and registration still happen on one thread.
+class AuthRequest:
+    def __init__(self, request_id, face_id, deadline):
+        self.request_id = request_id
+        self.face_id = face_id
+        self.step = "roll"
+        self.deadline = deadline
+        self.name = None
+        self.roll = None
+        self.capture_at = None
+
+class ManualAuthDesk:
+    def __init__(self, roll_timeout=60.0, register_timeout=15.0, capture_delay=3.0, registration_timeout=30.0,
+                 quiet_period=5.0):
+        self.roll_timeout = roll_timeout
+        self.register_timeout = register_timeout
+        self.capture_delay = capture_delay  # countdown before the registration photo is taken
+        self.registration_timeout = registration_timeout  # longest wait for a registration to finish
+        self.quiet_period = quiet_period  # seconds after a request closes before another can open
+        self._quiet_until = 0.0
+        self.typed = ""  # keypad input so far
+        self._requests = deque()  # first request is the one being answered
+        self._answers = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    @property
+    def active(self):
+        with self._lock:
+            return self._requests[0] if self._requests else None
+
+    # Whether unknown faces should be left alone: a request is open, or one closed less than
+    # quiet_period ago (the person at the desk is still unknown to the matcher, maybe under a new track)
+    def busy(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            return bool(self._requests) or now < self._quiet_until
+
+    # Queue a request for an unknown face; returns None if that face already has one open
+    def open_request(self, face_id, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            if any(request.face_id == face_id for request in self._requests):
+                return None
+            request = AuthRequest(self._next_id, face_id, now + self.roll_timeout)
+            self._next_id += 1
+            self._requests.append(request)
+            return request
+
+    # Queue an answer from any thread; request_id None answers the active request
+    def submit(self, text, request_id=None):
+        self._answers.put((request_id, text.strip()))
+
+    # Keypad in the video window: digits, Backspace, Enter, y/n and Esc; returns True if the key was used
+    def handle_key(self, key):
+        request = self.active
+        if request is None or key is None:
+            return False
+        if request.step == "roll":
+            if ord('0') <= key <= ord('9'):
+                self.typed += chr(key)
+            elif key in (8, 127):
+                self.typed = self.typed[:-1]
+            elif key in (10, 13):
+                self.submit(self.typed)
+                self.typed = ""
+            elif key == 27:
+                self.submit("cancel")
+                self.typed = ""
+            else:
+                return False
+            return True
+        if request.step == "register" and key in (ord('y'), ord('n'), 27):
+            self.submit("n" if key == 27 else chr(key))
+            return True
+        return False
+
+    # Apply queued answers and deadlines; returns (event, request, text) tuples for the camera loop:
+    # "roll" (text is the Roll Number), "register" (text is "y" or "n"), "capture", "timeout", "cancel"
+    def poll(self, now=None):
+        now = time.time() if now is None else now
+        events = []
+        answered = set()  # one answer per request per poll: the next step starts after the loop acts on it
+        while True:
+            try:
+                request_id, text = self._answers.get_nowait()
+            except queue.Empty:
+                break
+            request = self._find(request_id)
+            if request is None or request.step in ("capture", "registering") or request.request_id in answered:
+                continue
+            answered.add(request.request_id)
+            if text.lower() == "cancel":
+                self.close(request, now)
+                events.append(("cancel", request, text))
+            elif request.step == "roll" and text:
+                events.append(("roll", request, text))
+            elif request.step == "register" and text.lower() in ("y", "n", "yes", "no"):
+                events.append(("register", request, text.lower()[0]))
+            else:
+                answered.discard(request.request_id)
+
+        with self._lock:
+            requests = list(self._requests)
+        for request in requests:
+            if request.step == "capture" and now >= request.capture_at:
+                events.append(("capture", request, None))
+            elif request.step != "capture" and now >= request.deadline:
+                self.close(request, now)
+                events.append(("timeout", request, None))
+        return events
+
+    # Move an authorized request on to the registration question
+    def await_registration(self, request, name, roll, now=None):
+        now = time.time() if now is None else now
+        request.name = name
+        request.roll = roll
+        request.step = "register"
+        request.deadline = now + self.register_timeout
+
+    # Take the registration photo once the countdown ends
+    def schedule_capture(self, request, now=None):
+        now = time.time() if now is None else now
+        request.step = "capture"
+        request.capture_at = now + self.capture_delay
+
+    # Keep the request open while the photo is encoded; whoever registers closes it when done
+    def begin_registration(self, request, now=None):
+        now = time.time() if now is None else now
+        request.step = "registering"
+        request.deadline = now + self.registration_timeout
+
+    def close(self, request, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            if request in self._requests:
+                self._requests.remove(request)
+                self._quiet_until = now + self.quiet_period
+        if not self.active:
+            self.typed = ""
+
+    # Open requests, as plain dicts (for the HTTP endpoint)
+    def pending(self):
+        with self._lock:
+            return [{"id": request.request_id, "face": request.face_id, "step": request.step,
+                     "name": request.name, "expires_in": round(max(0.0, request.deadline - time.time()), 1)}
+                    for request in self._requests]
+
+    def _find(self, request_id):
+        with self._lock:
+            if request_id is None:
+                return self._requests[0] if self._requests else None
+            for request in self._requests:
+                if request.request_id == request_id:
+                    return request
+        return None
+
+# Console input channel: every line typed in the terminal answers the active request
+class ConsoleInput:
+    def __init__(self, desk):
+        self.desk = desk
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        for line in sys.stdin:
+            if self.desk.active:
+                self.desk.submit(line)
+
+# Local HTTP input channel
+# GET /requests lists the open requests; POST /answer with text=<answer> (and optionally id=<request id>),
+# as a query string or a form body, answers one
+class ManualAuthServer:
+    def __init__(self, desk, host="127.0.0.1", port=8082):
+        self.desk = desk
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        desk = self.desk
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if urlparse(self.path).path != "/requests":
+                    self.send_error(404)
+                    return
+                self._send_json(200, desk.pending())
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                if url.path != "/answer":
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                params = parse_qs(url.query)
+                params.update(parse_qs(self.rfile.read(length).decode("utf-8")) if length else {})
+                text = params.get("text", [""])[0]
+                request_id = params.get("id", [None])[0]
+                if not text:
+                    self._send_json(400, {"error": "missing text"})
+                    return
+                try:
+                    request_id = int(request_id) if request_id is not None else None
+                except ValueError:
+                    self._send_json(400, {"error": "invalid id"})
+                    return
+                desk.submit(text, request_id)
+                self._send_json(202, {"queued": True})
+
+            def _send_json(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            print(f"⚠ Warning: Could not start manual authorization endpoint on {self.host}:{self.port}: {str(e)}")
+            return self
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"Manual authorization endpoint at http://{self.host}:{self.port}/requests")
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,200 @@
+import bisect
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import cv2
+
+METRIC_PREFIX = "hostel"
+# Histogram bucket upper bounds in seconds (a camera frame is ~33ms, a Haar pass a few ms)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Latency histogram for one pipeline stage
+# Cumulative buckets feed the Prometheus endpoint; a short window of raw samples gives live
+# percentiles for the JSON log line and the on-screen overlay
+class StageHistogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=200):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def summary(self):
+        recent = np.array(self.recent) if self.recent else np.zeros(1)
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": round(float(np.percentile(recent, 50)) * 1000, 2),
+            "p95_ms": round(float(np.percentile(recent, 95)) * 1000, 2)
+        }
+
+# Registry of stage timings, counters and gauges shared by every thread of the process
+# Gauges can be functions (e.g. a queue's qsize), read when metrics are exported
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self._gauges = {}
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = StageHistogram()
+            histogram.observe(seconds)
+
+    # Time a block of code: with metrics.timer("detect"): ...
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def set_gauge(self, gauge, value):
+        with self._lock:
+            self._gauges[gauge] = value
+
+    def _gauge_values(self):
+        with self._lock:
+            gauges = dict(self._gauges)
+        values = {}
+        for gauge, value in gauges.items():
+            try:
+                values[gauge] = float(value() if callable(value) else value)
+            except Exception:
+                continue
+        return values
+
+    def stage_summary(self, stage):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            return histogram.summary() if histogram else None
+
+    # Total seconds recorded per stage so far (diff two readings to time the stages of one call)
+    def stage_totals(self):
+        with self._lock:
+            return {stage: histogram.total for stage, histogram in self._stages.items()}
+
+    # Everything as one JSON-friendly dict
+    def snapshot(self):
+        with self._lock:
+            stages = {stage: histogram.summary() for stage, histogram in self._stages.items()}
+            counters = dict(self._counters)
+        return {"time": round(time.time(), 3), "stages": stages, "counters": counters, "gauges": self._gauge_values()}
+
+    # Everything in the Prometheus text exposition format
+    def prometheus_text(self):
+        lines = [
+            f"# HELP {METRIC_PREFIX}_stage_seconds Time spent in each pipeline stage",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds histogram"
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self._stages.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(list(histogram.buckets) + ["+Inf"], histogram.bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'{METRIC_PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{METRIC_PREFIX}_stage_seconds_sum{{stage="{stage}"}} {histogram.total:.6f}')
+                lines.append(f'{METRIC_PREFIX}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            counters = dict(self._counters)
+
+        for counter, value in sorted(counters.items()):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{counter}_total counter")
+            lines.append(f"{METRIC_PREFIX}_{counter}_total {value}")
+        for gauge, value in sorted(self._gauge_values().items()):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{gauge} gauge")
+            lines.append(f"{METRIC_PREFIX}_{gauge} {value:g}")
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry the pipeline stages report to
+metrics = Metrics()
+
+# Local HTTP endpoint serving the registry at /metrics (Prometheus text format)
+class MetricsServer:
+    def __init__(self, registry=metrics, host="127.0.0.1", port=9100):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # keep scrapes out of the console
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            print(f"⚠ Warning: Could not start metrics endpoint on {self.host}:{self.port}: {str(e)}")
+            return self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"Metrics available at http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+# Background thread printing the registry as one JSON line every interval seconds
+class MetricsLogger:
+    def __init__(self, registry=metrics, interval=60.0):
+        self.registry = registry
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            print("METRICS " + json.dumps(self.registry.snapshot()))
+
+    def stop(self):
+        self._stop_event.set()
+
+# Function to overlay live FPS and stage latencies in the top-right corner of the display frame
+def draw_metrics_overlay(display_frame, fps, registry=metrics, stages=("detect", "encode", "match", "recognition")):
+    lines = [f"FPS: {fps:.1f}"]
+    for stage in stages:
+        summary = registry.stage_summary(stage)
+        if summary:
+            lines.append(f"{stage}: {summary['p50_ms']:.1f}/{summary['p95_ms']:.1f} ms")
+    x = display_frame.shape[1] - 230
+    for i, line in enumerate(lines):
+        cv2.putText(display_frame, line, (x, 25 + i * 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
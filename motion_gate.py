@@ -0,0 +1,78 @@
+import time
+import cv2
+import numpy as np
+
+# Cheap motion detector: frame differencing on a tiny grayscale copy of each frame
+class MotionDetector:
+    def __init__(self, size=(64, 48), pixel_threshold=15, motion_ratio=0.01):
+        self.size = size
+        self.pixel_threshold = pixel_threshold  # grey-level change that counts as a moving pixel
+        self.motion_ratio = motion_ratio  # fraction of moving pixels that counts as motion
+        self.motion_level = 0.0
+        self._previous = None
+
+    # Returns True when the scene changed since the previous call
+    def update(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (3, 3), 0)
+
+        if self._previous is None:
+            self._previous = gray
+            return True
+
+        diff = cv2.absdiff(gray, self._previous)
+        self._previous = gray
+        self.motion_level = np.count_nonzero(diff > self.pixel_threshold) / float(diff.size)
+        return self.motion_level >= self.motion_ratio
+
+# Decides which frames go to face recognition
+# Static scenes with nobody in view are skipped (apart from a slow idle rescan), and the interval
+# between processed frames adapts to keep the time frames spend waiting for the recognizer inside
+# the target budget. Processing time itself is not held to the budget: encoding takes what it takes
+# (about 170 ms per face), and spacing frames further apart would only lower the frame rate.
+class AdaptiveScheduler:
+    def __init__(self, target_latency=0.25, min_interval=0.0, max_interval=1.0, idle_rescan_interval=2.0):
+        self.target_latency = target_latency
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_rescan_interval = idle_rescan_interval
+        self.interval = min_interval
+        self.average_delay = None  # moving average of the queueing delay
+        self.processed_frames = 0
+        self.skipped_frames = 0
+        self._last_submit = 0.0
+
+    def should_process(self, motion, faces_present, now=None):
+        now = time.time() if now is None else now
+        elapsed = now - self._last_submit
+
+        if not motion and not faces_present and elapsed < self.idle_rescan_interval:
+            self.skipped_frames += 1
+            return False
+        if elapsed < self.interval:
+            self.skipped_frames += 1
+            return False
+        return True
+
+    def mark_processed(self, now=None):
+        self._last_submit = time.time() if now is None else now
+        self.processed_frames += 1
+
+    # Feed back a measured capture-to-result latency and the part of it spent processing the frame
+    # (seconds) and retune the processing interval on the difference, the queueing delay
+    def record_latency(self, latency, processing_time=0.0):
+        delay = max(0.0, latency - processing_time)
+        if self.average_delay is None:
+            self.average_delay = delay
+        else:
+            self.average_delay = 0.7 * self.average_delay + 0.3 * delay
+
+        if self.average_delay > self.target_latency:
+            # Frames are queuing behind each other: back off so they stop waiting for the recognizer
+            self.interval = min(self.max_interval, max(self.interval * 1.5, 0.02))
+        elif self.average_delay < 0.7 * self.target_latency:
+            # Comfortably inside budget: process more often
+            self.interval = max(self.min_interval, self.interval * 0.8)
+            if self.interval < 0.01:
+                self.interval = self.min_interval
@@ -0,0 +1,256 @@
+import argparse
+import multiprocessing
+import queue
+import time
+import cv2
+from gallery_mmap import MappedGallery, MappedGalleryPublisher, generation_path, MAPPED_GALLERY_PATH, GALLERY_DTYPES
+from gallery_watcher import GalleryWatcher
+from speech import PRIORITY_FAILURE
+from face_encoder import FaceEncoder
+from face_quality import FaceQualityScorer
+from pipeline import LatestFrameCapture
+from face_tracker import FaceTracker
+from motion_gate import MotionDetector, AdaptiveScheduler
+from attendance_writer import AttendanceWriter
+from attendance_journal import AttendanceJournal
+from occupancy import warm_start_entry_state
+from database_record import (init_voice_engine, speak_text, open_database, open_roster, connect_attendance,
+                             FACE_IMAGES_DIR, process_frame, handle_known_face, load_face_detector)
+
+# Function to open a camera source: a device index, a video file or a stream URL
+def open_camera_source(source):
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    video_capture = cv2.VideoCapture(source)
+    if isinstance(source, int):
+        video_capture.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        video_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        video_capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return video_capture
+
+# Function to parse a camera spec such as "source=1,name=Back Gate,direction=Exit,detector=dnn"
+# A bare value ("0", "rtsp://...") is treated as the source
+def parse_camera_spec(spec, index):
+    camera = {"source": spec, "name": f"Camera {index + 1}", "direction": None, "detector": "haar"}
+    if spec.split(",")[0].partition("=")[0].strip() in ("source", "name", "direction", "detector"):
+        for part in spec.split(","):
+            key, _, value = part.partition("=")
+            camera[key.strip()] = value.strip()
+    if camera["direction"] not in (None, "Entry", "Exit"):
+        raise ValueError(f"Camera direction must be Entry or Exit, got '{camera['direction']}'")
+    return camera
+
+# Camera worker process: capture + recognition for one door against the shared gallery
+# Every worker maps the same gallery file (gallery_mmap.py), so the encodings are held in memory once.
+# When the coordinator publishes a new generation (students added or removed after startup), the
+# worker maps the new file and drops the old one, so the gallery stays shared.
+def camera_worker(camera, gallery_path, gallery_generation, result_queue, stop_event, scale):
+    mapped_generation = gallery_generation.value
+    try:
+        mapped_gallery = MappedGallery(generation_path(gallery_path, mapped_generation))
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: Could not map the face gallery for {camera['name']}: {str(e)}")
+        return
+    face_matcher = mapped_gallery.matcher()
+    failed_generation = None
+    face_detector = load_face_detector(camera["detector"])
+    face_encoder = FaceEncoder()
+    face_scorer = FaceQualityScorer()
+    face_tracker = FaceTracker()
+    motion_detector = MotionDetector()
+    scheduler = AdaptiveScheduler()
+    faces_present = False
+
+    video_capture = open_camera_source(camera["source"])
+    if not video_capture.isOpened():
+        print(f"Error: Could not open camera source {camera['source']} ({camera['name']})")
+        face_detector.close()
+        del face_matcher
+        mapped_gallery.close()
+        return
+
+    capture = LatestFrameCapture(video_capture).start()
+    last_frame_id = None
+    try:
+        while not stop_event.is_set():
+            frame_data = capture.wait_for_frame(last_frame_id)
+            if frame_data is None:
+                if capture.failed:
+                    break
+                continue
+            last_frame_id, frame, captured_at = frame_data
+
+            # Skip recognition on a static, empty doorway
+            if not scheduler.should_process(motion_detector.update(frame), faces_present):
+                continue
+            scheduler.mark_processed()
+
+            # Map the newest published gallery; if it cannot be opened, keep the current one
+            generation = gallery_generation.value
+            if generation != mapped_generation and generation != failed_generation:
+                try:
+                    new_gallery = MappedGallery(generation_path(gallery_path, generation))
+                except (OSError, ValueError) as e:
+                    print(f"⚠ Warning: {camera['name']} keeps the previous gallery: {str(e)}")
+                    failed_generation = generation
+                else:
+                    face_matcher = new_gallery.matcher()
+                    mapped_gallery.close()
+                    mapped_gallery, mapped_generation = new_gallery, generation
+                    face_tracker.invalidate_identities()
+
+            processing_start = time.time()
+            result = process_frame(frame, face_matcher, scale, face_tracker, face_detector, face_encoder, face_scorer)
+            scheduler.record_latency(time.time() - captured_at, time.time() - processing_start)
+            faces_present = bool(result["face_locations"])
+            if faces_present:
+                result["camera"] = camera["name"]
+                result["timestamp"] = captured_at
+                result_queue.put(result)
+    finally:
+        capture.stop()
+        video_capture.release()
+        face_detector.close()
+        del face_matcher
+        mapped_gallery.close()
+        print(f"{camera['name']} worker exiting")
+
+# Function to act on one camera's recognition result in the coordinating process
+# Unknown attempts are counted per track, so two strangers at one door each get their own count
+def handle_camera_result(result, camera, camera_state, roster_cache, attendance_writer,
+                         voice_engine, cooldown_duration, last_entry_time, min_entry_gap, max_unknown_attempts):
+    state = camera_state[camera["name"]]
+    if result["timestamp"] < state["cooldown_end_time"]:
+        return last_entry_time
+
+    # Forget attempt counters of tracks that have left the frame
+    active_tracks = set(result["active_track_ids"])
+    state["unknown_attempts"] = {track_id: count for track_id, count in state["unknown_attempts"].items()
+                                 if track_id in active_tracks}
+
+    for face_location, name, track_id, attempted in zip(result["face_locations"], result["face_names"],
+                                                        result["track_ids"], result["attempted"]):
+        if name == "Unknown":
+            if not attempted:
+                continue
+            attempts = state["unknown_attempts"].get(track_id, 0) + 1
+            state["unknown_attempts"][track_id] = attempts
+            if attempts >= max_unknown_attempts:
+                print(f"[{camera['name']}] Authentication failed. Manual authorization is not available in multi-camera mode.")
+                speak_text(voice_engine, "Authentication failed", PRIORITY_FAILURE)
+                state["unknown_attempts"][track_id] = 0
+                state["cooldown_end_time"] = time.time() + cooldown_duration
+            continue
+
+        state["unknown_attempts"].pop(track_id, None)
+        cooldown_info, last_entry_time = handle_known_face(
+            face_location, name, roster_cache, attendance_writer,
+            voice_engine, cooldown_duration, last_entry_time, min_entry_gap, None, camera
+        )
+        if cooldown_info:
+            print(f"[{camera['name']}] {cooldown_info['message']}")
+            state["cooldown_end_time"] = cooldown_info["end_time"]
+
+    return last_entry_time
+
+# Multi-camera entry point: one worker process per door, one database connection and one shared gallery
+# gallery_dtype is the storage type of the mapped gallery ("float16" keeps distances within ~1e-4 of float64)
+def run_multi_camera(cameras, scale=0.3, gallery_dtype="float16"):
+    print("Starting Hostel Biometric System (multi-camera)...")
+    start_time = time.time()
+
+    voice_engine = init_voice_engine()
+
+    attendance_collection, students_collection, occupancy_collection, db_connected = open_database()
+    roster_cache = open_roster(students_collection)
+
+    # One journal and batch writer for every door
+    attendance_journal = AttendanceJournal()
+    attendance_writer = AttendanceWriter(attendance_collection, journal=attendance_journal,
+                                         occupancy_collection=occupancy_collection,
+                                         connect=None if db_connected else connect_attendance).start()
+
+    # System parameters
+    # Shared across doors: a student can enter at one gate and exit at another
+    last_entry_time = warm_start_entry_state(attendance_collection, occupancy_collection, attendance_journal)
+    min_entry_gap = 60
+    max_unknown_attempts = 5
+    cooldown_duration = 3.0
+
+    # This process keeps the gallery store in sync with the roster and publishes it to the camera
+    # workers as a quantized, mapped copy, exported again whenever the synced gallery changes
+    gallery_watcher = GalleryWatcher(roster_cache, FACE_IMAGES_DIR).load().start()
+    context = multiprocessing.get_context("spawn")
+    publisher = MappedGalleryPublisher(MAPPED_GALLERY_PATH, gallery_dtype, context)
+    result_queue = context.Queue()
+    stop_event = context.Event()
+    workers = []
+
+    try:
+        published_generation = gallery_watcher.generation
+        if not publisher.publish(gallery_watcher.store_path):
+            print("❌ Error: Could not export the mapped gallery for the camera workers. Stopping.")
+            return
+        print(f"Mapped gallery ready: {len(gallery_watcher.matcher)} faces ({gallery_dtype})")
+        next_publish_time = 0.0
+
+        for camera in cameras:
+            worker = context.Process(
+                target=camera_worker,
+                args=(camera, MAPPED_GALLERY_PATH, publisher.generation, result_queue, stop_event, scale),
+                daemon=True
+            )
+            worker.start()
+            workers.append(worker)
+
+        cameras_by_name = {camera["name"]: camera for camera in cameras}
+        camera_state = {camera["name"]: {"cooldown_end_time": 0, "unknown_attempts": {}} for camera in cameras}
+
+        print(f"System initialized in {time.time() - start_time:.2f} seconds with {len(cameras)} cameras")
+
+        while any(worker.is_alive() for worker in workers) or not result_queue.empty():
+            # Publish the gallery again after a roster change; workers keep the last good one meanwhile
+            generation = gallery_watcher.generation
+            if generation != published_generation and time.time() >= next_publish_time:
+                if publisher.publish(gallery_watcher.store_path):
+                    published_generation = generation
+                    print(f"Mapped gallery updated: {len(gallery_watcher.matcher)} faces")
+                else:
+                    print("⚠ Warning: Could not export the updated gallery, retrying in 30 seconds")
+                    next_publish_time = time.time() + 30.0
+
+            try:
+                result = result_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            last_entry_time = handle_camera_result(
+                result, cameras_by_name[result["camera"]], camera_state, roster_cache,
+                attendance_writer, voice_engine, cooldown_duration, last_entry_time, min_entry_gap,
+                max_unknown_attempts
+            )
+    except KeyboardInterrupt:
+        print("Stopping cameras...")
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join(timeout=5.0)
+        publisher.close()
+        gallery_watcher.stop()
+        roster_cache.stop()
+        attendance_writer.stop()
+        print("Attendance writer:", attendance_writer.stats())
+        attendance_journal.close()
+        if voice_engine:
+            voice_engine.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run several gate cameras from one process with a shared face gallery")
+    parser.add_argument("cameras", nargs="+",
+                        help='camera source (device index, video file, RTSP URL) or "source=...,name=...,direction=Entry|Exit,detector=haar|dnn|hog"')
+    parser.add_argument("--scale", type=float, default=0.3, help="downscale factor applied before detection")
+    parser.add_argument("--gallery-dtype", default="float16", choices=GALLERY_DTYPES,
+                        help="storage type of the gallery shared by the camera workers (default float16)")
+    args = parser.parse_args()
+
+    run_multi_camera([parse_camera_spec(spec, i) for i, spec in enumerate(args.cameras)], scale=args.scale,
+                     gallery_dtype=args.gallery_dtype)
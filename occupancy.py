@@ -0,0 +1,174 @@
+import argparse
+from datetime import datetime, timedelta, timezone
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+OCCUPANCY_COLLECTION = "Occupancy"
+DUPLICATE_KEY_ERROR = 11000
+
+# Occupancy documents, one per student:
+#   {"_id": roll number, "Name", "Inside": bool, "Last Event": datetime, "Last Entry Type", "Camera"}
+# They are updated from each stored attendance record, so "who is inside" never needs the full history.
+
+# Function to get the occupancy collection from the database
+def get_occupancy_collection(db):
+    return db[OCCUPANCY_COLLECTION]
+
+# Function to create the indexes the occupancy queries use
+def ensure_occupancy_indexes(occupancy_collection):
+    try:
+        occupancy_collection.create_index([("Inside", ASCENDING), ("Last Event", ASCENDING)], name="inside_last_event")
+    except PyMongoError as e:
+        print(f"⚠ Warning: Could not create occupancy indexes: {str(e)}")
+
+# Function to turn attendance records into occupancy upserts
+# Each update only applies if it is newer than the stored state, so replays and out-of-order
+# batches cannot move a student backwards
+def occupancy_updates(records):
+    updates = []
+    for record in records:
+        roll_no = record.get("Roll No")
+        timestamp = record.get("Timestamp")
+        if not roll_no or timestamp is None:
+            continue
+        state = {
+            "Name": record["Name"],
+            "Inside": record["Entry Type"] == "Entry",
+            "Last Event": timestamp,
+            "Last Entry Type": record["Entry Type"]
+        }
+        if record.get("Camera"):
+            state["Camera"] = record["Camera"]
+        updates.append(UpdateOne(
+            {"_id": roll_no, "$or": [{"Last Event": {"$lt": timestamp}}, {"Last Event": {"$exists": False}}]},
+            {"$set": state},
+            upsert=True
+        ))
+    return updates
+
+# Function to apply attendance records to the occupancy collection
+# Raises PyMongoError if the server is unreachable, so the caller can retry the batch
+def apply_occupancy(occupancy_collection, records):
+    updates = occupancy_updates(records)
+    if not updates:
+        return
+    try:
+        occupancy_collection.bulk_write(updates, ordered=False)
+    except BulkWriteError as e:
+        # A duplicate key means the stored state is already newer than this record
+        for error in e.details.get("writeErrors", []):
+            if error.get("code") != DUPLICATE_KEY_ERROR:
+                print(f"❌ Occupancy update rejected: {error.get('errmsg')}")
+
+# Function to list the students currently inside
+def currently_inside(occupancy_collection):
+    return occupancy_collection.find({"Inside": True}).sort("Last Event", ASCENDING)
+
+# Function to count the students currently inside
+def count_inside(occupancy_collection):
+    return occupancy_collection.count_documents({"Inside": True})
+
+# Function to list students who are out past curfew ("HH:MM" local times)
+# That is everyone outside who left before the end of the most recent curfew night (or before now,
+# while that night is still in progress); students who went out after the hostel reopened are not listed
+def out_past_curfew(occupancy_collection, curfew="22:00", reopen="06:00", now=None):
+    now = now or datetime.now()
+    curfew_start = _at_time(now, curfew)
+    if curfew_start > now:
+        curfew_start -= timedelta(days=1)
+    curfew_end = _at_time(curfew_start, reopen)
+    if curfew_end <= curfew_start:
+        curfew_end += timedelta(days=1)
+
+    cutoff = min(now, curfew_end)
+    return occupancy_collection.find({
+        "Inside": False,
+        "Last Event": {"$lt": cutoff.astimezone(timezone.utc)}
+    }).sort("Last Event", DESCENDING)
+
+def _at_time(day, time_text):
+    hour, minute = (int(part) for part in time_text.split(":"))
+    return day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+# Function to rebuild the occupancy view from the full attendance history in one server-side aggregation
+# The sort matches the (Roll No, Timestamp) index, so the server can take each student's latest
+# event straight from the index; $merge keeps whichever state is newer if the view is already populated
+def rebuild_occupancy(attendance_collection, occupancy_collection):
+    pipeline = [
+        {"$match": {"Roll No": {"$gt": 0}}},
+        {"$sort": {"Roll No": -1, "Timestamp": -1}},
+        {"$group": {
+            "_id": "$Roll No",
+            "Name": {"$first": "$Name"},
+            "Last Event": {"$first": "$Timestamp"},
+            "Last Entry Type": {"$first": "$Entry Type"},
+            "Camera": {"$first": "$Camera"}
+        }},
+        {"$match": {"Last Event": {"$ne": None}}},
+        {"$set": {"Inside": {"$eq": ["$Last Entry Type", "Entry"]}}},
+        {"$merge": {
+            "into": occupancy_collection.name,
+            "on": "_id",
+            "whenMatched": [{"$replaceWith": {
+                "$cond": [{"$gt": ["$$new.Last Event", "$Last Event"]}, "$$new", "$$ROOT"]
+            }}],
+            "whenNotMatched": "insert"
+        }}
+    ]
+    attendance_collection.aggregate(pipeline, allowDiskUse=True)
+    print(f"Occupancy rebuilt from history: {occupancy_collection.estimated_document_count()} students")
+
+# Function to reconstruct each student's last Entry/Exit (the in-process last_entry_time map) at startup
+# Reads the occupancy view (rebuilding it with one aggregation if it is empty), then applies any
+# events still waiting in the local journal, which may be newer than what reached MongoDB
+def warm_start_entry_state(attendance_collection, occupancy_collection, journal=None):
+    last_entry_time = {}
+
+    def apply(name, timestamp, entry_type):
+        if timestamp is None:
+            return
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        event_time = timestamp.timestamp()
+        if name not in last_entry_time or event_time > last_entry_time[name]["time"]:
+            last_entry_time[name] = {"time": event_time, "type": entry_type}
+
+    if occupancy_collection is not None:
+        try:
+            if occupancy_collection.estimated_document_count() == 0:
+                rebuild_occupancy(attendance_collection, occupancy_collection)
+            for state in occupancy_collection.find({}, {"Name": 1, "Last Event": 1, "Last Entry Type": 1}):
+                apply(state["Name"], state.get("Last Event"), state.get("Last Entry Type"))
+        except PyMongoError as e:
+            print(f"⚠ Warning: Could not load entry/exit state from MongoDB: {str(e)}")
+
+    if journal is not None:
+        for record in journal.latest_records():
+            apply(record["Name"], record.get("Timestamp"), record["Entry Type"])
+
+    print(f"Entry/exit state restored for {len(last_entry_time)} students")
+    return last_entry_time
+
+if __name__ == "__main__":
+    from database_record import get_db
+
+    parser = argparse.ArgumentParser(description="Hostel occupancy report")
+    parser.add_argument("--curfew", help='list students out past this curfew time, e.g. "22:00"')
+    parser.add_argument("--reopen", default="06:00", help="time the curfew ends (default 06:00)")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the occupancy view from attendance history")
+    args = parser.parse_args()
+
+    db, attendance_collection, students_collection, db_connected = get_db()
+    if not db_connected:
+        print("Cannot read occupancy: MongoDB is not reachable.")
+    else:
+        occupancy_collection = get_occupancy_collection(db)
+        if args.rebuild:
+            rebuild_occupancy(attendance_collection, occupancy_collection)
+        if args.curfew:
+            for student in out_past_curfew(occupancy_collection, args.curfew, args.reopen):
+                print(f"{student['_id']}  {student['Name']}  out since {student['Last Event']}")
+        else:
+            for student in currently_inside(occupancy_collection):
+                print(f"{student['_id']}  {student['Name']}  inside since {student['Last Event']}")
+            print(f"Inside now: {count_inside(occupancy_collection)}")
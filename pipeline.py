@@ -0,0 +1,126 @@
+import threading
+import queue
+import time
+from metrics import metrics
+
+# Function to put an item on a bounded queue, dropping the oldest item instead of blocking when full
+def put_latest(bounded_queue, item):
+    dropped = 0
+    while True:
+        try:
+            bounded_queue.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                bounded_queue.get_nowait()
+                dropped += 1
+            except queue.Empty:
+                pass
+
+# Capture stage: a thread that keeps reading the camera and always holds only the latest frame
+class LatestFrameCapture:
+    def __init__(self, video_capture):
+        self.video_capture = video_capture
+        self.failed = False
+        self._frame = None
+        self._frame_id = 0
+        self._timestamp = 0.0
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while self._running:
+            with metrics.timer("capture"):
+                ret, frame = self.video_capture.read()
+            with self._condition:
+                if not ret:
+                    self.failed = True
+                    self._condition.notify_all()
+                    break
+                self._frame = frame
+                self._frame_id += 1
+                self._timestamp = time.time()
+                self._condition.notify_all()
+
+    # Wait for a frame newer than last_frame_id; returns (frame_id, frame, timestamp) or None on timeout/failure
+    def wait_for_frame(self, last_frame_id=None, timeout=1.0):
+        deadline = time.time() + timeout
+        with self._condition:
+            while self._frame is None or self._frame_id == last_frame_id:
+                remaining = deadline - time.time()
+                if self.failed or remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            return self._frame_id, self._frame, self._timestamp
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+# Recognition stage: a worker thread consuming frames from a bounded queue
+# process_frame(frame) must return a dict; frame id, capture timestamp and latency are added to it
+# Stale frames are dropped on submit, and only the newest result is kept for the render loop
+class RecognitionWorker:
+    def __init__(self, process_frame, max_pending=1):
+        self.process_frame = process_frame
+        self.input_queue = queue.Queue(maxsize=max_pending)
+        self.output_queue = queue.Queue(maxsize=1)
+        self.dropped_frames = 0
+        self.dropped_results = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    # Offer a frame to the worker without blocking the caller
+    def submit(self, frame_id, frame, timestamp):
+        dropped = put_latest(self.input_queue, (frame_id, frame, timestamp))
+        self.dropped_frames += dropped
+        if dropped:
+            metrics.inc("dropped_frames", dropped)
+
+    # Latest finished result, or None if nothing new is ready
+    def get_result(self):
+        try:
+            return self.output_queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _run(self):
+        while self._running:
+            try:
+                frame_id, frame, timestamp = self.input_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            start_time = time.time()
+            try:
+                result = self.process_frame(frame)
+            except Exception as e:
+                print(f"Error in recognition worker: {str(e)}")
+                continue
+
+            result.update({
+                "frame_id": frame_id,
+                "timestamp": timestamp,
+                "latency": time.time() - start_time
+            })
+            metrics.observe("recognition", result["latency"])
+            self.dropped_results += put_latest(self.output_queue, result)
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2.0)
@@ -0,0 +1,124 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+
+# Rate-limited source of JPEG preview frames
+# The recognition loop asks wants_frame() before drawing anything, so frames are only copied,
+# annotated and encoded while someone is watching, and never faster than max_fps.
+class PreviewPublisher:
+    def __init__(self, max_fps=5.0, jpeg_quality=70):
+        self.interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.jpeg_quality = jpeg_quality
+        self.viewers = 0
+        self._jpeg = None
+        self._jpeg_id = 0
+        self._last_publish = 0.0
+        self._condition = threading.Condition()
+
+    # Whether the loop should render the current frame for the preview
+    def wants_frame(self, now=None):
+        now = time.time() if now is None else now
+        return self.viewers > 0 and now - self._last_publish >= self.interval
+
+    def publish(self, display_frame, now=None):
+        ok, jpeg = cv2.imencode(".jpg", display_frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return
+        with self._condition:
+            self._jpeg = jpeg.tobytes()
+            self._jpeg_id += 1
+            self._last_publish = time.time() if now is None else now
+            self._condition.notify_all()
+
+    # Wait for a JPEG newer than last_id; returns (id, bytes) or None on timeout
+    def wait_for_jpeg(self, last_id=None, timeout=5.0):
+        deadline = time.time() + timeout
+        with self._condition:
+            while self._jpeg is None or self._jpeg_id == last_id:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            return self._jpeg_id, self._jpeg
+
+    def _add_viewer(self, delta):
+        with self._condition:
+            self.viewers += delta
+
+# Local MJPEG server for the preview: /stream.mjpg (multipart stream) and /snapshot.jpg
+class MjpegServer:
+    def __init__(self, publisher, host="127.0.0.1", port=8081):
+        self.publisher = publisher
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        publisher = self.publisher
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/stream.mjpg":
+                    self._stream()
+                elif path == "/snapshot.jpg":
+                    self._snapshot()
+                else:
+                    self.send_error(404)
+
+            def _snapshot(self):
+                publisher._add_viewer(1)
+                try:
+                    frame = publisher.wait_for_jpeg(publisher._jpeg_id)  # a fresh frame, not a cached one
+                finally:
+                    publisher._add_viewer(-1)
+                if frame is None:
+                    self.send_error(503, "No preview frame available")
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(frame[1])))
+                self.end_headers()
+                self.wfile.write(frame[1])
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                publisher._add_viewer(1)
+                last_id = None
+                try:
+                    while True:
+                        frame = publisher.wait_for_jpeg(last_id)
+                        if frame is None:
+                            continue
+                        last_id, jpeg = frame
+                        self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n")
+                        self.wfile.write(f"Content-Length: {len(jpeg)}\r\n\r\n".encode("ascii"))
+                        self.wfile.write(jpeg + b"\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    publisher._add_viewer(-1)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            print(f"⚠ Warning: Could not start preview server on {self.host}:{self.port}: {str(e)}")
+            return self
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"Preview available at http://{self.host}:{self.port}/stream.mjpg")
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
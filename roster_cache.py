@@ -0,0 +1,253 @@
+import threading
+import time
+from datetime import datetime, timezone
+from pymongo.errors import PyMongoError, OperationFailure
+
+STUDENT_FIELDS = {"_id": 1, "Name": 1, "Roll No": 1, "Face Registered": 1, "Updated At": 1}
+
+# Function to get the "Updated At" value writers set, so polling gates notice the change
+def update_timestamp():
+    return datetime.now(timezone.utc)
+
+# Function to create the indexes the Students queries rely on
+def ensure_student_indexes(students_collection):
+    try:
+        students_collection.create_index("Roll No", unique=True, name="roll_no_unique")
+    except OperationFailure as e:
+        # Existing duplicate roll numbers: fall back to a plain index and warn
+        print(f"⚠ Warning: Could not create unique Roll No index ({str(e)}), using a non-unique index")
+        students_collection.create_index("Roll No", name="roll_no")
+    students_collection.create_index("Name", name="name")
+    students_collection.create_index("Face Registered", name="face_registered")
+    students_collection.create_index("Updated At", name="updated_at")
+
+# In-memory student roster keyed by both name and roll number
+# Loaded with one bulk query, then kept fresh by a change stream when the server supports it
+# (replica sets), otherwise by polling plus a periodic full reload. Each poll picks up new
+# documents (_id after the newest one cached), documents whose "Updated At" moved past the newest
+# one cached (renames, "Face Registered"; set by this app and by enroll.py), and deletions (the
+# document count no longer matches the cache). Edits made by other tools without "Updated At"
+# wait for the full reload. Lookups that miss MongoDB too are remembered for miss_ttl seconds.
+class RosterCache:
+    def __init__(self, students_collection, seed_students=None, poll_interval=30.0, full_refresh_interval=600.0,
+                 miss_ttl=30.0):
+        self.students_collection = students_collection
+        self.poll_interval = poll_interval
+        self.full_refresh_interval = full_refresh_interval
+        self.miss_ttl = miss_ttl
+        self._lock = threading.Lock()
+        self._by_id = {}
+        self._by_name = {}
+        self._by_roll = {}
+        self._misses = {}  # (field, value) -> time the negative result expires
+        self._max_id = None
+        self._max_updated = None
+        self.version = 0  # bumped when the roster actually changes, so watchers can tell when to resync
+        self._running = False
+        self._thread = None
+        self._change_stream = None
+        if seed_students:
+            self._replace_all(seed_students)
+
+    # Load every student in one query
+    def load(self):
+        if self.students_collection is None:
+            return self
+        try:
+            self._replace_all(list(self.students_collection.find({}, STUDENT_FIELDS)))
+            print(f"Roster loaded: {len(self._by_roll)} students")
+        except PyMongoError as e:
+            print(f"❌ Error loading student roster: {str(e)}")
+        return self
+
+    def _replace_all(self, students):
+        by_id, by_name, by_roll = {}, {}, {}
+        max_id = None
+        max_updated = None
+        for student in students:
+            by_name[student["Name"]] = student
+            by_roll[student["Roll No"]] = student
+            if "_id" in student:
+                by_id[student["_id"]] = student
+                if max_id is None or student["_id"] > max_id:
+                    max_id = student["_id"]
+            if student.get("Updated At") and (max_updated is None or student["Updated At"] > max_updated):
+                max_updated = student["Updated At"]
+        with self._lock:
+            changed = by_roll != self._by_roll
+            self._by_id, self._by_name, self._by_roll = by_id, by_name, by_roll
+            self._max_id = max_id
+            self._max_updated = max_updated
+            self._misses.clear()
+            if changed:
+                self.version += 1
+
+    # Add or replace one student in the cache
+    def upsert(self, student):
+        with self._lock:
+            previous = self._by_id.get(student.get("_id")) or self._by_roll.get(student["Roll No"])
+            if previous == student and self._by_name.get(student["Name"]) is previous:
+                return
+            if previous:
+                self._forget(previous)
+            self._by_name[student["Name"]] = student
+            self._by_roll[student["Roll No"]] = student
+            if "_id" in student:
+                self._by_id[student["_id"]] = student
+                if self._max_id is None or student["_id"] > self._max_id:
+                    self._max_id = student["_id"]
+            if student.get("Updated At") and (self._max_updated is None or student["Updated At"] > self._max_updated):
+                self._max_updated = student["Updated At"]
+            self._misses.pop(("Name", student["Name"]), None)
+            self._misses.pop(("Roll No", student["Roll No"]), None)
+            self.version += 1
+
+    def _forget(self, student):
+        if self._by_name.get(student["Name"]) is student:
+            del self._by_name[student["Name"]]
+        if self._by_roll.get(student["Roll No"]) is student:
+            del self._by_roll[student["Roll No"]]
+        self._by_id.pop(student.get("_id"), None)
+
+    def remove_by_id(self, student_id):
+        with self._lock:
+            student = self._by_id.get(student_id)
+            if student:
+                self._forget(student)
+                self.version += 1
+
+    # Look up by name; a miss falls through to MongoDB so brand-new students are found before the next refresh
+    def get_by_name(self, name):
+        with self._lock:
+            student = self._by_name.get(name)
+        return student or self._fetch({"Name": name})
+
+    def get_by_roll(self, roll_no):
+        with self._lock:
+            student = self._by_roll.get(roll_no)
+        return student or self._fetch({"Roll No": roll_no})
+
+    def _fetch(self, query):
+        if self.students_collection is None:
+            return None
+        key = next(iter(query.items()))
+        with self._lock:
+            if self._misses.get(key, 0.0) > time.time():
+                return None
+        try:
+            student = self.students_collection.find_one(query, STUDENT_FIELDS)
+        except PyMongoError as e:
+            print(f"Error looking up student: {str(e)}")
+            return None
+        if student:
+            self.upsert(student)
+        else:
+            with self._lock:
+                self._misses[key] = time.time() + self.miss_ttl
+        return student
+
+    # Mark a student's face as registered in MongoDB and in the cache; returns True on success
+    def set_face_registered(self, roll_no, registered=True):
+        if self.students_collection is not None:
+            try:
+                self.students_collection.update_one(
+                    {"Roll No": roll_no},
+                    {"$set": {"Face Registered": registered, "Updated At": update_timestamp()}}
+                )
+            except PyMongoError as e:
+                print(f"❌ Error updating student {roll_no}: {str(e)}")
+                return False
+        student = self.get_by_roll(roll_no)
+        if student:
+            self.upsert(dict(student, **{"Face Registered": registered}))
+        return True
+
+    def registered_students(self):
+        with self._lock:
+            return [student for student in self._by_roll.values() if student.get("Face Registered", False)]
+
+    def __len__(self):
+        return len(self._by_roll)
+
+    # Start the background refresher
+    def start(self):
+        if self.students_collection is None:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self._watch()
+        except OperationFailure:
+            # Standalone servers have no change streams
+            print("Roster: change streams unavailable, polling for changes instead")
+        except PyMongoError as e:
+            if self._running:
+                print(f"Roster: change stream stopped ({str(e)}), polling for changes instead")
+        self._poll()
+
+    def _watch(self):
+        with self.students_collection.watch(full_document="updateLookup") as stream:
+            self._change_stream = stream
+            while self._running and stream.alive:
+                change = stream.try_next()
+                if change is None:
+                    time.sleep(0.5)
+                    continue
+                if change["operationType"] == "delete":
+                    self.remove_by_id(change["documentKey"]["_id"])
+                elif change.get("fullDocument"):
+                    document = change["fullDocument"]
+                    self.upsert({key: document[key] for key in STUDENT_FIELDS if key in document})
+
+    def _poll(self):
+        last_full_refresh = time.time()
+        while self._running:
+            time.sleep(self.poll_interval)
+            if not self._running:
+                break
+            try:
+                if time.time() - last_full_refresh >= self.full_refresh_interval:
+                    self.load()
+                    last_full_refresh = time.time()
+                    continue
+
+                self._poll_changes()
+            except PyMongoError as e:
+                print(f"Roster refresh failed: {str(e)}")
+
+    # Incremental refresh for servers without change streams
+    def _poll_changes(self):
+        # New students: ObjectIds increase, so they sort after the newest one we have;
+        # edited students: "Updated At" moved past the newest value we have
+        with self._lock:
+            max_id, max_updated = self._max_id, self._max_updated
+        changed = []
+        if max_id is not None:
+            changed.append({"_id": {"$gt": max_id}})
+        if max_updated is not None:
+            changed.append({"Updated At": {"$gt": max_updated}})
+        else:
+            changed.append({"Updated At": {"$exists": True}})
+        query = {"$or": changed} if max_id is not None else {}
+        for student in self.students_collection.find(query, STUDENT_FIELDS):
+            self.upsert(student)
+
+        # Deleted students: the document count no longer matches the cache, so compare _ids (one covered query)
+        if self.students_collection.estimated_document_count() != len(self._by_id):
+            current_ids = {student["_id"] for student in self.students_collection.find({}, {"_id": 1})}
+            with self._lock:
+                removed = [student_id for student_id in self._by_id if student_id not in current_ids]
+            for student_id in removed:
+                self.remove_by_id(student_id)
+
+    def stop(self):
+        self._running = False
+        if self._change_stream is not None:
+            try:
+                self._change_stream.close()
+            except PyMongoError:
+                pass
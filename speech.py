@@ -0,0 +1,161 @@
+import hashlib
+import os
+import threading
+import time
+from metrics import metrics
+
+try:
+    import winsound  # plays the pre-rendered phrases (Windows only; elsewhere every phrase is synthesized live)
+except ImportError:
+    winsound = None
+
+# Announcement priorities (lower is spoken first)
+PRIORITY_FAILURE = 0
+PRIORITY_WELCOME = 1
+PRIORITY_INFO = 2
+
+# Fixed phrases rendered to audio files once, so announcing them skips live synthesis
+CACHED_PHRASES = ["Authentication failed", "Entry successful", "Exit successful", "Please look at the camera"]
+SPEECH_CACHE_DIR = "speech_cache"
+
+# Function to split an announcement into sentences ("Entry successful. Welcome, Name" -> two parts)
+def split_sentences(text):
+    return [sentence.strip() for sentence in text.split(". ") if sentence.strip()]
+
+# One queued announcement; announcements sharing their first sentence are merged into one
+class Announcement:
+    def __init__(self, text, priority, now, max_age):
+        self.sentences = split_sentences(text)
+        self.priority = priority
+        self.created = [now]  # one entry per merged announcement, for the latency metric
+        self.deadline = now + max_age
+
+    @property
+    def key(self):
+        return self.sentences[0] if self.sentences else ""
+
+    def merge(self, other):
+        for sentence in other.sentences:
+            if sentence not in self.sentences:
+                self.sentences.append(sentence)
+        self.priority = min(self.priority, other.priority)
+        self.created.extend(other.created)
+        self.deadline = max(self.deadline, other.deadline)
+
+# Speech thread with a coalescing priority queue
+# Announcements are merged with a pending one that starts with the same phrase (two welcomes at
+# once become "Entry successful. Welcome, A. Welcome, B"; repeated failures become one), failures
+# are spoken before welcomes, and announcements still waiting after max_age seconds are dropped
+# instead of being read out to someone who has already walked through. Fixed phrases are played
+# from audio files rendered at startup, so only the name part goes through the engine.
+class Speaker:
+    def __init__(self, engine, max_age=4.0, cache_dir=SPEECH_CACHE_DIR, cached_phrases=CACHED_PHRASES):
+        self.engine = engine
+        self.max_age = max_age
+        self.cache_dir = cache_dir
+        self.cached_phrases = cached_phrases if winsound else []
+        self.phrase_files = {}
+        self.spoken = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self._pending = []
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    @property
+    def depth(self):
+        with self._condition:
+            return len(self._pending)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    # Queue an announcement; max_age overrides the default freshness deadline
+    def say(self, text, priority=PRIORITY_INFO, max_age=None):
+        announcement = Announcement(text, priority, time.time(), self.max_age if max_age is None else max_age)
+        if not announcement.sentences:
+            return
+        with self._condition:
+            for pending in self._pending:
+                if pending.key == announcement.key:
+                    pending.merge(announcement)
+                    self.coalesced += 1
+                    metrics.inc("speech_coalesced")
+                    break
+            else:
+                self._pending.append(announcement)
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        print("Speech thread exiting")
+
+    # Highest priority first, oldest first within a priority; stale announcements are dropped
+    def _next(self):
+        with self._condition:
+            while self._running:
+                now = time.time()
+                fresh = [a for a in self._pending if a.deadline >= now]
+                dropped = len(self._pending) - len(fresh)
+                if dropped:
+                    self.dropped += dropped
+                    metrics.inc("speech_dropped", dropped)
+                self._pending = fresh
+                if fresh:
+                    announcement = min(fresh, key=lambda a: (a.priority, a.created[0]))
+                    self._pending.remove(announcement)
+                    return announcement
+                self._condition.wait(1.0)
+        return None
+
+    def _run(self):
+        self._render_phrases()
+        while True:
+            announcement = self._next()
+            if announcement is None:
+                break
+            start = time.time()
+            for created in announcement.created:
+                metrics.observe("speech_latency", start - created)
+            try:
+                for sentence in announcement.sentences:
+                    self._speak(sentence)
+            except Exception as e:
+                print(f"Error in speech thread: {str(e)}")
+            metrics.observe("speech_duration", time.time() - start)
+            self.spoken += 1
+
+    def _speak(self, sentence):
+        phrase_file = self.phrase_files.get(sentence)
+        if phrase_file:
+            winsound.PlaySound(phrase_file, winsound.SND_FILENAME)
+            return
+        self.engine.say(sentence)
+        self.engine.runAndWait()
+
+    # Render the fixed phrases to WAV files (reused across runs while the voice settings stay the same)
+    def _render_phrases(self):
+        if not self.cached_phrases:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            voice = f"{self.engine.getProperty('voice')}|{self.engine.getProperty('rate')}|{self.engine.getProperty('volume')}"
+            for phrase in self.cached_phrases:
+                digest = hashlib.sha1(f"{voice}|{phrase}".encode("utf-8")).hexdigest()[:16]
+                path = os.path.join(self.cache_dir, f"{digest}.wav")
+                if not os.path.exists(path):
+                    self.engine.save_to_file(phrase, path)
+                    self.engine.runAndWait()
+                if os.path.exists(path) and os.path.getsize(path) > 0:
+                    self.phrase_files[phrase] = path
+            print(f"✅ {len(self.phrase_files)} speech phrases ready in {self.cache_dir}")
+        except Exception as e:
+            print(f"⚠ Warning: Could not pre-render speech phrases, using live synthesis: {str(e)}")
@@ -0,0 +1,159 @@
+import time
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, BulkWriteError
+from attendance_journal import AttendanceJournal, replay_journal
+from attendance_writer import AttendanceWriter, DUPLICATE_KEY_ERROR
+
+
+# In-memory stand-in for the attendance collection
+class FakeCollection:
+    def __init__(self, down=False, invalid_rolls=()):
+        self.down = down
+        self.invalid_rolls = set(invalid_rolls)
+        self.stored = {}
+
+    def insert_many(self, records, ordered=False):
+        if self.down:
+            raise AutoReconnect("server unreachable")
+        errors = []
+        for index, record in enumerate(records):
+            if record["Roll No"] in self.invalid_rolls:
+                errors.append({"index": index, "code": 121, "errmsg": "Document failed validation"})
+            elif record["_id"] in self.stored:
+                errors.append({"index": index, "code": DUPLICATE_KEY_ERROR, "errmsg": "duplicate key"})
+            else:
+                self.stored[record["_id"]] = record
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+def make_record(roll_no):
+    return {"_id": ObjectId(), "Name": f"Student {roll_no}", "Roll No": roll_no, "Entry Type": "Entry"}
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = AttendanceJournal(str(tmp_path / "journal.db"))
+    yield journal
+    journal.close()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_append_is_idempotent_by_id(journal):
+    record = make_record(1)
+    journal.append(record)
+    journal.append(record)
+    assert journal.pending_count() == 1
+    assert [r["_id"] for _, r in journal.unsynced(10)] == [record["_id"]]
+
+
+def test_replay_acknowledges_every_event(journal):
+    records = [make_record(roll_no) for roll_no in range(1, 8)]
+    for record in records:
+        journal.append(record)
+    collection = FakeCollection()
+
+    assert replay_journal(journal, collection, batch_size=3) == 7
+    assert journal.pending_count() == 0
+    assert journal.unsynced(10) == []
+    assert set(collection.stored) == {record["_id"] for record in records}
+
+
+def test_replay_counts_duplicates_as_stored_and_drops_rejected(journal):
+    already_stored, invalid, fresh = make_record(1), make_record(2), make_record(3)
+    for record in (already_stored, invalid, fresh):
+        journal.append(record)
+    collection = FakeCollection(invalid_rolls={2})
+    collection.stored[already_stored["_id"]] = already_stored
+
+    assert replay_journal(journal, collection) == 2
+    assert journal.pending_count() == 0
+    # The rejected event stays out of the backlog and out of the warm-up history
+    assert [r["Roll No"] for r in journal.latest_records()] == [1, 3]
+
+
+def test_replay_stops_while_server_is_down(journal):
+    journal.append(make_record(1))
+    assert replay_journal(journal, FakeCollection(down=True)) == 0
+    assert journal.pending_count() == 1
+
+
+def test_pending_count_survives_reopening(tmp_path):
+    path = str(tmp_path / "journal.db")
+    journal = AttendanceJournal(path)
+    for roll_no in (1, 2, 3):
+        journal.append(make_record(roll_no))
+    seq, _ = journal.unsynced(1)[0]
+    journal.mark_synced([seq])
+    journal.mark_synced([seq])  # acknowledging twice does not count twice
+    assert journal.pending_count() == 2
+    journal.close()
+
+    reopened = AttendanceJournal(path)
+    assert reopened.pending_count() == 2
+    reopened.close()
+
+
+def test_writer_sends_journaled_records(journal):
+    collection = FakeCollection()
+    writer = AttendanceWriter(collection, journal=journal, flush_interval=0.05).start()
+    for roll_no in (1, 2):
+        writer.insert_one(make_record(roll_no))
+    assert wait_for(lambda: writer.stats()["acknowledged"] == 2)
+    writer.stop()
+    assert writer.stats() == {"acknowledged": 2, "failed": 0, "pending": 0}
+
+
+def test_writer_connects_after_failed_startup_and_replays(journal):
+    collection = FakeCollection()
+    attempts = []
+
+    def connect():
+        attempts.append(time.time())
+        return None if len(attempts) < 3 else (collection, None)
+
+    writer = AttendanceWriter(None, journal=journal, flush_interval=0.02, retry_backoff=0.01,
+                              connect=connect).start()
+    writer.insert_one(make_record(1))
+    writer.insert_one(make_record(2))
+    assert wait_for(lambda: writer.stats()["acknowledged"] == 2)
+    writer.stop()
+    assert len(attempts) == 3
+    assert len(collection.stored) == 2
+    assert journal.pending_count() == 0
+
+
+def test_latest_records_returns_newest_event_per_student(journal):
+    for roll_no, entry_type in [(1, "Entry"), (2, "Entry"), (1, "Exit"), (3, "Entry"), (2, "Exit")]:
+        journal.append(dict(make_record(roll_no), **{"Entry Type": entry_type}))
+    latest = journal.latest_records()
+    assert [(r["Roll No"], r["Entry Type"]) for r in latest] == [(1, "Exit"), (3, "Entry"), (2, "Exit")]
+
+
+def test_journal_without_roll_no_column_is_upgraded(tmp_path):
+    import sqlite3
+    from bson import json_util
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE events (seq INTEGER PRIMARY KEY AUTOINCREMENT, event_id TEXT NOT NULL UNIQUE, "
+                 "record TEXT NOT NULL, created_at REAL NOT NULL, status INTEGER NOT NULL DEFAULT 0)")
+    for roll_no in (1, 1, 2):
+        record = make_record(roll_no)
+        conn.execute("INSERT INTO events (event_id, record, created_at) VALUES (?, ?, ?)",
+                     (str(record["_id"]), json_util.dumps(record), time.time()))
+    conn.commit()
+    conn.close()
+
+    journal = AttendanceJournal(path)
+    assert sorted(r["Roll No"] for r in journal.latest_records()) == [1, 2]
+    assert journal.pending_count() == 3
+    journal.close()
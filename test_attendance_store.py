@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import pytest
+from attendance_store import parse_legacy_timestamp, migrate_string_dates
+
+
+# Local wall-clock time as the UTC datetime the migration should store
+def local(*fields):
+    return datetime(*fields).astimezone(timezone.utc)
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, key, direction):
+        self.documents = sorted(self.documents, key=lambda document: document[key], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        return self.documents[:count]
+
+
+# In-memory stand-in for the Attendance collection: supports the
+# {"Timestamp": {"$exists": False}, "_id": {"$gt": ...}} query used by the migration
+class FakeAttendance:
+    def __init__(self, documents):
+        self.documents = {document["_id"]: dict(document) for document in documents}
+        self.queries = []
+
+    def find(self, query, projection):
+        self.queries.append(query)
+        after = query.get("_id", {}).get("$gt")
+        matches = [{key: document[key] for key in projection if key in document}
+                   for document in self.documents.values()
+                   if "Timestamp" not in document and (after is None or document["_id"] > after)]
+        return FakeCursor(matches)
+
+    def bulk_write(self, updates, ordered=False):
+        modified = 0
+        for update in updates:
+            document = self.documents[update._filter["_id"]]
+            changes = update._doc["$set"]
+            if any(document.get(key) != value for key, value in changes.items()):
+                document.update(changes)
+                modified += 1
+        return SimpleNamespace(modified_count=modified)
+
+
+def legacy(record_id, date_text, time_text):
+    return {"_id": record_id, "Name": f"Student {record_id}", "Date": date_text, "Time of Attendance": time_text}
+
+
+@pytest.mark.parametrize("time_text, expected", [
+    ("08:15", local(2024, 5, 1, 8, 15)),
+    ("08:15:42", local(2024, 5, 1, 8, 15, 42)),
+    (" 21:05 ", local(2024, 5, 1, 21, 5)),
+    ("09:30PM", local(2024, 5, 1, 21, 30)),
+    ("09:30 am", local(2024, 5, 1, 9, 30)),
+])
+def test_parse_legacy_timestamp_formats(time_text, expected):
+    assert parse_legacy_timestamp("2024-05-01", time_text) == expected
+
+
+@pytest.mark.parametrize("date_text, time_text", [
+    ("2024-05-01", "quarter past eight"),
+    ("01/05/2024", "08:15"),
+    ("2024-05-01", "25:00"),
+    (None, "08:15"),
+    ("2024-05-01", None),
+])
+def test_parse_legacy_timestamp_rejects_unparseable_values(date_text, time_text):
+    assert parse_legacy_timestamp(date_text, time_text) is None
+
+
+def test_migration_adds_timestamps_and_counts_unparseable_rows():
+    already_migrated = dict(legacy(3, "2024-05-01", "10:00"), Timestamp=local(2024, 5, 1, 10, 0))
+    attendance = FakeAttendance([legacy(1, "2024-05-01", "08:15"), legacy(2, "2024-05-01", "garbage"),
+                                 already_migrated, legacy(4, "2024-05-02", "07:45 PM"), legacy(5, None, None)])
+
+    assert migrate_string_dates(attendance) == (2, 2)
+    assert attendance.documents[1]["Timestamp"] == local(2024, 5, 1, 8, 15)
+    assert attendance.documents[4]["Timestamp"] == local(2024, 5, 2, 19, 45)
+    assert "Timestamp" not in attendance.documents[2]
+    assert "Timestamp" not in attendance.documents[5]
+    assert attendance.documents[3]["Timestamp"] == local(2024, 5, 1, 10, 0)
+
+
+def test_migration_pages_through_the_collection_by_id():
+    attendance = FakeAttendance([legacy(record_id, "2024-05-01", "08:00" if record_id % 3 else "bad")
+                                 for record_id in range(1, 11)])
+
+    assert migrate_string_dates(attendance, batch_size=4) == (7, 3)
+    # Batches of 4, 4 and 2 records, then one empty query ends the run
+    assert [query.get("_id") for query in attendance.queries] == [None, {"$gt": 4}, {"$gt": 8}, {"$gt": 10}]
+
+
+def test_migration_rerun_is_idempotent():
+    attendance = FakeAttendance([legacy(1, "2024-05-01", "08:15"), legacy(2, "2024-05-01", "bad"),
+                                 legacy(3, "2024-05-01", "18:30")])
+    assert migrate_string_dates(attendance, batch_size=2) == (2, 1)
+    migrated = {record_id: dict(document) for record_id, document in attendance.documents.items()}
+
+    # The second run only sees the unparseable row and changes nothing
+    assert migrate_string_dates(attendance, batch_size=2) == (0, 1)
+    assert attendance.documents == migrated
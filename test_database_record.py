@@ -0,0 +1,54 @@
+import time
+import pytest
+from bson import ObjectId
+from pymongo.errors import ServerSelectionTimeoutError
+import database_record
+from database_record import get_db, open_database, open_roster, connect_attendance
+from attendance_journal import AttendanceJournal
+from attendance_writer import AttendanceWriter
+
+UNREACHABLE_URI = "mongodb://127.0.0.1:1/"
+
+
+@pytest.fixture
+def mongodb_down(monkeypatch):
+    monkeypatch.setattr(database_record, "MONGO_URI", UNREACHABLE_URI)
+    monkeypatch.setattr(database_record, "SERVER_SELECTION_TIMEOUT_MS", 200)
+
+
+# Collection stand-in for a server that accepted the ping and then went away
+class DeadCollection:
+    name = "dead"
+
+    def __getattr__(self, attribute):
+        def fail(*args, **kwargs):
+            raise ServerSelectionTimeoutError("server went away")
+        return fail
+
+
+def test_get_db_reports_an_unreachable_server(mongodb_down):
+    started = time.time()
+    db, attendance_collection, students_collection, db_connected = get_db()
+    assert (db, attendance_collection, students_collection, db_connected) == (None, None, None, False)
+    assert time.time() - started < 5.0
+
+
+def test_startup_runs_offline_and_journals_attendance(mongodb_down, tmp_path):
+    attendance_collection, students_collection, occupancy_collection, db_connected = open_database()
+    assert not db_connected
+    roster_cache = open_roster(students_collection)
+    assert roster_cache.get_by_name("Snehil Singh")["Roll No"] == 22052509
+
+    journal = AttendanceJournal(str(tmp_path / "journal.db"))
+    writer = AttendanceWriter(attendance_collection, journal=journal, occupancy_collection=occupancy_collection,
+                              connect=connect_attendance, retry_backoff=0.05).start()
+    writer.insert_one({"_id": ObjectId(), "Name": "Snehil Singh", "Roll No": 22052509, "Entry Type": "Entry"})
+    writer.stop()
+    assert journal.pending_count() == 1
+    journal.close()
+
+
+def test_server_lost_during_startup_falls_back_to_offline(monkeypatch):
+    monkeypatch.setattr(database_record, "get_db", lambda: ({"Occupancy": DeadCollection()}, DeadCollection(),
+                                                            DeadCollection(), True))
+    assert open_database() == (None, None, None, False)
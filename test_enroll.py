@@ -0,0 +1,39 @@
+import numpy as np
+from enroll import split_duplicates, split_name_collisions
+
+
+# Students collection stand-in answering the {"Name": {"$in": [...]}} lookup
+class FakeStudents:
+    def __init__(self, students):
+        self.students = students
+
+    def find(self, query, projection=None):
+        names = set(query["Name"]["$in"])
+        return [student for student in self.students if student["Name"] in names]
+
+
+def row(roll_no, name):
+    return {"Roll No": roll_no, "Name": name, "photo": f"{roll_no}_{name}.jpg"}
+
+
+def test_duplicates_within_batch_are_rejected():
+    unique, duplicates = split_duplicates([row(1, "Asha"), row(1, "Ravi"), row(2, "Meera"), row(3, "Meera"),
+                                           row(4, "Kabir")])
+    assert [r["Roll No"] for r in unique] == [4]
+    assert len(duplicates) == 4
+
+
+def test_name_registered_to_another_roll_number_is_rejected():
+    students = FakeStudents([{"Name": "Asha Rao", "Roll No": 100}, {"Name": "Ravi", "Roll No": 2}])
+    unique, collisions = split_name_collisions([row(1, "Asha Rao"), row(2, "Ravi"), row(3, "Meera")], students, {})
+    # Re-enrolling Ravi under the same roll number is an update, not a collision
+    assert [r["Roll No"] for r in unique] == [2, 3]
+    assert [r["Roll No"] for r in collisions] == [1]
+    assert "100" in collisions[0]["reason"]
+
+
+def test_gallery_store_names_are_checked_offline():
+    store = {100: {"name": "Asha Rao", "encoding": np.zeros(128)}}
+    unique, collisions = split_name_collisions([row(1, "Asha Rao"), row(100, "Asha Rao")], None, store)
+    assert [r["Roll No"] for r in unique] == [100]
+    assert [r["Roll No"] for r in collisions] == [1]
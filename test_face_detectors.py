@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from metrics import metrics
+from face_detectors import non_max_suppression, create_detector, HaarDetector, RoiDetector
+
+
+def test_nms_keeps_best_box_of_each_cluster():
+    boxes = [(0, 100, 100, 0), (5, 105, 105, 5), (0, 400, 100, 300), (2, 402, 102, 302)]
+    keep = non_max_suppression(boxes, [0.5, 0.9, 0.8, 0.3])
+    assert sorted(keep) == [1, 2]
+
+
+def test_nms_keeps_boxes_overlapping_less_than_the_threshold():
+    boxes = [(0, 100, 100, 0), (0, 150, 100, 50)]  # IoU 1/3
+    assert sorted(non_max_suppression(boxes, [1.0, 0.9], iou_threshold=0.4)) == [0, 1]
+    assert non_max_suppression(boxes, [1.0, 0.9], iou_threshold=0.3) == [0]
+
+
+def test_nms_of_nothing_is_nothing():
+    assert non_max_suppression([], []) == []
+
+
+def test_create_detector_builds_haar_passes_and_roi_wrapper():
+    face_detector = create_detector("haar", profiles=True, roi=True, full_scan_interval=2.0)
+    assert isinstance(face_detector, RoiDetector)
+    assert isinstance(face_detector.detector, HaarDetector)
+    assert face_detector.full_scan_interval == 2.0
+    face_detector.close()
+
+
+def test_haar_times_grayscale_conversion_apart_from_detection():
+    face_detector = HaarDetector()
+    before = metrics.stage_totals()
+    assert face_detector.detect(np.zeros((120, 160, 3), dtype=np.uint8)) == []
+    after = metrics.stage_totals()
+    for stage in ("convert_gray", "detect"):
+        assert after[stage] > before.get(stage, 0.0)
+    face_detector.close()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_detector("yolo")
+
+
+# Detector stand-in returning fixed boxes (in frame coordinates) that fall inside the searched region
+class FakeDetector:
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.calls = []
+
+    def detect(self, frame):
+        self.calls.append(frame.shape[:2])
+        return list(self.boxes(frame))
+
+    def close(self):
+        pass
+
+
+def roi_detector(boxes, **options):
+    return RoiDetector(FakeDetector(boxes), **options)
+
+
+def test_windows_are_padded_clipped_and_merged():
+    face_detector = roi_detector(lambda frame: [])
+    face_detector._boxes = [(10, 60, 60, 10), (20, 110, 70, 70), (300, 500, 400, 400)]
+    # The first two windows overlap and are searched as one; the third stays apart
+    assert face_detector._windows(480, 640) == [(0, 130, 95, 0), (250, 550, 450, 350)]
+
+
+def test_windows_merged_through_a_bridging_window():
+    face_detector = roi_detector(lambda frame: [], margin=0.0)
+    # Sorted by left edge the bridge comes last, after the other two were kept apart
+    face_detector._boxes = [(0, 20, 20, 0), (100, 30, 120, 10), (10, 40, 110, 15)]
+    assert face_detector._windows(480, 640) == [(0, 40, 120, 0)]
+
+
+def test_roi_scan_runs_between_full_scans():
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    face = (100, 200, 200, 100)
+    detector = FakeDetector(lambda region: [face] if region.shape[:2] == (480, 640) else [(50, 150, 150, 50)])
+    face_detector = RoiDetector(detector, full_scan_interval=60.0)
+
+    assert face_detector.detect(frame) == [face]
+    assert face_detector.detect(frame) == [face]
+    assert (face_detector.full_scans, face_detector.roi_scans) == (1, 1)
+    assert detector.calls[1] == (200, 200)
+    assert face_detector.scanned_fraction < 1.0
+
+
+def test_lost_face_falls_back_to_a_full_scan():
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    faces = [(100, 200, 200, 100)]
+    detector = FakeDetector(lambda region: list(faces) if region.shape[:2] == (480, 640) else [])
+    face_detector = RoiDetector(detector, full_scan_interval=60.0)
+
+    face_detector.detect(frame)
+    faces[:] = [(300, 400, 400, 300)]  # the face moved out of its window
+    assert face_detector.detect(frame) == faces
+    assert (face_detector.full_scans, face_detector.roi_scans) == (2, 0)
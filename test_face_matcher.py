@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from face_matcher import FaceMatcher, create_matcher, ENCODING_SIZE
+
+
+# Function to build unit-length random encodings that are far apart from each other
+def random_encodings(count, seed=0):
+    rng = np.random.default_rng(seed)
+    encodings = rng.normal(size=(count, ENCODING_SIZE))
+    return encodings / np.linalg.norm(encodings, axis=1, keepdims=True)
+
+
+def test_empty_gallery_returns_unknown():
+    matcher = FaceMatcher()
+    assert len(matcher) == 0
+    assert matcher.match([]) == []
+    results = matcher.match(random_encodings(2))
+    assert [result["name"] for result in results] == ["Unknown", "Unknown"]
+    assert all(result["distance"] == float("inf") and result["index"] == -1 for result in results)
+
+
+def test_top2_distance_and_margin():
+    encodings = random_encodings(3)
+    matcher = FaceMatcher(encodings, ["A", "B", "C"], tolerance=0.6)
+    query = encodings[1] + 0.01
+
+    result = matcher.match([query])[0]
+    distances = np.linalg.norm(encodings - query, axis=1)
+    assert result["name"] == "B"
+    assert result["index"] == 1
+    assert result["distance"] == pytest.approx(distances[1])
+    assert result["margin"] == pytest.approx(np.sort(distances)[1] - distances[1])
+
+
+def test_single_face_has_infinite_margin():
+    encodings = random_encodings(1)
+    result = FaceMatcher(encodings, ["A"]).match(encodings)[0]
+    assert result["name"] == "A"
+    assert result["margin"] == float("inf")
+
+
+def test_distance_above_tolerance_is_unknown():
+    encodings = random_encodings(2)
+    matcher = FaceMatcher(encodings, ["A", "B"], tolerance=0.6)
+    # Random unit vectors in 128 dimensions are about sqrt(2) apart
+    result = matcher.match(random_encodings(1, seed=1))[0]
+    assert result["name"] == "Unknown"
+    assert result["index"] in (0, 1)
+
+
+def test_batch_matches_each_query():
+    encodings = random_encodings(5)
+    matcher = FaceMatcher(encodings, list("ABCDE"))
+    results = matcher.match(encodings[[4, 0, 2]])
+    assert [result["name"] for result in results] == ["E", "A", "C"]
+
+
+def test_add_grows_gallery():
+    matcher = FaceMatcher()
+    encodings = random_encodings(20)
+    for i, encoding in enumerate(encodings):
+        matcher.add(f"S{i}", encoding)
+    assert len(matcher) == 20
+    assert matcher.match([encodings[17]])[0]["name"] == "S17"
+    np.testing.assert_allclose(matcher.encodings, encodings)
+
+
+def test_remove_swaps_last_row_into_hole():
+    encodings = random_encodings(4)
+    matcher = FaceMatcher(encodings, ["A", "B", "C", "D"])
+
+    assert matcher.remove("B") == 1
+    assert matcher.names == ["A", "D", "C"]
+    np.testing.assert_allclose(matcher.encodings, encodings[[0, 3, 2]])
+    # Squared norms moved with their rows, so distances stay exact
+    assert matcher.match([encodings[3]])[0]["name"] == "D"
+    assert matcher.match([encodings[3]])[0]["distance"] == pytest.approx(0.0, abs=1e-6)
+    assert matcher.match([encodings[1]])[0]["name"] == "Unknown"
+
+
+def test_remove_deletes_every_row_for_a_name():
+    encodings = random_encodings(4)
+    matcher = FaceMatcher(encodings, ["A", "B", "A", "A"])
+    assert matcher.remove("A") == 3
+    assert matcher.names == ["B"]
+    assert matcher.remove("missing") == 0
+    assert matcher.remove("B") == 1
+    assert len(matcher) == 0
+    assert matcher.match(encodings[:1])[0]["name"] == "Unknown"
+
+
+def test_remove_then_add_reuses_space():
+    encodings = random_encodings(3)
+    matcher = FaceMatcher(encodings[:2], ["A", "B"])
+    matcher.remove("A")
+    matcher.add("C", encodings[2])
+    assert matcher.names == ["B", "C"]
+    assert matcher.match([encodings[2]])[0]["name"] == "C"
+
+
+def test_create_matcher_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        create_matcher([], [], mode="annoy")
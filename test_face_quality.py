@@ -0,0 +1,45 @@
+import numpy as np
+import cv2
+import pytest
+from face_quality import FaceQualityScorer
+
+
+# Frame holding a symmetric, textured "face" of the given size at (20, 20)
+# The texture is smoothed at a fixed 96 px, so a face has the same relative blur at every size
+def face_frame(size, blur=1.0, brightness=128):
+    rng = np.random.default_rng(0)
+    texture = rng.normal(0, 40, (96, 48))
+    texture = np.hstack([texture, texture[:, ::-1]]) + brightness
+    texture = cv2.GaussianBlur(np.clip(texture, 0, 255).astype(np.float32), (0, 0), blur)
+    face = cv2.resize(texture, (size, size), interpolation=cv2.INTER_AREA).astype(np.uint8)
+    frame = np.full((size + 40, size + 40), brightness, dtype=np.uint8)
+    frame[20:20 + size, 20:20 + size] = face
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR), (20, 20 + size, 20 + size, 20)
+
+
+# Enlarging a small face to the patch smooths it; the threshold follows, so small faces are not "blurred"
+@pytest.mark.parametrize("size", [30, 40, 90])
+def test_sharp_faces_pass_at_every_size(size):
+    frame, box = face_frame(size)
+    score = FaceQualityScorer().score(frame, box)
+    assert score["passed"], score
+
+
+@pytest.mark.parametrize("size", [30, 40, 90])
+def test_blurred_faces_fail_at_every_size(size):
+    frame, box = face_frame(size, blur=2.0)
+    assert FaceQualityScorer().score(frame, box)["reason"] == "blur"
+
+
+def test_small_and_dark_faces_are_rejected():
+    scorer = FaceQualityScorer()
+    frame, box = face_frame(20)
+    assert scorer.score(frame, box)["reason"] == "size"
+    frame, box = face_frame(60, brightness=15)
+    assert scorer.score(frame, box)["reason"] == "lighting"
+
+
+def test_box_outside_the_frame_scores_zero():
+    frame, _ = face_frame(40)
+    assert FaceQualityScorer().score(frame, (500, 600, 600, 500)) == {"quality": 0.0, "passed": False,
+                                                                      "reason": "size", "size": 0}
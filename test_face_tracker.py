@@ -0,0 +1,123 @@
+import pytest
+from face_tracker import FaceTracker, box_iou
+
+
+def match(name, distance):
+    return {"name": name, "distance": distance, "margin": 0.2, "index": 0}
+
+
+def test_box_iou():
+    assert box_iou((0, 10, 10, 0), (0, 10, 10, 0)) == pytest.approx(1.0)
+    assert box_iou((0, 10, 10, 0), (0, 20, 10, 10)) == 0.0
+    assert box_iou((0, 10, 10, 0), (0, 15, 10, 5)) == pytest.approx(50 / 150)
+
+
+def test_overlapping_detection_keeps_track_id():
+    tracker = FaceTracker()
+    first = tracker.update([(100, 200, 200, 100)], now=0.0)[0]
+    second = tracker.update([(105, 205, 205, 105)], now=0.1)[0]
+    assert second is first
+    assert second.box == (105, 205, 205, 105)
+    assert second.hits == 2
+
+
+def test_fast_motion_matches_by_centroid():
+    tracker = FaceTracker(iou_threshold=0.3, max_centroid_shift=0.5)
+    first = tracker.update([(100, 200, 200, 100)], now=0.0)[0]
+    # Moved 60 px: IoU is below the threshold but the centre shift is under half the diagonal
+    moved = tracker.update([(100, 260, 200, 160)], now=0.1)[0]
+    assert box_iou((100, 200, 200, 100), (100, 260, 200, 160)) < 0.3
+    assert moved is first
+
+
+def test_two_faces_keep_their_own_tracks():
+    tracker = FaceTracker()
+    left, right = tracker.update([(100, 200, 200, 100), (100, 500, 200, 400)], now=0.0)
+    # Detections come back in the other order
+    right_again, left_again = tracker.update([(102, 502, 202, 402), (98, 198, 198, 98)], now=0.1)
+    assert left_again is left
+    assert right_again is right
+    assert left.track_id != right.track_id
+
+
+def test_distant_detection_starts_new_track():
+    tracker = FaceTracker()
+    first = tracker.update([(100, 200, 200, 100)], now=0.0)[0]
+    other = tracker.update([(400, 900, 500, 800)], now=0.1)[0]
+    assert other.track_id != first.track_id
+    assert sorted(tracker.active_track_ids()) == [first.track_id, other.track_id]
+
+
+def test_unseen_track_is_pruned_after_max_missed():
+    tracker = FaceTracker(max_missed=2)
+    track = tracker.update([(100, 200, 200, 100)], now=0.0)[0]
+    tracker.update([], now=0.1)
+    tracker.update([], now=0.2)
+    assert track.track_id in tracker.tracks
+    # Seen again before it expires: same track, missed count reset
+    assert tracker.update([(100, 200, 200, 100)], now=0.3)[0] is track
+    assert track.missed == 0
+    for step in range(3):
+        tracker.update([], now=0.4 + step)
+    assert tracker.active_track_ids() == []
+
+
+def test_cached_identity_is_reverified_periodically():
+    tracker = FaceTracker(reverify_interval=2.0, confident_distance=0.5)
+    track = tracker.update([(100, 200, 200, 100)], now=0.0)[0]
+    assert tracker.needs_encoding(track, now=0.0)
+    tracker.assign_identity(track, match("Asha", 0.3), now=0.0)
+    assert not tracker.needs_encoding(track, now=1.0)
+    assert tracker.needs_encoding(track, now=2.0)
+
+
+def test_uncertain_identity_is_encoded_again():
+    tracker = FaceTracker(reverify_interval=2.0, confident_distance=0.5)
+    track = tracker.update([(100, 200, 200, 100)], now=0.0)[0]
+    tracker.assign_identity(track, match("Unknown", 0.7), now=0.0)
+    assert tracker.needs_encoding(track, now=0.1)
+    tracker.assign_identity(track, match("Asha", 0.55), now=0.1)
+    assert tracker.needs_encoding(track, now=0.2)
+
+
+def test_invalidate_identities_forces_encoding():
+    tracker = FaceTracker()
+    track = tracker.update([(100, 200, 200, 100)], now=0.0)[0]
+    tracker.assign_identity(track, match("Asha", 0.3), now=0.0)
+    tracker.invalidate_identities()
+    assert tracker.needs_encoding(track, now=0.1)
+
+
+def test_worse_crop_does_not_replace_confident_identity():
+    tracker = FaceTracker(reverify_interval=2.0, confident_distance=0.5)
+    track = tracker.update([(100, 200, 200, 100)], now=0.0)[0]
+    assert tracker.assign_identity(track, match("Asha", 0.3), now=0.0, quality=0.8)
+
+    # A blurred frame at re-verification time is not even encoded...
+    assert not tracker.needs_encoding(track, now=3.0, quality=0.4)
+    # ...and if its result arrives anyway, the identity from the better crop stays
+    assert not tracker.assign_identity(track, match("Ravi", 0.45), now=3.0, quality=0.4)
+    assert (track.name, track.distance) == ("Asha", 0.3)
+
+    # An equally good crop re-verifies as usual
+    assert tracker.needs_encoding(track, now=5.0, quality=0.8)
+    assert tracker.assign_identity(track, match("Ravi", 0.35), now=5.0, quality=0.85)
+    assert track.name == "Ravi"
+
+
+def test_uncertain_identity_accepts_any_crop():
+    tracker = FaceTracker(confident_distance=0.5)
+    track = tracker.update([(100, 200, 200, 100)], now=0.0)[0]
+    tracker.assign_identity(track, match("Unknown", 0.7), now=0.0, quality=0.8)
+    assert tracker.assign_identity(track, match("Asha", 0.4), now=1.0, quality=0.3)
+    assert track.name == "Asha"
+
+
+def test_invalidated_identity_is_replaced_by_the_next_result():
+    tracker = FaceTracker(confident_distance=0.5)
+    track = tracker.update([(100, 200, 200, 100)], now=0.0)[0]
+    tracker.assign_identity(track, match("Asha", 0.3), now=0.0, quality=0.9)
+    tracker.invalidate_identities()
+    assert tracker.needs_encoding(track, now=0.1, quality=0.2)
+    assert tracker.assign_identity(track, match("Unknown", 0.8), now=0.1, quality=0.2)
+    assert track.name == "Unknown"
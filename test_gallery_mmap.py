@@ -0,0 +1,79 @@
+import os
+import numpy as np
+import pytest
+from face_matcher import FaceMatcher, ENCODING_SIZE
+from gallery_mmap import (quantize, dequantize, save_mapped_gallery, MappedGallery, MappedGalleryPublisher,
+                          generation_path, index_path, HEADER_SIZE, MAGIC)
+from gallery_store import save_gallery_store
+
+
+def gallery(count=50, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0.0, 0.09, size=(count, ENCODING_SIZE))
+
+
+@pytest.mark.parametrize("dtype, tolerance", [("float64", 0.0), ("float32", 1e-7), ("float16", 1e-3), ("int8", 3e-3)])
+def test_quantize_round_trip(dtype, tolerance):
+    encodings = gallery()
+    matrix, scales = quantize(encodings, dtype)
+    assert matrix.dtype == np.dtype(dtype)
+    assert (scales is not None) == (dtype == "int8")
+    assert np.abs(dequantize(matrix, scales) - encodings).max() <= tolerance
+
+
+def test_unknown_dtype_is_rejected():
+    with pytest.raises(ValueError):
+        quantize(gallery(), "bfloat16")
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_mapped_matcher_agrees_with_float64(tmp_path, dtype):
+    encodings = gallery()
+    names = [f"student_{i}" for i in range(len(encodings))]
+    path = str(tmp_path / "gallery.map")
+    assert save_mapped_gallery(list(range(len(names))), names, encodings, path, dtype)
+
+    mapped = MappedGallery(path)
+    probes = encodings[:10] + np.random.default_rng(1).normal(0.0, 0.01, size=(10, ENCODING_SIZE))
+    expected = FaceMatcher(encodings, names).match(probes)
+    actual = mapped.matcher().match(probes)
+    assert [a["index"] for a in actual] == [e["index"] for e in expected]
+    assert np.allclose([a["distance"] for a in actual], [e["distance"] for e in expected], atol=0.01)
+
+
+def test_matrix_from_another_export_is_refused(tmp_path):
+    path = str(tmp_path / "gallery.map")
+    save_mapped_gallery([1], ["Asha"], gallery(1), path)
+    # A matrix file written by a different export (its token differs from the index)
+    with open(path, "r+b") as f:
+        f.write((MAGIC + os.urandom(16)).ljust(HEADER_SIZE, b"\0"))
+    with pytest.raises(ValueError):
+        MappedGallery(path)
+
+
+def test_publisher_writes_generations_and_removes_old_ones(tmp_path):
+    store_path = str(tmp_path / "face_gallery.npz")
+    encodings = gallery(2)
+    save_gallery_store({roll_no: {"name": name, "hash": "h", "mtime": 0.0, "size": 0, "encoding": encoding}
+                        for roll_no, name, encoding in zip((1, 2), ("Asha", "Ravi"), encodings)}, store_path)
+    path = str(tmp_path / "face_gallery.map")
+    leftover = generation_path(path, 7)
+    save_mapped_gallery([1], ["Asha"], encodings[:1], leftover)
+
+    publisher = MappedGalleryPublisher(path)
+    assert not os.path.exists(leftover)
+    assert publisher.publish(store_path)
+    assert publisher.publish(store_path)
+    assert publisher.generation.value == 2
+    assert MappedGallery(publisher.current_path).names == ["Asha", "Ravi"]
+    assert not os.path.exists(generation_path(path, 1))
+    assert not os.path.exists(index_path(generation_path(path, 1)))
+
+    publisher.close()
+    assert not os.path.exists(publisher.current_path)
+
+
+def test_failed_export_keeps_the_current_generation(tmp_path):
+    publisher = MappedGalleryPublisher(str(tmp_path / "missing_dir" / "face_gallery.map"))
+    assert not publisher.publish(str(tmp_path / "face_gallery.npz"))
+    assert publisher.generation.value == 0
@@ -0,0 +1,91 @@
+import os
+import numpy as np
+import pytest
+import gallery_store
+from gallery_store import sync_gallery_store, load_gallery_store, gallery_to_lists, ENCODING_SIZE
+
+
+# Replaces the dlib encoder: photos whose content starts with b"face" get an encoding
+@pytest.fixture
+def encoder_calls(monkeypatch):
+    calls = []
+
+    def fake_encode(image_path, name):
+        calls.append(name)
+        with open(image_path, "rb") as f:
+            data = f.read()
+        if not data.startswith(b"face"):
+            return None
+        return np.full(ENCODING_SIZE, len(data) / 100.0)
+
+    monkeypatch.setattr(gallery_store, "encode_face_image", fake_encode)
+    return calls
+
+
+def write_photo(image_dir, name, content):
+    path = os.path.join(image_dir, f"{name}.jpg")
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def test_only_new_or_changed_photos_are_encoded(tmp_path, encoder_calls):
+    store_path = str(tmp_path / "gallery.npz")
+    write_photo(tmp_path, "Asha", b"face-asha")
+    write_photo(tmp_path, "Ravi", b"face-ravi")
+    students = [{"Name": "Asha", "Roll No": 1}, {"Name": "Ravi", "Roll No": 2}]
+
+    gallery = sync_gallery_store(students, str(tmp_path), store_path)
+    assert sorted(gallery) == [1, 2]
+    assert encoder_calls == ["Asha", "Ravi"]
+
+    sync_gallery_store(students, str(tmp_path), store_path)
+    assert encoder_calls == ["Asha", "Ravi"]
+
+    path = write_photo(tmp_path, "Ravi", b"face-ravi-new-photo")
+    os.utime(path, (1, 1))
+    gallery = sync_gallery_store(students, str(tmp_path), store_path)
+    assert encoder_calls == ["Asha", "Ravi", "Ravi"]
+    assert gallery[2]["encoding"][0] == pytest.approx(len(b"face-ravi-new-photo") / 100.0)
+
+
+def test_photo_without_face_is_cached_until_it_changes(tmp_path, encoder_calls):
+    store_path = str(tmp_path / "gallery.npz")
+    write_photo(tmp_path, "Asha", b"face-asha")
+    write_photo(tmp_path, "Blurry", b"no face here")
+    students = [{"Name": "Asha", "Roll No": 1}, {"Name": "Blurry", "Roll No": 2}]
+
+    gallery = sync_gallery_store(students, str(tmp_path), store_path)
+    assert sorted(gallery) == [1]
+    assert encoder_calls == ["Asha", "Blurry"]
+
+    # Unchanged bad photo: not re-encoded and the store file is not rewritten
+    saved_mtime = os.stat(store_path).st_mtime_ns
+    gallery = sync_gallery_store(students, str(tmp_path), store_path)
+    assert sorted(gallery) == [1]
+    assert encoder_calls == ["Asha", "Blurry"]
+    assert os.stat(store_path).st_mtime_ns == saved_mtime
+
+    # Failed entries are hidden from ordinary readers
+    assert sorted(load_gallery_store(store_path)) == [1]
+    assert load_gallery_store(store_path, include_failed=True)[2]["encoding"] is None
+
+    # A new photo is tried again
+    path = write_photo(tmp_path, "Blurry", b"face-retaken")
+    os.utime(path, (1, 1))
+    gallery = sync_gallery_store(students, str(tmp_path), store_path)
+    assert sorted(gallery) == [1, 2]
+    assert encoder_calls == ["Asha", "Blurry", "Blurry"]
+
+
+def test_removed_students_are_dropped(tmp_path, encoder_calls):
+    store_path = str(tmp_path / "gallery.npz")
+    write_photo(tmp_path, "Asha", b"face-asha")
+    write_photo(tmp_path, "Ravi", b"face-ravi")
+    sync_gallery_store([{"Name": "Asha", "Roll No": 1}, {"Name": "Ravi", "Roll No": 2}], str(tmp_path), store_path)
+
+    gallery = sync_gallery_store([{"Name": "Asha", "Roll No": 1}], str(tmp_path), store_path)
+    assert sorted(gallery) == [1]
+    assert sorted(load_gallery_store(store_path)) == [1]
+    names, encodings = gallery_to_lists(gallery)
+    assert names == ["Asha"] and len(encodings) == 1
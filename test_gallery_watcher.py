@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+import numpy as np
+import pytest
+import gallery_store
+import gallery_watcher
+from gallery_store import ENCODING_SIZE
+from gallery_watcher import GalleryWatcher
+from roster_cache import RosterCache
+
+
+@pytest.fixture
+def image_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(gallery_store, "encode_face_image", lambda image_path, name: np.full(ENCODING_SIZE, 0.5))
+    directory = tmp_path / "images"
+    directory.mkdir()
+    return str(directory)
+
+
+def write_photo(image_dir, name):
+    path = os.path.join(image_dir, f"{name}.jpg")
+    with open(path, "wb") as f:
+        f.write(b"face " + name.encode())
+    return path
+
+
+def make_watcher(image_dir, tmp_path, students):
+    roster_cache = RosterCache(None, seed_students=students)
+    return GalleryWatcher(roster_cache, image_dir, store_path=str(tmp_path / "gallery.npz"))
+
+
+def test_reload_swaps_matcher_only_when_gallery_changes(image_dir, tmp_path):
+    write_photo(image_dir, "Asha")
+    watcher = make_watcher(image_dir, tmp_path, [{"Name": "Asha", "Roll No": 1, "Face Registered": True}])
+    watcher.load()
+    assert len(watcher.matcher) == 1
+    generation = watcher.generation
+
+    assert watcher.reload() is False
+    assert watcher.generation == generation
+
+
+def test_added_face_is_recognisable_after_reload(image_dir, tmp_path):
+    watcher = make_watcher(image_dir, tmp_path, [{"Name": "Ravi", "Roll No": 2, "Face Registered": False}]).load()
+    assert len(watcher.matcher) == 0
+
+    path = write_photo(image_dir, "Ravi")
+    watcher.roster_cache.set_face_registered(2)
+    watcher.add_face(2, "Ravi", path, np.full(ENCODING_SIZE, 0.25))
+    assert watcher.reload() is True
+    assert watcher.matcher.names == ["Ravi"]
+    # The queued encoding was stored, so the sync did not encode the photo again
+    assert np.allclose(gallery_store.load_gallery_store(watcher.store_path)[2]["encoding"], 0.25)
+
+
+def test_add_face_does_not_wait_for_a_running_sync(image_dir, tmp_path, monkeypatch):
+    watcher = make_watcher(image_dir, tmp_path, [{"Name": "Ravi", "Roll No": 2, "Face Registered": True}])
+    syncing, release = threading.Event(), threading.Event()
+    real_sync = gallery_watcher.sync_gallery_store
+
+    def slow_sync(*args, **kwargs):
+        syncing.set()
+        release.wait(5.0)
+        return real_sync(*args, **kwargs)
+
+    monkeypatch.setattr(gallery_watcher, "sync_gallery_store", slow_sync)
+    reloading = threading.Thread(target=watcher.reload)
+    reloading.start()
+    assert syncing.wait(5.0)
+
+    path = write_photo(image_dir, "Ravi")
+    started = time.time()
+    watcher.add_face(2, "Ravi", path, np.full(ENCODING_SIZE, 0.25))
+    assert time.time() - started < 0.5
+
+    release.set()
+    reloading.join()
+    watcher.reload()
+    assert watcher.matcher.names == ["Ravi"]
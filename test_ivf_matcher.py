@@ -0,0 +1,77 @@
+import numpy as np
+from face_matcher import FaceMatcher, IVFFaceMatcher, create_matcher, ENCODING_SIZE
+
+
+# Function to build a clustered gallery (students' encodings are not uniformly spread)
+def clustered_gallery(count, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(0.0, 1.0, size=(clusters, ENCODING_SIZE))
+    encodings = centres[rng.integers(0, clusters, count)] + rng.normal(0.0, 0.3, size=(count, ENCODING_SIZE))
+    return encodings, [f"S{i}" for i in range(count)]
+
+
+def test_small_gallery_falls_back_to_exact_scan():
+    encodings, names = clustered_gallery(50)
+    matcher = IVFFaceMatcher(encodings, names, min_train_size=100)
+    assert matcher._centroids is None
+
+    queries = encodings[[3, 17, 42]] + 0.01
+    expected = FaceMatcher(encodings, names).match(queries)
+    assert matcher.match(queries) == expected
+
+
+def test_trains_once_gallery_reaches_min_train_size():
+    encodings, names = clustered_gallery(120)
+    matcher = IVFFaceMatcher(encodings[:99], names[:99], min_train_size=100, n_lists=8)
+    assert matcher._centroids is None
+    matcher.add(names[99], encodings[99])
+    assert matcher._centroids is not None
+    assert len(matcher._centroids) == 8
+
+
+def test_all_lists_probed_is_exact():
+    encodings, names = clustered_gallery(2000)
+    matcher = IVFFaceMatcher(encodings, names, min_train_size=100, n_lists=16, nprobe=16)
+    queries = encodings[::50] + np.random.default_rng(1).normal(0.0, 0.05, size=(40, ENCODING_SIZE))
+    expected = FaceMatcher(encodings, names).match(queries)
+    actual = matcher.match(queries)
+    assert [a["index"] for a in actual] == [e["index"] for e in expected]
+
+
+def test_recall_grows_with_nprobe():
+    # Unclustered gallery and noisy probes: the true neighbour often sits in a neighbouring list
+    rng = np.random.default_rng(0)
+    encodings = rng.normal(0.0, 1.0, size=(3000, ENCODING_SIZE))
+    names = [f"S{i}" for i in range(3000)]
+    queries = encodings[::30] + np.random.default_rng(2).normal(0.0, 1.0, size=(100, ENCODING_SIZE))
+    exact = [result["index"] for result in FaceMatcher(encodings, names).match(queries)]
+
+    matcher = IVFFaceMatcher(encodings, names, min_train_size=100, n_lists=50)
+    recalls = []
+    for nprobe in (1, 4, 50):
+        matcher.nprobe = nprobe
+        found = [result["index"] for result in matcher.match(queries)]
+        recalls.append(np.mean([f == e for f, e in zip(found, exact)]))
+    assert recalls[0] < 1.0
+    assert recalls[0] <= recalls[1] <= recalls[2]
+    assert recalls[1] >= 0.95
+    assert recalls[2] == 1.0
+
+
+def test_add_and_remove_after_training():
+    encodings, names = clustered_gallery(1000)
+    matcher = IVFFaceMatcher(encodings[:900], names[:900], min_train_size=100, n_lists=10, nprobe=10)
+    for name, encoding in zip(names[900:], encodings[900:]):
+        matcher.add(name, encoding)
+    assert matcher.match(encodings[950:951])[0]["name"] == "S950"
+
+    assert matcher.remove("S10") == 1
+    assert len(matcher) == 999
+    assert matcher.match(encodings[10:11])[0]["name"] != "S10"
+    # The row swapped into the hole keeps its cluster assignment
+    assert matcher.match(encodings[999:1000])[0]["name"] == "S999"
+
+
+def test_create_matcher_builds_ivf():
+    encodings, names = clustered_gallery(10)
+    assert isinstance(create_matcher(encodings, names, mode="ivf"), IVFFaceMatcher)
@@ -0,0 +1,111 @@
+from manual_auth import ManualAuthDesk
+
+
+def test_full_request_walks_through_every_step():
+    desk = ManualAuthDesk(capture_delay=3.0)
+    request = desk.open_request("track_1", now=0.0)
+    assert desk.open_request("track_1", now=0.0) is None  # one request per face
+
+    desk.submit("22052511")
+    assert desk.poll(now=1.0) == [("roll", request, "22052511")]
+
+    desk.await_registration(request, "John Doe", 22052511, now=1.0)
+    desk.submit("yes")
+    assert desk.poll(now=2.0) == [("register", request, "y")]
+
+    desk.schedule_capture(request, now=2.0)
+    assert desk.poll(now=4.0) == []
+    assert desk.poll(now=5.0) == [("capture", request, None)]
+
+    # While the photo is encoded the request stays open and ignores answers
+    desk.begin_registration(request, now=5.0)
+    desk.submit("y")
+    assert desk.poll(now=6.0) == []
+    assert desk.active is request
+    desk.close(request, now=8.0)
+    assert desk.active is None
+
+
+def test_unanswered_steps_time_out():
+    desk = ManualAuthDesk(roll_timeout=60.0, register_timeout=15.0, registration_timeout=30.0)
+    request = desk.open_request("track_1", now=0.0)
+    assert desk.poll(now=59.0) == []
+    assert desk.poll(now=60.0) == [("timeout", request, None)]
+    assert desk.active is None
+
+    request = desk.open_request("track_2", now=100.0)
+    desk.await_registration(request, "John Doe", 22052511, now=100.0)
+    assert desk.poll(now=115.0) == [("timeout", request, None)]
+
+    request = desk.open_request("track_3", now=200.0)
+    desk.begin_registration(request, now=200.0)
+    assert desk.poll(now=230.0) == [("timeout", request, None)]
+
+
+def test_one_answer_per_request_per_poll():
+    desk = ManualAuthDesk()
+    request = desk.open_request("track_1", now=0.0)
+    desk.submit("")  # empty answers are ignored
+    desk.submit("123")
+    desk.submit("456")  # arrives before the loop acted on the first answer: dropped
+    assert desk.poll(now=1.0) == [("roll", request, "123")]
+    assert desk.poll(now=2.0) == []
+
+
+def test_answers_by_id_and_cancel():
+    desk = ManualAuthDesk()
+    first = desk.open_request("track_1", now=0.0)
+    second = desk.open_request("track_2", now=0.0)
+    desk.submit("cancel", request_id=first.request_id)
+    desk.submit("789", request_id=second.request_id)
+    assert desk.poll(now=1.0) == [("cancel", first, "cancel"), ("roll", second, "789")]
+    assert desk.active is second
+
+
+def test_keypad_types_submits_and_cancels():
+    desk = ManualAuthDesk()
+    assert not desk.handle_key(ord("1"))  # nothing to answer
+    request = desk.open_request("track_1", now=0.0)
+    for key in (ord("1"), ord("2"), ord("3"), 8, 13):
+        assert desk.handle_key(key)
+    assert not desk.handle_key(ord("q"))
+    assert desk.poll(now=1.0) == [("roll", request, "12")]
+
+    desk.await_registration(request, "John Doe", 12, now=1.0)
+    assert desk.handle_key(27)  # Esc declines registration
+    assert desk.poll(now=2.0) == [("register", request, "n")]
+
+
+def test_desk_stays_busy_until_quiet_period_after_close():
+    desk = ManualAuthDesk(quiet_period=5.0)
+    assert not desk.busy(now=0.0)
+    request = desk.open_request("track_1", now=0.0)
+    assert desk.busy(now=1.0)
+    desk.close(request, now=10.0)
+    assert desk.busy(now=14.0)
+    assert not desk.busy(now=15.0)
+
+
+# Speaker stand-in recording what would be said
+class FakeSpeaker:
+    def __init__(self):
+        self.said = []
+
+    def say(self, text, priority=0):
+        self.said.append(text)
+
+
+def test_unknown_faces_are_not_counted_while_the_desk_is_busy():
+    from database_record import handle_unknown_face
+    desk, speaker, counters = ManualAuthDesk(), FakeSpeaker(), {}
+    for _ in range(3):
+        counters = handle_unknown_face(None, "track_1", (0, 10, 10, 0), counters, 3, True, speaker, desk)
+    assert speaker.said == ["Authentication failed"]
+    assert desk.active.face_id == "track_1"
+
+    # The same person re-acquired under a new track while the request is open
+    for _ in range(5):
+        counters = handle_unknown_face(None, "track_2", (0, 10, 10, 0), counters, 3, True, speaker, desk)
+    assert speaker.said == ["Authentication failed"]
+    assert len(desk.pending()) == 1
+    assert "track_2" not in counters
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from motion_gate import MotionDetector, AdaptiveScheduler
+
+
+def frame(value=0, box=None):
+    image = np.full((480, 640, 3), value, dtype=np.uint8)
+    if box:
+        top, right, bottom, left = box
+        image[top:bottom, left:right] = 255
+    return image
+
+
+def test_motion_detector_flags_changes_only():
+    detector = MotionDetector()
+    assert detector.update(frame())  # the first frame has nothing to compare with
+    assert not detector.update(frame())
+    assert detector.update(frame(box=(100, 300, 300, 200)))
+    assert detector.motion_level > 0.05
+    assert not detector.update(frame(box=(100, 300, 300, 200)))
+
+
+def test_motion_detector_ignores_sensor_noise():
+    detector = MotionDetector()
+    rng = np.random.default_rng(0)
+    base = rng.integers(100, 110, (480, 640, 3), dtype=np.uint8)
+    detector.update(base)
+    noisy = np.clip(base.astype(np.int16) + rng.integers(-5, 6, base.shape), 0, 255).astype(np.uint8)
+    assert not detector.update(noisy)
+
+
+def test_static_empty_scene_is_only_rescanned_occasionally():
+    scheduler = AdaptiveScheduler(idle_rescan_interval=2.0)
+    scheduler.mark_processed(now=100.0)
+    assert not scheduler.should_process(False, False, now=101.0)
+    assert scheduler.should_process(False, False, now=102.0)
+    assert scheduler.should_process(True, False, now=100.5)
+    assert scheduler.should_process(False, True, now=100.5)
+    assert scheduler.skipped_frames == 1
+
+
+def test_slow_processing_alone_does_not_lower_the_rate():
+    scheduler = AdaptiveScheduler(target_latency=0.25)
+    # Two faces at the door: 0.4 s of encoding per frame, but no frame waits for the recognizer
+    for _ in range(20):
+        scheduler.record_latency(0.42, processing_time=0.4)
+    assert scheduler.interval == scheduler.min_interval
+
+
+def test_queueing_delay_backs_off_and_recovers():
+    scheduler = AdaptiveScheduler(target_latency=0.25, max_interval=1.0)
+    for _ in range(5):
+        scheduler.record_latency(0.9, processing_time=0.4)
+    backed_off = scheduler.interval
+    assert 0.0 < backed_off <= 1.0
+    assert not scheduler.should_process(True, True, now=scheduler._last_submit + backed_off / 2)
+
+    for _ in range(50):
+        scheduler.record_latency(0.4, processing_time=0.4)
+    assert scheduler.interval == scheduler.min_interval
+
+
+def test_interval_never_exceeds_the_maximum():
+    scheduler = AdaptiveScheduler(target_latency=0.1, max_interval=0.5)
+    for _ in range(100):
+        scheduler.record_latency(5.0)
+    assert scheduler.interval == pytest.approx(0.5)
@@ -0,0 +1,73 @@
+import pytest
+from multi_camera import handle_camera_result, parse_camera_spec
+from roster_cache import RosterCache
+
+CAMERA = {"name": "Main Gate", "direction": None}
+
+
+# Speaker stand-in recording what would be said
+class FakeSpeaker:
+    def __init__(self):
+        self.said = []
+
+    def say(self, text, priority=0):
+        self.said.append(text)
+
+
+# Attendance writer stand-in
+class FakeWriter:
+    def __init__(self):
+        self.records = []
+
+    def insert_one(self, record):
+        self.records.append(record)
+
+
+# Worker result; timestamps lie in the future so the cooldown after a welcome never hides them
+def result(faces, timestamp=1e10):
+    return {
+        "face_locations": [(0, 10, 10, 0)] * len(faces),
+        "face_names": [name for name, _ in faces],
+        "track_ids": [track_id for _, track_id in faces],
+        "attempted": [True] * len(faces),
+        "active_track_ids": [track_id for _, track_id in faces],
+        "timestamp": timestamp
+    }
+
+
+def handle(results, max_unknown_attempts=3):
+    camera_state = {CAMERA["name"]: {"cooldown_end_time": 0, "unknown_attempts": {}}}
+    speaker, writer = FakeSpeaker(), FakeWriter()
+    roster_cache = RosterCache(None, seed_students=[{"Name": "Asha", "Roll No": 1, "Face Registered": True}])
+    last_entry_time = {}
+    for frame_result in results:
+        last_entry_time = handle_camera_result(frame_result, CAMERA, camera_state, roster_cache, writer,
+                                               speaker, 0.0, last_entry_time, 60, max_unknown_attempts)
+    return speaker, writer, camera_state[CAMERA["name"]]
+
+
+def test_two_strangers_are_counted_separately():
+    # Two strangers side by side: each reaches the limit on the third frame, not together on the second
+    speaker, _, state = handle([result([("Unknown", 1), ("Unknown", 2)])] * 2)
+    assert speaker.said == []
+    assert state["unknown_attempts"] == {1: 2, 2: 2}
+
+
+def test_recognised_face_does_not_reset_a_strangers_count():
+    results = [result([("Unknown", 1), ("Asha", 2)], timestamp=1e10 + i) for i in range(3)]
+    speaker, writer, _ = handle(results)
+    assert [record["Name"] for record in writer.records] == ["Asha"]
+    assert speaker.said.count("Authentication failed") == 1
+
+
+def test_counters_of_departed_tracks_are_dropped():
+    _, _, state = handle([result([("Unknown", 1)]), result([("Unknown", 2)])])
+    assert state["unknown_attempts"] == {2: 1}
+
+
+def test_parse_camera_spec():
+    assert parse_camera_spec("0", 0) == {"source": "0", "name": "Camera 1", "direction": None, "detector": "haar"}
+    camera = parse_camera_spec("source=1,name=Back Gate,direction=Exit,detector=dnn", 1)
+    assert (camera["source"], camera["name"], camera["direction"], camera["detector"]) == ("1", "Back Gate", "Exit", "dnn")
+    with pytest.raises(ValueError):
+        parse_camera_spec("source=1,direction=Sideways", 0)
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+from attendance_store import build_attendance_record
+from occupancy import occupancy_updates, apply_occupancy, DUPLICATE_KEY_ERROR
+
+START = datetime(2026, 3, 1, 8, 0, tzinfo=timezone.utc)
+
+
+# Function to evaluate the occupancy upsert filter ({"_id": ..., "$or": [{"Last Event": {"$lt"|"$exists"}}]})
+def matches(document, query):
+    if document["_id"] != query["_id"]:
+        return False
+    for clause in query["$or"]:
+        condition = clause["Last Event"]
+        if "$lt" in condition and "Last Event" in document and document["Last Event"] < condition["$lt"]:
+            return True
+        if "$exists" in condition and ("Last Event" in document) == condition["$exists"]:
+            return True
+    return False
+
+
+# In-memory stand-in for the Occupancy collection with MongoDB's upsert semantics:
+# an upsert whose filter matches nothing inserts, which collides with an existing _id
+class FakeOccupancy:
+    def __init__(self, down=False):
+        self.down = down
+        self.documents = {}
+
+    def bulk_write(self, updates, ordered=False):
+        if self.down:
+            raise AutoReconnect("server unreachable")
+        errors = []
+        for index, update in enumerate(updates):
+            query, changes = update._filter, update._doc["$set"]
+            document = self.documents.get(query["_id"])
+            if document is not None and matches(document, query):
+                document.update(changes)
+            elif document is not None:
+                errors.append({"index": index, "code": DUPLICATE_KEY_ERROR, "errmsg": "E11000 duplicate key"})
+            elif update._upsert:
+                self.documents[query["_id"]] = dict(changes, _id=query["_id"])
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+def record(roll_no, entry_type, minutes, camera=None):
+    return build_attendance_record(f"Student {roll_no}", roll_no, "Face Recognition", entry_type,
+                                   camera, now=START + timedelta(minutes=minutes))
+
+
+def test_updates_skip_records_without_roll_or_timestamp():
+    records = [record(1, "Entry", 0), dict(record(2, "Entry", 0), **{"Roll No": None}),
+               {k: v for k, v in record(3, "Exit", 0).items() if k != "Timestamp"}]
+    updates = occupancy_updates(records)
+    assert len(updates) == 1
+    assert updates[0]._upsert
+    assert updates[0]._doc["$set"]["Inside"] is True
+
+
+def test_entry_then_exit_moves_student_out():
+    occupancy = FakeOccupancy()
+    apply_occupancy(occupancy, [record(1, "Entry", 0, camera={"name": "north"})])
+    assert occupancy.documents[1]["Inside"] is True
+    assert occupancy.documents[1]["Camera"] == "north"
+
+    apply_occupancy(occupancy, [record(1, "Exit", 5)])
+    assert occupancy.documents[1]["Inside"] is False
+    assert occupancy.documents[1]["Last Entry Type"] == "Exit"
+
+
+def test_older_event_hits_duplicate_key_and_is_ignored(capsys):
+    occupancy = FakeOccupancy()
+    apply_occupancy(occupancy, [record(1, "Exit", 10)])
+    # A replayed, older Entry: the filter misses, the upsert collides with the _id and is dropped quietly
+    apply_occupancy(occupancy, [record(1, "Entry", 0), record(2, "Entry", 1)])
+    assert occupancy.documents[1]["Inside"] is False
+    assert occupancy.documents[1]["Last Event"] == START + timedelta(minutes=10)
+    assert occupancy.documents[2]["Inside"] is True
+    assert "rejected" not in capsys.readouterr().out
+
+
+def test_out_of_order_batch_keeps_newest_state():
+    occupancy = FakeOccupancy()
+    apply_occupancy(occupancy, [record(1, "Exit", 10), record(1, "Entry", 0)])
+    assert occupancy.documents[1]["Inside"] is False
+
+
+def test_unreachable_server_raises_for_retry():
+    with pytest.raises(AutoReconnect):
+        apply_occupancy(FakeOccupancy(down=True), [record(1, "Entry", 0)])
+
+
+def test_empty_batch_does_not_touch_the_server():
+    apply_occupancy(FakeOccupancy(down=True), [])
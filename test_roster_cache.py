@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from roster_cache import RosterCache
+
+
+# Function to evaluate the subset of MongoDB queries the roster uses
+def matches(document, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = document.get(key)
+            for operator, operand in condition.items():
+                if operator == "$gt" and (value is None or not value > operand):
+                    return False
+                if operator == "$exists" and (key in document) != operand:
+                    return False
+        elif document.get(key) != condition:
+            return False
+    return True
+
+
+# In-memory stand-in for the Students collection that counts round-trips
+class FakeStudents:
+    def __init__(self, students=()):
+        self.documents = [dict(student, _id=ObjectId()) for student in students]
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        return [dict(document) for document in self.documents if matches(document, query)]
+
+    def find_one(self, query, projection=None):
+        found = self.find(query, projection)
+        return found[0] if found else None
+
+    def update_one(self, query, update):
+        for document in self.documents:
+            if matches(document, query):
+                document.update(update["$set"])
+                return
+
+    def estimated_document_count(self):
+        return len(self.documents)
+
+    def insert(self, student):
+        self.documents.append(dict(student, _id=ObjectId()))
+
+    def edit(self, roll_no, **changes):
+        document = next(document for document in self.documents if document["Roll No"] == roll_no)
+        updated_at = max((d["Updated At"] for d in self.documents if "Updated At" in d), default=datetime(2026, 1, 1))
+        document.update(changes, **{"Updated At": updated_at + timedelta(seconds=1)})
+
+
+def roster(collection):
+    return RosterCache(collection).load()
+
+
+def test_load_indexes_by_name_and_roll():
+    cache = roster(FakeStudents([{"Name": "Asha", "Roll No": 1, "Face Registered": True},
+                                 {"Name": "Ravi", "Roll No": 2, "Face Registered": False}]))
+    assert len(cache) == 2
+    assert cache.get_by_name("Ravi")["Roll No"] == 2
+    assert cache.get_by_roll(1)["Name"] == "Asha"
+    assert [student["Name"] for student in cache.registered_students()] == ["Asha"]
+
+
+def test_misses_are_cached_briefly():
+    collection = FakeStudents([{"Name": "Asha", "Roll No": 1}])
+    cache = roster(collection)
+    collection.queries.clear()
+
+    assert cache.get_by_name("Stranger") is None
+    assert cache.get_by_name("Stranger") is None
+    assert collection.queries == [{"Name": "Stranger"}]
+
+    # A student added later is still found once the negative entry expires
+    collection.insert({"Name": "Stranger", "Roll No": 9})
+    cache.miss_ttl = 0.0
+    cache._misses.clear()
+    assert cache.get_by_name("Stranger")["Roll No"] == 9
+
+
+def test_poll_picks_up_new_edited_and_deleted_students():
+    collection = FakeStudents([{"Name": "Asha", "Roll No": 1, "Face Registered": False},
+                               {"Name": "Ravi", "Roll No": 2, "Face Registered": True},
+                               {"Name": "Meera", "Roll No": 3, "Face Registered": True}])
+    cache = roster(collection)
+
+    collection.insert({"Name": "Kabir", "Roll No": 4, "Face Registered": True})
+    collection.edit(1, **{"Face Registered": True})
+    collection.edit(2, Name="Ravi Kumar")
+    collection.documents = [document for document in collection.documents if document["Roll No"] != 3]
+    version = cache.version
+    cache._poll_changes()
+
+    assert cache.version > version
+    assert cache.get_by_roll(4)["Name"] == "Kabir"
+    assert cache.get_by_roll(1)["Face Registered"] is True
+    assert cache.get_by_roll(2)["Name"] == "Ravi Kumar"
+    assert cache._by_name.get("Ravi") is None
+    assert cache._by_roll.get(3) is None
+    assert sorted(student["Roll No"] for student in cache.registered_students()) == [1, 2, 4]
+
+
+def test_poll_without_changes_fetches_nothing():
+    collection = FakeStudents([{"Name": "Asha", "Roll No": 1}])
+    collection.edit(1, Name="Asha")
+    cache = roster(collection)
+    collection.queries.clear()
+    cache._poll_changes()
+    assert len(cache) == 1
+    # Only the incremental query; the document count matched, so no _id scan
+    assert len(collection.queries) == 1
+
+
+def test_set_face_registered_updates_mongodb_and_cache():
+    collection = FakeStudents([{"Name": "Asha", "Roll No": 1, "Face Registered": False}])
+    cache = roster(collection)
+    assert cache.set_face_registered(1)
+    assert collection.documents[0]["Face Registered"] is True
+    assert "Updated At" in collection.documents[0]
+    assert cache.get_by_roll(1)["Face Registered"] is True
+
+
+def test_offline_roster_uses_seed_students():
+    cache = RosterCache(None, seed_students=[{"Name": "Asha", "Roll No": 1, "Face Registered": False}])
+    assert cache.get_by_name("Nobody") is None
+    assert cache.set_face_registered(1)
+    assert cache.get_by_roll(1)["Face Registered"] is True
+
+
+def test_version_only_moves_when_the_roster_changes():
+    collection = FakeStudents([{"Name": "Asha", "Roll No": 1, "Face Registered": True}])
+    cache = roster(collection)
+    version = cache.version
+
+    cache.load()  # the periodic full reload of an unchanged roster
+    cache.upsert(dict(cache.get_by_roll(1)))  # a change-stream event that repeats what we have
+    assert cache.version == version
+
+    collection.edit(1, Name="Asha Rao")
+    cache.load()
+    assert cache.version == version + 1
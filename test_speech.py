@@ -0,0 +1,100 @@
+import time
+import pytest
+import speech
+from speech import Speaker, split_sentences, PRIORITY_FAILURE, PRIORITY_WELCOME, PRIORITY_INFO
+
+
+# pyttsx3 engine stand-in recording what is spoken
+class FakeEngine:
+    def __init__(self):
+        self.spoken = []
+
+    def say(self, text):
+        self.spoken.append(text)
+
+    def runAndWait(self):
+        pass
+
+
+# Controllable clock for speech.time
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(speech, "time", fake)
+    return fake
+
+
+def queued_speaker(max_age=4.0):
+    speaker = Speaker(FakeEngine(), max_age=max_age, cached_phrases=[])
+    speaker._running = True  # lets _next() hand out announcements without the thread
+    return speaker
+
+
+def test_split_sentences():
+    assert split_sentences("Entry successful. Welcome, Asha") == ["Entry successful", "Welcome, Asha"]
+    assert split_sentences("  ") == []
+
+
+def test_announcements_with_the_same_opening_are_merged(clock):
+    speaker = queued_speaker()
+    speaker.say("Entry successful. Welcome, Asha", PRIORITY_WELCOME)
+    speaker.say("Entry successful. Welcome, Ravi", PRIORITY_WELCOME)
+    speaker.say("Authentication failed", PRIORITY_FAILURE)
+    speaker.say("Authentication failed", PRIORITY_FAILURE)
+    assert speaker.depth == 2
+    assert speaker.coalesced == 2
+
+    speaker._next()
+    welcome = speaker._next()
+    assert welcome.sentences == ["Entry successful", "Welcome, Asha", "Welcome, Ravi"]
+    assert len(welcome.created) == 2
+
+
+def test_failures_first_then_oldest_first(clock):
+    speaker = queued_speaker()
+    speaker.say("Please look at the camera", PRIORITY_INFO)
+    clock.now += 0.1
+    speaker.say("Exit successful. Welcome, Asha", PRIORITY_WELCOME)
+    clock.now += 0.1
+    speaker.say("Entry successful. Welcome, Ravi", PRIORITY_WELCOME)
+    clock.now += 0.1
+    speaker.say("Authentication failed", PRIORITY_FAILURE)
+    order = [speaker._next().key for _ in range(4)]
+    assert order == ["Authentication failed", "Exit successful", "Entry successful", "Please look at the camera"]
+
+
+def test_merging_keeps_the_more_urgent_priority(clock):
+    speaker = queued_speaker()
+    speaker.say("Entry successful. Welcome, Asha", PRIORITY_WELCOME)
+    speaker.say("Authentication failed", PRIORITY_FAILURE)
+    speaker.say("Entry successful. Welcome, Ravi", PRIORITY_FAILURE)
+    assert speaker._next().key == "Entry successful"
+
+
+def test_stale_announcements_are_dropped(clock):
+    speaker = queued_speaker(max_age=4.0)
+    speaker.say("Entry successful. Welcome, Asha", PRIORITY_WELCOME)
+    speaker.say("Authentication failed", PRIORITY_FAILURE, max_age=10.0)
+    clock.now += 5.0
+    assert speaker._next().key == "Authentication failed"
+    assert speaker.dropped == 1
+    assert speaker.depth == 0
+
+
+def test_thread_speaks_and_stops():
+    speaker = Speaker(FakeEngine(), cached_phrases=[]).start()
+    speaker.say("Entry successful. Welcome, Asha", PRIORITY_WELCOME)
+    deadline = time.time() + 5.0
+    while speaker.spoken < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    speaker.stop()
+    assert speaker.engine.spoken == ["Entry successful", "Welcome, Asha"]
+    assert not speaker._thread.is_alive()